@@ -11,6 +11,7 @@ import sys
 import json
 import io
 import base64
+import threading
 from datetime import datetime
 from functools import wraps
 from bson import ObjectId
@@ -29,7 +30,7 @@ except ImportError:
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from config import DATA_DIR
+from config import DATA_DIR, OCR_REMOTE_CACHE, OCR_RESUME_ON_START
 from parsers import UniversalParser
 from classifiers import ClassificationEngine
 from processors import ModuleRouter, EntryBuilder, OutputGenerator
@@ -192,6 +193,19 @@ def serialize_doc(doc):
 # This prevents the app from hanging if MongoDB is unavailable
 mongodb_ready = False
 
+# Shared OCR cache tier - OCR results stored in MongoDB GridFS are reused by every node
+if OCR_REMOTE_CACHE and MONGODB_AVAILABLE:
+    from ocr import enable_remote_cache
+    enable_remote_cache(get_db)
+
+# Finish OCR jobs a crash or restart interrupted, for source files still on disk
+# (uploads are temp files - those jobs resume when the same file is uploaded again)
+if OCR_RESUME_ON_START:
+    from ocr import get_extraction_service
+    threading.Thread(target=get_extraction_service().resume_pending, name='ocr-resume',
+                     daemon=True).start()
+
+
 # ============ COMPLETE CHART OF ACCOUNTS FROM CLIENT ============
 
 GL_CODES = [
@@ -2663,6 +2677,39 @@ def api_add_keyword():
         return jsonify({'error': str(e)}), 500
 
 
+# ============ OCR CACHE ADMIN API ============
+
+@app.route('/api/ocr-cache/stats', methods=['GET'])
+def api_ocr_cache_stats():
+    """OCR cache hit rate, size, budget and eviction counters."""
+    try:
+        from ocr import get_cache_store
+        return jsonify(get_cache_store().stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/ocr-cache/prune', methods=['POST'])
+def api_ocr_cache_prune():
+    """Expire old entries and evict down to the byte budget now."""
+    try:
+        from ocr import get_cache_store
+        result = get_cache_store().prune()
+        return jsonify({'success': True, **result})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/ocr/governor', methods=['GET'])
+def api_ocr_governor():
+    """OCR CPU slots in use, queue depth and wait times."""
+    try:
+        from ocr import get_governor
+        return jsonify(get_governor().stats())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 # ============ TEMPLATES ============
 
 INDEX_TEMPLATE = '''<!DOCTYPE html>
@@ -3374,6 +3421,9 @@ if __name__ == '__main__':
     print("    ---  UTILITIES  ---")
     print("    GET  /api/audit-logs      - View audit logs")
     print("    POST /api/sync/master-data - Sync to MongoDB")
+    print("    GET  /api/ocr-cache/stats - OCR cache hit rate, size, evictions")
+    print("    POST /api/ocr-cache/prune - Evict OCR cache down to budget")
+    print("    GET  /api/ocr/governor    - OCR CPU slots, queue depth, wait times")
     print("="*70)
     print("\n[*] Starting server...")
     app.run(debug=FLASK_DEBUG, host=FLASK_HOST, port=FLASK_PORT)
\ No newline at end of file
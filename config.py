@@ -110,6 +110,106 @@ def _find_poppler():
 TESSERACT_CMD = _find_tesseract()
 POPPLER_PATH = _find_poppler()
 
+# Page-parallel OCR - number of worker processes (default 1 = sequential, 0 = one per CPU).
+# Every upload to the threaded app starts its own pool, so deployments opt in here.
+OCR_WORKERS = int(os.environ.get('OCR_WORKERS', 1)) or (os.cpu_count() or 1)
+
+# OCR resource governor - CPU slots shared by all concurrent OCR / text-extraction jobs
+# in this process (0 = CPUs available to the process, honouring cgroup quotas), and the
+# OpenMP threads each tesseract may start (0 = tesseract default; an OMP_THREAD_LIMIT
+# already in the environment wins)
+OCR_MAX_CONCURRENCY = int(os.environ.get('OCR_MAX_CONCURRENCY', 0))
+OCR_OMP_THREAD_LIMIT = int(os.environ.get('OCR_OMP_THREAD_LIMIT', 1))
+
+# Digital text extraction - worker processes for page text layers (0 = same as OCR_WORKERS)
+PDF_TEXT_WORKERS = int(os.environ.get('PDF_TEXT_WORKERS', 0)) or OCR_WORKERS
+
+# Digital text backend - 'pdfplumber' or 'pdftotext' (poppler `pdftotext -layout`);
+# bank templates can override with "ocr": {"text_backend": ...}
+PDF_TEXT_BACKEND = os.environ.get('PDF_TEXT_BACKEND', 'pdfplumber').lower()
+
+# PDF triage - pages whose text layer is sampled to decide digital / scanned before extraction
+OCR_TRIAGE_SAMPLE_PAGES = int(os.environ.get('OCR_TRIAGE_SAMPLE_PAGES', 3))
+
+# Page rasterization - pages are rendered one at a time; at most OCR_PAGE_WINDOW
+# rendered pages are in flight (0 = 2 per OCR worker). Grayscale renders are 1/3 the size of RGB.
+OCR_PAGE_WINDOW = int(os.environ.get('OCR_PAGE_WINDOW', 0))
+OCR_GRAYSCALE = os.environ.get('OCR_GRAYSCALE', 'True').lower() == 'true'
+
+# Page-level OCR cache (data/ocr_cache/pages) - keyed by page pixels, DPI, OCR passes, tesseract version
+OCR_PAGE_CACHE = os.environ.get('OCR_PAGE_CACHE', 'True').lower() == 'true'
+
+# OCR cache store - byte budget (LRU eviction), max entry age (0 = never expire)
+# and compression ('zstd' needs: pip install zstandard, else gzip is used)
+OCR_CACHE_MAX_MB = int(os.environ.get('OCR_CACHE_MAX_MB', 2048))
+OCR_CACHE_MAX_AGE_DAYS = int(os.environ.get('OCR_CACHE_MAX_AGE_DAYS', 90))
+OCR_CACHE_COMPRESSION = os.environ.get('OCR_CACHE_COMPRESSION', 'zstd').lower()
+
+# Finished text extractions kept in memory per process, so a fallback parser
+# (e.g. UniversalParser: SmartParser -> LLMParser) never re-OCRs the same upload
+EXTRACTION_MEMO_SIZE = int(os.environ.get('EXTRACTION_MEMO_SIZE', 8))
+
+# Shared OCR cache tier in MongoDB GridFS (multi-node deployments) - uses the app's MongoDB connection
+OCR_REMOTE_CACHE = os.environ.get('OCR_REMOTE_CACHE', 'False').lower() == 'true'
+OCR_REMOTE_CACHE_BUCKET = os.environ.get('OCR_REMOTE_CACHE_BUCKET', 'ocr_cache')
+
+# Pre-OCR page triage - skip blank pages (pixel stats) and boilerplate pages (low-DPI thumbnail OCR).
+# Opt-in: small-print transaction rows can be unreadable on the thumbnail, and every content page
+# pays for the extra thumbnail pass
+OCR_TRIAGE = os.environ.get('OCR_TRIAGE', 'False').lower() == 'true'
+OCR_TRIAGE_DPI = int(os.environ.get('OCR_TRIAGE_DPI', 120))
+
+# Render DPI strategy - 'fixed' renders every page at 350 DPI (400 for CrossFirst);
+# 'adaptive' renders at OCR_ADAPTIVE_START_DPI first and re-renders at the fixed DPI
+# only pages whose transaction-line yield (or layout-mode confidence) is too low
+OCR_DPI_MODE = os.environ.get('OCR_DPI_MODE', 'fixed').lower()
+OCR_ADAPTIVE_START_DPI = int(os.environ.get('OCR_ADAPTIVE_START_DPI', 250))
+OCR_ADAPTIVE_MIN_YIELD = float(os.environ.get('OCR_ADAPTIVE_MIN_YIELD', 0.8))
+OCR_ADAPTIVE_MIN_CONF = float(os.environ.get('OCR_ADAPTIVE_MIN_CONF', 70))
+
+# OCR mode - 'psm' (PSM 6 with PSM 4/11/3 fallbacks), 'layout' (one image_to_data
+# pass with rows/columns rebuilt from word boxes, using OCR_LAYOUT_PSM) or
+# 'confidence' (fallback passes driven by word confidence and template line shapes)
+OCR_MODE = os.environ.get('OCR_MODE', 'psm').lower()
+OCR_LAYOUT_PSM = int(os.environ.get('OCR_LAYOUT_PSM', 11))
+
+# OCR_MODE=confidence - PSM 6/4/11/3 passes stop once a page reaches this mean word confidence
+# and this share of its dated lines match the bank template's transaction line shapes
+OCR_FALLBACK_MIN_CONF = float(os.environ.get('OCR_FALLBACK_MIN_CONF', 80))
+OCR_FALLBACK_MIN_YIELD = float(os.environ.get('OCR_FALLBACK_MIN_YIELD', 0.8))
+
+# Page image preprocessing before OCR: 'none', 'deskew', 'clean', 'binarize' or 'fast'
+# (bank templates can override with "ocr": {"preprocess": ...})
+OCR_PREPROCESS = os.environ.get('OCR_PREPROCESS', 'none').lower()
+
+# Check-image pages - also OCR each check tile's payee / amount / date / check-number
+# fields (structured results keyed by check number; templates: "ocr": {"check_fields": true})
+OCR_CHECK_FIELDS = os.environ.get('OCR_CHECK_FIELDS', 'False').lower() == 'true'
+
+# Early-stop OCR - scanned statements are OCRed in page batches and parsed as they go;
+# the remaining pages (check images, disclosures) are skipped once parsed deposits and
+# withdrawals match the summary totals and the ending-balance marker has been seen
+# (templates: "ocr": {"early_stop": true, "end_marker": "<regex>"})
+OCR_EARLY_STOP = os.environ.get('OCR_EARLY_STOP', 'False').lower() == 'true'
+
+# OCR backend - 'spawn' (pytesseract, one tesseract process per call) or
+# 'tesserocr' (persistent in-process engine per worker; pip install tesserocr)
+OCR_BACKEND = os.environ.get('OCR_BACKEND', 'spawn').lower()
+
+# Tesseract model tiers - a tessdata directory or traineddata name (e.g. 'eng_fast') per tier.
+# The fast model runs the throwaway passes (triage thumbnails, bank peek, page classification),
+# the best model every pass whose text is kept. Empty: best = installed default, fast = best.
+OCR_MODEL_FAST = os.environ.get('OCR_MODEL_FAST', '')
+OCR_MODEL_BEST = os.environ.get('OCR_MODEL_BEST', '')
+
+# OCR job checkpoints - finished pages are appended to data/ocr_jobs/<job>.jsonl so a crashed
+# run resumes at the first missing page when the same file is uploaded again. Checkpoints older
+# than OCR_JOB_MAX_AGE_HOURS are dropped. OCR_RESUME_ON_START also finishes jobs at start-up,
+# but only for source files still on disk (not app uploads, which are temp files).
+OCR_JOB_CHECKPOINTS = os.environ.get('OCR_JOB_CHECKPOINTS', 'True').lower() == 'true'
+OCR_JOB_MAX_AGE_HOURS = float(os.environ.get('OCR_JOB_MAX_AGE_HOURS', 48))
+OCR_RESUME_ON_START = os.environ.get('OCR_RESUME_ON_START', 'False').lower() == 'true'
+
 # Flask settings
 FLASK_HOST = '0.0.0.0'  # Listen on all interfaces for deployment
 FLASK_PORT = int(os.environ.get('PORT', 6002))  # Default to 8587, configurable via environment
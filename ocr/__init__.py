@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+OCR Package - Page-level OCR pipeline shared by the PDF parsers
+
+Components:
+- extraction.py: Text extraction service used by every PDF parser (text layer
+  + OCR, one cache, per-document memo)
+- engine.py: Per-page OCR (classification + PSM fallbacks), sequential or
+  page-parallel across a process pool
+- pdf_triage.py: Up-front digital / scanned / mixed decision from cheap PDF signals
+- digital.py: Page text-layer extraction (pdfplumber / pdftotext backends) across
+  a process pool
+- rasterizer.py: Page-at-a-time, grayscale PDF rendering with bounded memory
+- cache_store.py: Managed OCR cache (compression, byte budget, LRU/age eviction, stats)
+- remote_cache.py: Optional MongoDB GridFS tier shared by all app nodes
+- page_cache.py: Per-page OCR cache keyed by page content + OCR settings
+- checkpoint.py: Per-job page checkpoints so interrupted OCR runs resume
+- triage.py: Pre-OCR blank / check-tile / thumbnail page triage
+- layout.py: Single-pass word-box OCR with rows/columns rebuilt from coordinates
+- regions.py: Template-declared page regions, cropped and OCRed in the page worker
+- check_fields.py: Payee / amount / check-number field OCR per check-image tile
+- governor.py: Process-wide CPU slots and tesseract thread limits for concurrent jobs
+- confidence.py: Fallback PSM passes chosen by word confidence and line shapes
+- tessdata.py: Fast / best tesseract model tiers per pass and per-pass timings
+- backends.py: Spawn-per-call (pytesseract) or persistent in-process (tesserocr)
+  tesseract backends behind one interface
+- preprocess.py: NumPy deskew / border / binarize / denoise / rescale presets
+- tesseract_options.py: Template tesseract whitelists, user patterns and DPI hints
+- bank_detection.py: Best-scoring bank over all template identifiers (first page first)
+- profiles.py: Per-bank OCR settings from the bank templates' "ocr" section
+"""
+
+from .engine import OCREngine, ocr_page, classify_page, ocr_settings, needs_higher_dpi
+from .governor import OCRGovernor, get_governor, available_cpus
+from .pdf_triage import triage_pdf
+from .digital import extract_page_texts, get_text_backend, PdfplumberTextBackend, PdftotextBackend
+from .rasterizer import PageRef, get_page_count, render_page, iter_pages, page_refs
+from .cache_store import OCRCacheStore, get_cache_store
+from .remote_cache import GridFSCacheTier, enable_remote_cache
+from .page_cache import PageOCRCache
+from .checkpoint import OCRCheckpoint, pending_jobs
+from .triage import triage_page, find_check_tiles, is_blank_page
+from .layout import ocr_layout, rebuild_text
+from .regions import ocr_regions, regions_for_page
+from .check_fields import ocr_check_fields, checks_by_number
+from .confidence import lines_from_data, score_lines
+from .backends import get_backend, SpawnBackend, TesserocrBackend
+from .tessdata import PassTimer, tier_config, merge_pass_ms
+from .preprocess import preprocess_image, PRESETS
+from .tesseract_options import build_config, PATTERN_PRESETS
+from .bank_detection import BankDetector, format_detection, compact_scores
+from .profiles import detect_bank, get_bank_detector, ocr_profile
+from .extraction import TextExtractionService, get_extraction_service
+
+__all__ = [
+    'OCREngine',
+    'ocr_page',
+    'classify_page',
+    'ocr_settings',
+    'needs_higher_dpi',
+    'OCRGovernor',
+    'get_governor',
+    'available_cpus',
+    'triage_pdf',
+    'extract_page_texts',
+    'get_text_backend',
+    'PdfplumberTextBackend',
+    'PdftotextBackend',
+    'PageRef',
+    'get_page_count',
+    'render_page',
+    'iter_pages',
+    'page_refs',
+    'OCRCacheStore',
+    'get_cache_store',
+    'GridFSCacheTier',
+    'enable_remote_cache',
+    'PageOCRCache',
+    'OCRCheckpoint',
+    'pending_jobs',
+    'triage_page',
+    'find_check_tiles',
+    'is_blank_page',
+    'ocr_layout',
+    'rebuild_text',
+    'ocr_regions',
+    'regions_for_page',
+    'ocr_check_fields',
+    'checks_by_number',
+    'lines_from_data',
+    'score_lines',
+    'get_backend',
+    'PassTimer',
+    'tier_config',
+    'merge_pass_ms',
+    'SpawnBackend',
+    'TesserocrBackend',
+    'preprocess_image',
+    'PRESETS',
+    'BankDetector',
+    'format_detection',
+    'compact_scores',
+    'detect_bank',
+    'get_bank_detector',
+    'ocr_profile',
+    'build_config',
+    'PATTERN_PRESETS',
+    'TextExtractionService',
+    'get_extraction_service'
+]
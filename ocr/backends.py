@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+OCR Backends - Interchangeable tesseract front-ends behind one interface
+
+- spawn:     pytesseract. Every call forks a tesseract process, writes a temp
+             image and reloads the traineddata (the historical behaviour).
+- tesserocr: In-process tesseract API (pip install tesserocr). One engine per
+             (thread, language, oem, tessdata) is created once and reused for
+             the life of the process; images are handed over in memory.
+
+Both expose image_to_string(image, config) and image_to_data(image, config)
+with pytesseract-compatible results, so callers switch with OCR_BACKEND.
+
+Usage:
+    backend = get_backend()
+    text = backend.image_to_string(image, config='--oem 3 --psm 6')
+"""
+
+import os
+import shlex
+import threading
+from typing import Dict, Optional
+
+try:
+    import pytesseract
+    from pytesseract import Output
+    TESSERACT_AVAILABLE = True
+except ImportError:
+    TESSERACT_AVAILABLE = False
+
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+try:
+    from config import OCR_BACKEND, TESSERACT_CMD
+except ImportError:
+    OCR_BACKEND = 'spawn'
+    TESSERACT_CMD = None
+
+# Integer fields in tesseract TSV / pytesseract Output.DICT
+_TSV_INT_FIELDS = ('level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+                   'left', 'top', 'width', 'height')
+
+
+def parse_tesseract_config(config: str) -> Dict:
+    """
+    Split a tesseract command-line config into its parts.
+
+    Returns:
+        Dict with psm, oem, lang, tessdata_dir, dpi, user_patterns and
+        variables (-c name=value)
+    """
+    parsed = {'psm': 3, 'oem': 3, 'lang': 'eng', 'tessdata_dir': None, 'dpi': None,
+              'user_patterns': None, 'variables': {}}
+    tokens = shlex.split(config or '')
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        value = tokens[i + 1] if i + 1 < len(tokens) else None
+        if token == '--psm' and value is not None:
+            parsed['psm'] = int(value)
+            i += 1
+        elif token == '--oem' and value is not None:
+            parsed['oem'] = int(value)
+            i += 1
+        elif token == '-l' and value is not None:
+            parsed['lang'] = value
+            i += 1
+        elif token == '--tessdata-dir' and value is not None:
+            parsed['tessdata_dir'] = value
+            i += 1
+        elif token == '--dpi' and value is not None:
+            parsed['dpi'] = int(value)
+            i += 1
+        elif token == '--user-patterns' and value is not None:
+            parsed['user_patterns'] = value
+            i += 1
+        elif token == '-c' and value is not None and '=' in value:
+            name, var_value = value.split('=', 1)
+            parsed['variables'][name] = var_value
+            i += 1
+        i += 1
+    return parsed
+
+
+def parse_tsv(tsv: str) -> Dict:
+    """Convert tesseract TSV output into pytesseract's Output.DICT shape."""
+    lines = tsv.rstrip('\n').split('\n')
+    header = ['level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+              'left', 'top', 'width', 'height', 'conf', 'text']
+    if lines and lines[0].startswith('level'):
+        header = lines[0].split('\t')
+        lines = lines[1:]
+
+    data = {name: [] for name in header}
+    for line in lines:
+        if not line:
+            continue
+        values = line.split('\t')
+        values += [''] * (len(header) - len(values))
+        for name, value in zip(header, values):
+            if name in _TSV_INT_FIELDS:
+                value = int(value) if value.lstrip('-').isdigit() else 0
+            elif name == 'conf':
+                try:
+                    value = float(value)
+                except ValueError:
+                    value = -1.0
+            data[name].append(value)
+    return data
+
+
+class SpawnBackend:
+    """pytesseract - one tesseract process per call."""
+
+    name = 'spawn'
+
+    def __init__(self):
+        if TESSERACT_CMD and os.path.exists(TESSERACT_CMD):
+            pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
+
+    def image_to_string(self, image, config: str = '') -> str:
+        return pytesseract.image_to_string(image, config=config)
+
+    def image_to_data(self, image, config: str = '') -> Dict:
+        return pytesseract.image_to_data(image, config=config, output_type=Output.DICT)
+
+
+class TesserocrBackend:
+    """
+    In-process tesseract via tesserocr.
+
+    Engines are expensive to create (traineddata load) and not thread-safe,
+    so each thread keeps its own engine per (lang, oem, tessdata_dir,
+    user_patterns) - user patterns can only be set when an engine starts -
+    and only the page segmentation mode / variables are changed between calls.
+    """
+
+    name = 'tesserocr'
+
+    def __init__(self):
+        if not TESSEROCR_AVAILABLE:
+            raise ImportError("tesserocr package not installed. Run: pip install tesserocr")
+        self._local = threading.local()
+
+    def _api(self, parsed: Dict):
+        apis = getattr(self._local, 'apis', None)
+        if apis is None:
+            apis = self._local.apis = {}
+
+        key = (parsed['lang'], parsed['oem'], parsed['tessdata_dir'], parsed['user_patterns'])
+        api = apis.get(key)
+        if api is None:
+            kwargs = {'lang': parsed['lang'], 'oem': tesserocr.OEM(parsed['oem'])}
+            if parsed['tessdata_dir']:
+                kwargs['path'] = parsed['tessdata_dir']
+            if parsed['user_patterns']:
+                kwargs['variables'] = {'user_patterns_file': parsed['user_patterns']}
+            api = tesserocr.PyTessBaseAPI(**kwargs)
+            apis[key] = api
+
+        api.Clear()
+        api.SetPageSegMode(tesserocr.PSM(parsed['psm']))
+        return api
+
+    @staticmethod
+    def _set_variables(api, variables: Dict) -> Dict:
+        """
+        Apply per-call -c variables.
+
+        Returns:
+            The previous value of each variable set (as GetVariableAsString
+            reports it), for _restore_variables()
+        """
+        previous = {}
+        for name, value in variables.items():
+            old = api.GetVariableAsString(name)
+            if api.SetVariable(name, value) and old is not None:
+                previous[name] = old
+        return previous
+
+    @staticmethod
+    def _restore_variables(api, previous: Dict):
+        """Put back the values per-call variables replaced, so they don't leak into the next call."""
+        for name, value in previous.items():
+            api.SetVariable(name, value)
+
+    def _recognize(self, image, config: str, read):
+        """Run one recognition with the config's settings and return read(api)."""
+        parsed = parse_tesseract_config(config)
+        api = self._api(parsed)
+        previous = self._set_variables(api, parsed['variables'])
+        try:
+            api.SetImage(image)
+            if parsed['dpi']:
+                api.SetSourceResolution(parsed['dpi'])
+            elif image.info.get('dpi'):
+                api.SetSourceResolution(int(image.info['dpi'][0]))
+            api.Recognize()
+            return read(api)
+        finally:
+            self._restore_variables(api, previous)
+
+    def image_to_string(self, image, config: str = '') -> str:
+        text = self._recognize(image, config, lambda api: api.GetUTF8Text())
+        # The tesseract CLI (and therefore pytesseract) ends each page with a form feed
+        return text + '\f'
+
+    def image_to_data(self, image, config: str = '') -> Dict:
+        return self._recognize(image, config, lambda api: parse_tsv(api.GetTSVText(0)))
+
+
+_BACKENDS = {
+    'spawn': SpawnBackend,
+    'tesserocr': TesserocrBackend,
+}
+
+_backend_instances = {}
+
+
+def get_backend(name: Optional[str] = None):
+    """
+    Get the process-wide OCR backend (default: config.OCR_BACKEND).
+
+    Falls back to the spawn backend if the requested one is unavailable.
+    """
+    name = (name or OCR_BACKEND or 'spawn').lower()
+    backend = _backend_instances.get(name)
+    if backend is None:
+        try:
+            backend = _BACKENDS[name]()
+        except (KeyError, ImportError) as e:
+            print(f"[WARNING] OCR backend '{name}' unavailable ({e}), using spawn", flush=True)
+            backend = _backend_instances.get('spawn') or SpawnBackend()
+            _backend_instances['spawn'] = backend
+        _backend_instances[name] = backend
+    return backend
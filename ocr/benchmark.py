@@ -0,0 +1,474 @@
+# -*- coding: utf-8 -*-
+"""
+OCR Benchmarks - Speed and accuracy of OCR settings on real statements
+
+Pages are rendered once per file, then OCRed with every setting under test
+so only that setting differs between runs.
+
+backends:   pages/sec of each tesseract backend (spawn vs tesserocr)
+preprocess: tesseract time per page and transaction recall of each
+            preprocessing preset. Recall is measured against an expected
+            transactions file (--expected) or, without one, against the
+            transactions parsed from unpreprocessed pages.
+text:       pages/sec of each digital text backend (pdfplumber vs pdftotext)
+            and whether its parsed transactions match the golden output
+            (--expected, else pdfplumber's), summarised per bank template
+            with the fastest backend that still parses correctly
+lines:      lines/sec of each bank template's transaction_patterns, tried
+            one by one vs through the compiled prefilter (see
+            parsers/compiled_template.py), on the lines of statement PDFs
+            (text layer / OCR) or .txt files, and whether both pick the
+            same pattern for every line
+
+Usage:
+    python -m ocr.benchmark backends statement.pdf [more.pdf ...] --pages 10
+    python -m ocr.benchmark backends statement.pdf --backends spawn tesserocr
+    python -m ocr.benchmark preprocess statement.pdf --presets none clean binarize fast
+    python -m ocr.benchmark preprocess statement.pdf --expected expected.json
+    python -m ocr.benchmark text statements/*.pdf --expected expected.json
+    python -m ocr.benchmark lines statements/*.pdf statement.txt --repeat 20
+    python -m ocr.benchmark lines statement.txt --banks Truist CrossFirst
+
+expected.json maps PDF file names to their transactions:
+    {"statement.pdf": [{"date": "01/05/2024", "amount": -1000.00}, ...]}
+Dates may be in any of config.DATE_FORMATS_TO_TRY (e.g. 2024-01-05); both
+sides are normalized to MM/DD/YYYY before matching.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr.rasterizer import iter_pages
+from ocr.backends import get_backend
+from ocr.engine import ocr_page
+from ocr.preprocess import PRESETS, preprocess_image
+from ocr.digital import extract_page_texts, get_text_backend
+from ocr.profiles import detect_bank, load_bank_templates
+
+try:
+    from config import DATE_FORMAT, DATE_FORMATS_TO_TRY
+except ImportError:
+    DATE_FORMAT = "%m/%d/%Y"
+    DATE_FORMATS_TO_TRY = ["%m/%d/%Y", "%Y-%m-%d"]
+
+
+def load_pages(files: List[str], dpi: int = 300, max_pages: int = 0) -> List:
+    """Render up to max_pages pages (0 = all) from each file."""
+    images = []
+    for file_path in files:
+        images.extend(load_file_pages(file_path, dpi, max_pages))
+    return images
+
+
+def load_file_pages(file_path: str, dpi: int, max_pages: int = 0) -> List:
+    """Render up to max_pages pages (0 = all) of one file."""
+    return [image for _, image in iter_pages(file_path, dpi, last_page=max_pages or None)]
+
+
+def benchmark_backend(name: str, images: List, config: str, repeat: int = 1) -> Dict:
+    """
+    OCR every image with one backend.
+
+    Returns:
+        Dict with backend, pages, seconds, pages_per_sec and chars (output size)
+    """
+    backend = get_backend(name)
+    if backend.name != name:
+        return {'backend': name, 'error': 'unavailable'}
+
+    # Warm-up call so one-time engine/traineddata loading is reported separately
+    start = time.perf_counter()
+    backend.image_to_string(images[0], config=config)
+    warmup = time.perf_counter() - start
+
+    chars = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for image in images:
+            chars += len(backend.image_to_string(image, config=config))
+    seconds = time.perf_counter() - start
+    pages = len(images) * repeat
+
+    return {
+        'backend': name,
+        'pages': pages,
+        'warmup_seconds': round(warmup, 3),
+        'seconds': round(seconds, 3),
+        'pages_per_sec': round(pages / seconds, 2) if seconds else 0.0,
+        'chars': chars,
+    }
+
+
+def parse_transactions(text: str) -> List[Dict]:
+    """Run SmartParser's template parsing on OCR text (without synthetic adjustment rows)."""
+    from parsers.smart_parser import SmartParser
+    parser = SmartParser(use_ai_fallback=False)
+    parser.debug = False
+    return [t for t in parser.parse_text(parser._clean_text(text)) if t.get('parsed_by') != 'adjustment']
+
+
+def normalize_date(value) -> str:
+    """A transaction date as MM/DD/YYYY (unchanged if no known format matches)."""
+    text = str(value).strip()
+    for date_format in DATE_FORMATS_TO_TRY:
+        try:
+            return datetime.strptime(text, date_format).strftime(DATE_FORMAT)
+        except ValueError:
+            continue
+    return text
+
+
+def transaction_counts(transactions: List[Dict]) -> Counter:
+    """Multiset of (date, amount) pairs, dates normalized to MM/DD/YYYY."""
+    return Counter((normalize_date(t.get('date')), round(float(t.get('amount', 0)), 2))
+                   for t in transactions)
+
+
+def transaction_recall(found: List[Dict], expected: List[Dict]) -> float:
+    """Fraction of expected (date, amount) pairs found, counting duplicates."""
+    if not expected:
+        return 1.0
+    found_counts = transaction_counts(found)
+    expected_counts = transaction_counts(expected)
+    matched = sum(min(count, found_counts[k]) for k, count in expected_counts.items())
+    return matched / sum(expected_counts.values())
+
+
+def benchmark_preprocess(images: List, preset: str, dpi: int) -> Dict:
+    """
+    OCR every page with one preprocessing preset.
+
+    Returns:
+        Dict with preset, preprocess_ms (per page), ocr_seconds (per page),
+        passes and the assembled text
+    """
+    preprocess_time = ocr_time = 0.0
+    passes = 0
+    text = ''
+    for page_number, image in enumerate(images, 1):
+        start = time.perf_counter()
+        prepared = preprocess_image(image, preset)
+        preprocess_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = ocr_page(prepared, page_number, dpi=dpi)
+        ocr_time += time.perf_counter() - start
+
+        passes += result['passes']
+        if result['text']:
+            text += result['text'] + "\n"
+
+    pages = max(1, len(images))
+    return {
+        'preset': preset,
+        'preprocess_ms': round(preprocess_time * 1000 / pages, 1),
+        'ocr_seconds': round(ocr_time / pages, 3),
+        'passes': passes,
+        'text': text,
+    }
+
+
+def benchmark_text_backend(name: str, file_path: str, repeat: int = 1) -> Dict:
+    """
+    Extract a PDF's text layer with one text backend (in-process, so only the backend differs).
+
+    Returns:
+        Dict with backend, pages, seconds, pages_per_sec and the assembled text
+    """
+    if get_text_backend(name).name != name:
+        return {'backend': name, 'error': 'unavailable'}
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        page_texts = extract_page_texts(file_path, workers=1, backend=name)
+    seconds = (time.perf_counter() - start) / repeat
+
+    return {
+        'backend': name,
+        'pages': len(page_texts),
+        'seconds': round(seconds, 3),
+        'pages_per_sec': round(len(page_texts) / seconds, 2) if seconds else 0.0,
+        'text': ''.join(page_text + "\n" for page_text in page_texts if page_text),
+    }
+
+
+def load_statement_text(file_path: str) -> str:
+    """Statement text of a PDF (shared extraction: text layer, OCR, cache) or of a text file."""
+    if file_path.lower().endswith('.pdf'):
+        from ocr.extraction import get_extraction_service
+        return get_extraction_service().extract(file_path)['text']
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def match_lines(compiled, lines: List[str], prefilter: bool) -> List:
+    """Name of the first transaction pattern matching each line (None if none does)."""
+    matched = []
+    for line in lines:
+        candidates = compiled.prefilter.candidates(line) if prefilter else compiled.transaction_patterns
+        matched.append(next((pattern.name for pattern in candidates if pattern.regex.match(line)), None))
+    return matched
+
+
+def benchmark_line_matching(compiled, lines: List[str], repeat: int = 1) -> Dict:
+    """
+    Time a template's line matching with and without the pattern prefilter
+    (best of `repeat` passes per mode).
+
+    Returns:
+        Dict with lines, matched, seconds / lines_per_sec per mode ('patterns',
+        'prefilter') and whether both modes matched every line the same way
+    """
+    result = {'lines': len(lines)}
+    matched = {}
+    for mode, prefilter in (('patterns', False), ('prefilter', True)):
+        seconds = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            matched[mode] = match_lines(compiled, lines, prefilter)
+            elapsed = time.perf_counter() - start
+            seconds = elapsed if seconds is None else min(seconds, elapsed)  # Best pass
+        result[mode] = {'seconds': seconds,
+                        'lines_per_sec': len(lines) / seconds if seconds else 0.0}
+    result['matched'] = sum(1 for name in matched['prefilter'] if name)
+    result['identical'] = matched['patterns'] == matched['prefilter']
+    return result
+
+
+def run_backends(args):
+    images = load_pages(args.files, dpi=args.dpi, max_pages=args.pages)
+    if not images:
+        print("[ERROR] No pages rendered", flush=True)
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"OCR backend benchmark: {len(images)} pages @ {args.dpi} DPI, config '{args.config}'")
+    print("=" * 60)
+
+    results = [benchmark_backend(name, images, args.config, args.repeat) for name in args.backends]
+    baseline = next((r for r in results if r['backend'] == 'spawn' and 'error' not in r), None)
+
+    for r in results:
+        if 'error' in r:
+            print(f"  {r['backend']:<10} unavailable")
+            continue
+        speedup = ''
+        if baseline and r is not baseline and baseline['pages_per_sec']:
+            speedup = f"  ({r['pages_per_sec'] / baseline['pages_per_sec']:.2f}x spawn)"
+        print(f"  {r['backend']:<10} {r['pages_per_sec']:>7.2f} pages/sec  "
+              f"{r['seconds']:>8.2f}s  warm-up {r['warmup_seconds']:.2f}s  {r['chars']} chars{speedup}")
+    print("=" * 60)
+
+
+def run_preprocess(args):
+    expected_all = {}
+    if args.expected:
+        with open(args.expected, 'r', encoding='utf-8') as f:
+            expected_all = json.load(f)
+
+    presets = args.presets
+    if not expected_all and 'none' not in presets:
+        presets = ['none'] + presets  # Reference transactions come from unpreprocessed pages
+
+    totals = {preset: {'preprocess_ms': 0.0, 'ocr_seconds': 0.0, 'recall': 0.0, 'files': 0}
+              for preset in presets}
+
+    print("=" * 72)
+    print(f"OCR preprocessing benchmark @ {args.dpi} DPI")
+    print("=" * 72)
+
+    for file_path in args.files:
+        images = load_file_pages(file_path, args.dpi, args.pages)
+        if not images:
+            print(f"[WARNING] No pages rendered from {file_path}", flush=True)
+            continue
+
+        runs = [benchmark_preprocess(images, preset, args.dpi) for preset in presets]
+        parsed = {run['preset']: parse_transactions(run['text']) for run in runs}
+
+        expected = expected_all.get(os.path.basename(file_path))
+        reference = 'expected' if expected is not None else "preset 'none'"
+        if expected is None:
+            expected = parsed['none']
+
+        print(f"\n{os.path.basename(file_path)} ({len(images)} pages, {len(expected)} reference "
+              f"transactions from {reference})")
+        print(f"  {'preset':<10} {'prep ms/pg':>10} {'ocr s/pg':>9} {'passes':>7} {'txns':>5} {'recall':>7}")
+        for run in runs:
+            recall = transaction_recall(parsed[run['preset']], expected)
+            print(f"  {run['preset']:<10} {run['preprocess_ms']:>10.1f} {run['ocr_seconds']:>9.3f} "
+                  f"{run['passes']:>7} {len(parsed[run['preset']]):>5} {recall:>7.1%}")
+            total = totals[run['preset']]
+            total['preprocess_ms'] += run['preprocess_ms']
+            total['ocr_seconds'] += run['ocr_seconds']
+            total['recall'] += recall
+            total['files'] += 1
+
+    if len(args.files) > 1:
+        print(f"\nAverage over {len(args.files)} files")
+        for preset, total in totals.items():
+            files = max(1, total['files'])
+            print(f"  {preset:<10} {total['preprocess_ms'] / files:>10.1f} "
+                  f"{total['ocr_seconds'] / files:>9.3f} {'':>7} {'':>5} {total['recall'] / files:>7.1%}")
+    print("=" * 72)
+
+
+def run_text(args):
+    expected_all = {}
+    if args.expected:
+        with open(args.expected, 'r', encoding='utf-8') as f:
+            expected_all = json.load(f)
+
+    # bank -> backend -> {'pages', 'seconds', 'correct', 'files'}
+    per_bank = {}
+
+    print("=" * 72)
+    print("Digital text backend benchmark")
+    print("=" * 72)
+
+    for file_path in args.files:
+        runs = [benchmark_text_backend(name, file_path, args.repeat) for name in args.backends]
+        available = [run for run in runs if 'error' not in run]
+        if not available:
+            print(f"[WARNING] No text backend available for {file_path}", flush=True)
+            continue
+
+        bank_name = detect_bank(available[0]['text'])[0] or 'Unknown'
+        parsed = {run['backend']: parse_transactions(run['text']) for run in available}
+
+        expected = expected_all.get(os.path.basename(file_path))
+        reference = 'expected'
+        if expected is None:
+            golden = next((run for run in available if run['backend'] == 'pdfplumber'), available[0])
+            expected = parsed[golden['backend']]
+            reference = golden['backend']
+
+        print(f"\n{os.path.basename(file_path)} [{bank_name}] ({available[0]['pages']} pages, "
+              f"{len(expected)} golden transactions from {reference})")
+        print(f"  {'backend':<12} {'seconds':>8} {'pages/s':>8} {'txns':>5} {'recall':>7} {'golden':>7}")
+        for run in runs:
+            if 'error' in run:
+                print(f"  {run['backend']:<12} unavailable")
+                continue
+            found = parsed[run['backend']]
+            recall = transaction_recall(found, expected)
+            correct = transaction_counts(found) == transaction_counts(expected)
+            print(f"  {run['backend']:<12} {run['seconds']:>8.3f} {run['pages_per_sec']:>8.1f} "
+                  f"{len(found):>5} {recall:>7.1%} {'match' if correct else 'DIFF':>7}")
+
+            totals = per_bank.setdefault(bank_name, {}).setdefault(
+                run['backend'], {'pages': 0, 'seconds': 0.0, 'correct': True, 'files': 0})
+            totals['pages'] += run['pages']
+            totals['seconds'] += run['seconds']
+            totals['correct'] = totals['correct'] and correct
+            totals['files'] += 1
+
+    print(f"\n{'-' * 72}\nPer bank template")
+    for bank_name, backends in sorted(per_bank.items()):
+        ranked = sorted(backends.items(), key=lambda item: item[1]['seconds'] / max(1, item[1]['pages']))
+        for name, totals in ranked:
+            rate = totals['pages'] / totals['seconds'] if totals['seconds'] else 0.0
+            print(f"  {bank_name:<16} {name:<12} {rate:>8.1f} pages/s  "
+                  f"{'all match' if totals['correct'] else 'DIFFERS':<10} ({totals['files']} file(s))")
+        best = next((name for name, totals in ranked if totals['correct']), None)
+        if best and bank_name != 'Unknown':
+            print(f"  -> {bank_name}: \"ocr\": {{\"text_backend\": \"{best}\"}}")
+    print("=" * 72)
+
+
+def run_lines(args):
+    from parsers.compiled_template import CompiledTemplate
+
+    templates = load_bank_templates()
+    compiled = {name: CompiledTemplate(name, template) for name, template in templates.items()
+                if template.get('transaction_patterns')}
+    unknown = [name for name in args.banks or [] if name not in compiled]
+    if unknown:
+        print(f"[WARNING] No transaction_patterns template for: {', '.join(unknown)}", flush=True)
+
+    # bank -> lines, from every file detected as that bank (or from every file with --banks)
+    lines_by_bank = {}
+    for file_path in args.files:
+        text = load_statement_text(file_path)
+        # Same line preparation as the template parser: stripped, 5+ characters
+        lines = [line.strip() for line in text.split('\n') if len(line.strip()) >= 5]
+        banks = [name for name in args.banks if name in compiled] if args.banks else [detect_bank(text)[0]]
+        for bank_name in banks:
+            if bank_name not in compiled:
+                print(f"[INFO] {os.path.basename(file_path)}: {bank_name or 'no bank detected'} "
+                      f"has no transaction_patterns, skipped", flush=True)
+                continue
+            lines_by_bank.setdefault(bank_name, []).extend(lines)
+
+    print("=" * 72)
+    print("Template line matching benchmark (lines/sec)")
+    print("=" * 72)
+    print(f"  {'bank':<16} {'lines':>7} {'matched':>7} {'patterns':>11} {'prefilter':>11} "
+          f"{'speedup':>7} {'same':>5}")
+    for bank_name, lines in sorted(lines_by_bank.items()):
+        prefilter = compiled[bank_name].prefilter
+        result = benchmark_line_matching(compiled[bank_name], lines, args.repeat)
+        speedup = result['patterns']['seconds'] / max(result['prefilter']['seconds'], 1e-9)
+        print(f"  {bank_name:<16} {result['lines']:>7} {result['matched']:>7} "
+              f"{result['patterns']['lines_per_sec']:>11,.0f} {result['prefilter']['lines_per_sec']:>11,.0f} "
+              f"{speedup:>6.1f}x {'yes' if result['identical'] else 'NO':>5}")
+        print(f"  {'':<16} {len(prefilter.patterns)} pattern(s), leading digit: "
+              f"{'yes' if prefilter.leading_digit else 'no'}, combined regex: "
+              f"{'yes' if prefilter._match else 'no'}")
+    print("=" * 72)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='OCR speed/accuracy benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    backends = commands.add_parser('backends', help='Compare OCR backend throughput (pages/sec)')
+    backends.add_argument('files', nargs='+', help='PDF files to OCR')
+    backends.add_argument('--backends', nargs='+', default=['spawn', 'tesserocr'],
+                          help='Backends to compare (default: spawn tesserocr)')
+    backends.add_argument('--pages', type=int, default=5, help='Pages per file (0 = all, default: 5)')
+    backends.add_argument('--dpi', type=int, default=300, help='Render DPI (default: 300)')
+    backends.add_argument('--repeat', type=int, default=1, help='Passes over the page set (default: 1)')
+    backends.add_argument('--config', default='--oem 3 --psm 6', help='Tesseract config')
+
+    preprocess = commands.add_parser('preprocess', help='Compare preprocessing presets (time + recall)')
+    preprocess.add_argument('files', nargs='+', help='PDF files to OCR')
+    preprocess.add_argument('--presets', nargs='+', default=list(PRESETS),
+                            help=f"Presets to compare (default: {' '.join(PRESETS)})")
+    preprocess.add_argument('--expected', help='JSON of expected transactions per file name')
+    preprocess.add_argument('--pages', type=int, default=0, help='Pages per file (0 = all, default: 0)')
+    preprocess.add_argument('--dpi', type=int, default=350, help='Render DPI (default: 350)')
+
+    text = commands.add_parser('text', help='Compare digital text backends (speed + golden output)')
+    text.add_argument('files', nargs='+', help='Digital PDF files')
+    text.add_argument('--backends', nargs='+', default=['pdfplumber', 'pdftotext'],
+                      help='Text backends to compare (default: pdfplumber pdftotext)')
+    text.add_argument('--expected', help='JSON of expected transactions per file name')
+    text.add_argument('--repeat', type=int, default=1, help='Extractions per backend (default: 1)')
+
+    lines = commands.add_parser('lines', help='Template line matching speed (lines/sec per bank)')
+    lines.add_argument('files', nargs='+', help='Statement PDFs or text files')
+    lines.add_argument('--banks', nargs='+', help='Templates to run on every file (default: detected bank)')
+    lines.add_argument('--repeat', type=int, default=10, help='Passes over the lines (default: 10)')
+
+    args = parser.parse_args()
+    if args.command == 'backends':
+        run_backends(args)
+    elif args.command == 'text':
+        run_text(args)
+    elif args.command == 'lines':
+        run_lines(args)
+    else:
+        run_preprocess(args)
+
+
+if __name__ == "__main__":
+    main()
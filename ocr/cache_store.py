@@ -0,0 +1,493 @@
+# -*- coding: utf-8 -*-
+"""
+OCR Cache Store - Managed on-disk store for OCR results
+
+Replaces the unbounded data/ocr_cache/*.txt files with a store that:
+- Compresses entries (zstd if the `zstandard` package is installed, else gzip)
+- Versions keys: CACHE_FORMAT_VERSION + OCR settings + tesseract version
+- Enforces a byte budget (OCR_CACHE_MAX_MB) with least-recently-used
+  eviction; a hit refreshes the entry's mtime, so mtime order is LRU order
+- Expires entries older than OCR_CACHE_MAX_AGE_DAYS
+- Keeps hit/miss/write/eviction counters and a running size estimate in
+  stats.json for /api/ocr-cache/stats
+- Optionally sits in front of a shared remote tier (MongoDB GridFS, see
+  remote_cache.py) so OCR results are reused across app nodes
+
+Entries live under <cache_dir>/<namespace>/<key[:2]>/<key>.bin:
+- documents: whole-document OCR text (SmartParser)
+- pages:     per-page OCR results (OCREngine)
+
+Each entry is JSON, compressed; the codec is detected from the file's magic
+bytes, so changing OCR_CACHE_COMPRESSION never invalidates existing entries.
+Counters are best-effort: each process counts in memory and merges its
+deltas into stats.json at most every STATS_FLUSH_SECONDS, at the end of a
+document and when the process (e.g. an OCR pool worker) exits; a rare lost
+update (only possible where fcntl is missing, i.e. Windows) only skews the
+stats. The byte budget runs off the size estimate
+kept in stats.json, so a new process doesn't walk the cache directory - the
+full scan happens only when there is no estimate yet and in prune().
+"""
+
+import os
+import json
+import gzip
+import time
+import hashlib
+import tempfile
+import threading
+from multiprocessing import util as mp_util
+from typing import Dict, Optional
+
+try:
+    import pytesseract
+    TESSERACT_AVAILABLE = True
+except ImportError:
+    TESSERACT_AVAILABLE = False
+
+try:
+    import fcntl  # POSIX: serializes stats.json merges between processes
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+try:
+    from config import DATA_DIR, OCR_CACHE_MAX_MB, OCR_CACHE_MAX_AGE_DAYS, OCR_CACHE_COMPRESSION
+except ImportError:
+    DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+    OCR_CACHE_MAX_MB = 2048
+    OCR_CACHE_MAX_AGE_DAYS = 90
+    OCR_CACHE_COMPRESSION = 'zstd'
+
+# Bump when the entry layout changes - old entries simply stop matching and age out
+CACHE_FORMAT_VERSION = 2
+
+DEFAULT_CACHE_DIR = os.path.join(DATA_DIR, 'ocr_cache')
+
+# Evict down to this fraction of the budget so sweeps don't run on every write
+LOW_WATERMARK = 0.9
+
+_GZIP_MAGIC = b'\x1f\x8b'
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+_STATS_FILE = 'stats.json'
+_SIZE_KEY = 'approx_bytes'
+_COUNTERS = ('hits', 'misses', 'writes', 'evictions', 'expired', 'bytes_written', 'bytes_evicted',
+             'remote_hits', 'remote_writes')
+
+# Counters are merged into stats.json at most this often (plus at document end / process exit)
+STATS_FLUSH_SECONDS = 30
+
+# Namespaces mirrored to the remote tier. Whole-document entries are looked up
+# in the web process; per-page entries are read and written inside OCR worker
+# processes, which don't share the app's MongoDB connection, so they stay local.
+REMOTE_NAMESPACES = ('documents',)
+
+_tesseract_version = None
+
+
+def get_tesseract_version() -> str:
+    """Installed tesseract version (looked up once per process)."""
+    global _tesseract_version
+    if _tesseract_version is None:
+        try:
+            _tesseract_version = str(pytesseract.get_tesseract_version())
+        except Exception:
+            _tesseract_version = 'unknown'
+    return _tesseract_version
+
+
+def _compress(data: bytes, codec: str) -> bytes:
+    if codec == 'zstd' and ZSTD_AVAILABLE:
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    if codec in ('zstd', 'gzip'):
+        return gzip.compress(data, compresslevel=6)
+    return data
+
+
+def _decompress(data: bytes) -> bytes:
+    if data.startswith(_ZSTD_MAGIC):
+        if not ZSTD_AVAILABLE:
+            raise ValueError("zstd-compressed entry but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if data.startswith(_GZIP_MAGIC):
+        return gzip.decompress(data)
+    return data
+
+
+class OCRCacheStore:
+    """
+    Size-capped, compressed, versioned OCR result store.
+
+    Usage:
+        store = get_cache_store()
+        key = store.make_key(file_hash, settings={'mode': 'psm'})
+        entry = store.get('documents', key)
+        if entry is None:
+            store.put('documents', key, {'text': text})
+    """
+
+    def __init__(self, cache_dir: str = None, max_bytes: int = None,
+                 max_age_days: int = None, compression: str = None):
+        """
+        Initialize cache store.
+
+        Args:
+            cache_dir: Root directory (default: data/ocr_cache)
+            max_bytes: Byte budget (default: OCR_CACHE_MAX_MB; 0 = unlimited)
+            max_age_days: Expire entries older than this (default: OCR_CACHE_MAX_AGE_DAYS; 0 = never)
+            compression: 'zstd', 'gzip' or 'none' (default: OCR_CACHE_COMPRESSION)
+        """
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else OCR_CACHE_MAX_MB * 1024 * 1024
+        self.max_age_days = max_age_days if max_age_days is not None else OCR_CACHE_MAX_AGE_DAYS
+        self.compression = (compression or OCR_CACHE_COMPRESSION or 'none').lower()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._pending = {name: 0 for name in _COUNTERS}
+        self._approx_bytes = None  # Running size estimate, seeded from stats.json (or one scan)
+        self._bytes_delta = 0  # Size change not yet merged into stats.json
+        self._bytes_exact = None  # Size measured by a scan since the last flush
+        self._last_flush = time.monotonic()
+        self._pid = None  # Process whose counters _pending holds (see _adopt_process)
+        self.remote = None  # Optional shared tier (get/put of entry bytes)
+
+    def set_remote_tier(self, tier):
+        """Attach a shared tier with get(namespace, key) -> bytes and put(namespace, key, bytes)."""
+        self.remote = tier
+
+    # ------------------------------------------------------------------ keys
+
+    @staticmethod
+    def make_key(*parts, settings: Optional[Dict] = None) -> str:
+        """Versioned key from content identifiers plus the OCR settings that produced them."""
+        material = [f"v{CACHE_FORMAT_VERSION}"] + [str(p) for p in parts] + [
+            json.dumps(settings or {}, sort_keys=True),
+            get_tesseract_version(),
+        ]
+        return hashlib.sha256('|'.join(material).encode('utf-8')).hexdigest()
+
+    def _path(self, namespace: str, key: str) -> str:
+        # Two-level fan-out keeps directories small on long-lived nodes
+        return os.path.join(self.cache_dir, namespace, key[:2], f"{key}.bin")
+
+    # ------------------------------------------------------------- get / put
+
+    def get(self, namespace: str, key: str) -> Optional[Dict]:
+        """
+        Return the stored entry or None. A hit marks the entry as recently used.
+
+        A local miss falls through to the remote tier (if any); remote hits
+        are written to the local store so the next lookup stays local.
+        """
+        path = self._path(namespace, key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path, None)  # LRU: mtime = last access
+            counter = 'hits'
+        except FileNotFoundError:
+            data = None
+            if self.remote is not None and namespace in REMOTE_NAMESPACES:
+                data = self.remote.get(namespace, key)
+            if data is None:
+                self._count('misses')
+                return None
+            self._write_local(path, data)
+            counter = 'remote_hits'
+        except OSError as e:
+            print(f"[WARNING] Failed to read OCR cache entry: {e}", flush=True)
+            data, counter = None, 'misses'
+
+        entry = None
+        if data is not None:
+            try:
+                entry = json.loads(_decompress(data).decode('utf-8'))
+            except Exception as e:
+                print(f"[WARNING] Failed to decode OCR cache entry: {e}", flush=True)
+
+        self._count(counter if entry is not None else 'misses')
+        return entry
+
+    def put(self, namespace: str, key: str, entry: Dict):
+        """Store an entry atomically (and in the remote tier), then evict if over budget."""
+        path = self._path(namespace, key)
+        try:
+            data = _compress(json.dumps(entry).encode('utf-8'), self.compression)
+        except Exception as e:
+            print(f"[WARNING] Failed to encode OCR cache entry: {e}", flush=True)
+            return
+        if not self._write_local(path, data):
+            return
+
+        self._count('writes')
+        self._count('bytes_written', len(data))
+
+        if self.remote is not None and namespace in REMOTE_NAMESPACES:
+            if self.remote.put(namespace, key, data):
+                self._count('remote_writes')
+
+    def _write_local(self, path: str, data: bytes) -> bool:
+        """Atomically write entry bytes and keep the byte budget."""
+        if self._pid != os.getpid():
+            self._adopt_process()
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _atomic_write(path, data)
+        except Exception as e:
+            print(f"[WARNING] Failed to write OCR cache entry: {e}", flush=True)
+            return False
+
+        measured = False
+        with self._lock:
+            if self._approx_bytes is None:
+                self._approx_bytes = self._read_size()
+            if self._approx_bytes is None:
+                # No estimate in stats.json yet - measure once (and publish it right away)
+                self._approx_bytes = self._bytes_exact = self._scan()['bytes']
+                measured = True
+            else:
+                self._approx_bytes += len(data)
+                self._bytes_delta += len(data)
+            over_budget = self.max_bytes and self._approx_bytes > self.max_bytes
+        if over_budget:
+            self.prune()
+        elif measured:
+            self.flush_stats()
+        return True
+
+    # -------------------------------------------------------------- eviction
+
+    def _entries(self):
+        """Yield (path, size, mtime) for every entry, including legacy *.txt/*.json files."""
+        for root, _dirs, files in os.walk(self.cache_dir):
+            for name in files:
+                if name in (_STATS_FILE, _STATS_FILE + '.lock') or name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                yield path, st.st_size, st.st_mtime
+
+    def _scan(self) -> Dict:
+        entries = 0
+        size = 0
+        for _path, entry_size, _mtime in self._entries():
+            entries += 1
+            size += entry_size
+        return {'entries': entries, 'bytes': size}
+
+    def prune(self) -> Dict:
+        """
+        Expire old entries, then evict least-recently-used ones until the
+        store is under LOW_WATERMARK of the byte budget.
+
+        Returns:
+            Dict with expired, evicted and bytes_freed counts
+        """
+        entries = sorted(self._entries(), key=lambda e: e[2])
+        now = time.time()
+        max_age = self.max_age_days * 86400 if self.max_age_days else None
+        total = sum(size for _path, size, _mtime in entries)
+        target = self.max_bytes * LOW_WATERMARK if self.max_bytes else None
+
+        expired = evicted = freed = 0
+        for path, size, mtime in entries:
+            is_expired = max_age is not None and now - mtime > max_age
+            over_budget = target is not None and total > target
+            if not (is_expired or over_budget):
+                if max_age is None:
+                    break
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            freed += size
+            if is_expired:
+                expired += 1
+            else:
+                evicted += 1
+
+        with self._lock:
+            self._approx_bytes = self._bytes_exact = total
+            self._bytes_delta = 0
+        self._count('expired', expired)
+        self._count('evictions', evicted)
+        self._count('bytes_evicted', freed)
+        self.flush_stats()
+
+        if expired or evicted:
+            print(f"[INFO] OCR cache pruned: {evicted} evicted, {expired} expired, "
+                  f"{freed / (1024 * 1024):.1f} MB freed", flush=True)
+        return {'expired': expired, 'evicted': evicted, 'bytes_freed': freed}
+
+    def clear(self) -> int:
+        """Remove every entry. Returns the number of files removed."""
+        removed = 0
+        for path, _size, _mtime in list(self._entries()):
+            try:
+                os.remove(path)
+                removed += 1
+            except OSError:
+                pass
+        with self._lock:
+            self._approx_bytes = self._bytes_exact = 0
+            self._bytes_delta = 0
+        self.flush_stats()
+        return removed
+
+    # ----------------------------------------------------------------- stats
+
+    def _adopt_process(self):
+        """
+        First use in this process: start counting from zero and flush on exit.
+
+        A forked OCR worker inherits the parent's store with its unflushed
+        counters (the parent merges those itself) and without its exit hook
+        (multiprocessing drops inherited finalizers), so both are redone here.
+        """
+        self._lock = threading.Lock()
+        self._pending = {name: 0 for name in _COUNTERS}
+        self._bytes_delta, self._bytes_exact = 0, None
+        self._last_flush = time.monotonic()
+        self._pid = os.getpid()
+        # Runs at interpreter exit, and when a multiprocessing worker finishes
+        mp_util.Finalize(None, self.flush_stats, exitpriority=10)
+
+    def _count(self, name: str, amount: int = 1):
+        if self._pid != os.getpid():
+            self._adopt_process()
+        with self._lock:
+            self._pending[name] += amount
+            due = time.monotonic() - self._last_flush >= STATS_FLUSH_SECONDS
+        if due:
+            self.flush_stats()
+
+    def _load_stats(self) -> Dict:
+        path = os.path.join(self.cache_dir, _STATS_FILE)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception:
+            return {}
+
+    def _read_stats(self) -> Dict:
+        stats = self._load_stats()
+        return {name: int(stats.get(name, 0)) for name in _COUNTERS}
+
+    def _read_size(self) -> Optional[int]:
+        """Size estimate persisted in stats.json (None if there is none yet)."""
+        size = self._load_stats().get(_SIZE_KEY)
+        return int(size) if size is not None else None
+
+    def flush_stats(self):
+        """Merge this process's counter deltas and size change into stats.json."""
+        with self._lock:
+            self._last_flush = time.monotonic()
+            pending, delta, exact = self._pending, self._bytes_delta, self._bytes_exact
+            if not any(pending.values()) and not delta and exact is None:
+                return
+            self._pending = {name: 0 for name in _COUNTERS}
+            self._bytes_delta, self._bytes_exact = 0, None
+
+            lock_fd = self._lock_stats()
+            try:
+                stats = self._load_stats()
+                merged = {name: int(stats.get(name, 0)) + pending[name] for name in _COUNTERS}
+                if exact is not None:
+                    merged[_SIZE_KEY] = exact + delta
+                elif stats.get(_SIZE_KEY) is not None:
+                    merged[_SIZE_KEY] = max(0, int(stats[_SIZE_KEY]) + delta)
+                if merged.get(_SIZE_KEY) is not None:
+                    # Pick up other processes' writes for the budget check
+                    self._approx_bytes = merged[_SIZE_KEY]
+
+                _atomic_write(os.path.join(self.cache_dir, _STATS_FILE),
+                              json.dumps(merged).encode('utf-8'))
+            except Exception as e:
+                print(f"[WARNING] Failed to write OCR cache stats: {e}", flush=True)
+            finally:
+                if lock_fd is not None:
+                    os.close(lock_fd)  # Releases the flock
+
+    def _lock_stats(self) -> Optional[int]:
+        """Exclusive lock on stats.json.lock (POSIX); None where locking isn't available."""
+        if not FCNTL_AVAILABLE:
+            return None
+        try:
+            fd = os.open(os.path.join(self.cache_dir, _STATS_FILE + '.lock'), os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError:
+            return None
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        except OSError:
+            os.close(fd)
+            return None
+        return fd
+
+    def stats(self) -> Dict:
+        """Counters, hit rate and current size per namespace."""
+        self.flush_stats()
+        counters = self._read_stats()
+        lookups = counters['hits'] + counters['misses']
+
+        namespaces = {}
+        for path, size, _mtime in self._entries():
+            relative = os.path.relpath(path, self.cache_dir)
+            namespace = relative.split(os.sep)[0] if os.sep in relative else 'legacy'
+            bucket = namespaces.setdefault(namespace, {'entries': 0, 'bytes': 0})
+            bucket['entries'] += 1
+            bucket['bytes'] += size
+
+        total_bytes = sum(b['bytes'] for b in namespaces.values())
+        return {
+            **counters,
+            'hit_rate': round(counters['hits'] / lookups, 4) if lookups else 0.0,
+            'entries': sum(b['entries'] for b in namespaces.values()),
+            'bytes': total_bytes,
+            'max_bytes': self.max_bytes,
+            'usage': round(total_bytes / self.max_bytes, 4) if self.max_bytes else None,
+            'max_age_days': self.max_age_days,
+            'compression': self.compression if (self.compression != 'zstd' or ZSTD_AVAILABLE) else 'gzip',
+            'namespaces': namespaces,
+            'remote': self.remote.stats() if self.remote is not None else None,
+        }
+
+
+def _atomic_write(path: str, data: bytes):
+    """Write through a unique temp file in the same directory, then rename over `path`."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.',
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# One store per directory per process (keeps the running size estimate warm)
+_store_instances = {}
+
+
+def get_cache_store(cache_dir: str = None) -> OCRCacheStore:
+    """Get the process-wide OCR cache store (default: data/ocr_cache)."""
+    cache_dir = cache_dir or DEFAULT_CACHE_DIR
+    store = _store_instances.get(cache_dir)
+    if store is None:
+        store = _store_instances[cache_dir] = OCRCacheStore(cache_dir)
+    return store
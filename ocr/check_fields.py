@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Check-Image Field OCR - Structured payee / amount / check number per check tile
+
+Statements with check-image pages (e.g. Farmers) used to get the payee by
+scanning 500-character windows of the full-page OCR text backwards from
+each "07/24/25 - $720.00 - #1500" annotation. With field OCR enabled, each
+check tile found by triage.find_check_tiles() is cropped into its fields and
+only those are OCRed, single-line, with digits-only configs for the numeric
+fields:
+
+- check_number: top-right corner of the check
+- date:         date line
+- payee:        "Pay to the order of" line
+- amount:       amount box
+- caption:      bank annotation just below the tile (date - $amount - #number)
+
+Results are keyed by check number. Enabled with OCR_CHECK_FIELDS or a bank
+template's "ocr": {"check_fields": true}.
+"""
+
+import re
+from typing import Dict, List, Optional
+
+from .triage import find_check_tiles
+from .tessdata import PassTimer
+
+# Field boxes as fractions of the check tile (x0, y0, x1, y1); the caption
+# sits below the tile, so it extends past y = 1
+FIELD_BOXES = {
+    'check_number': (0.78, 0.02, 0.99, 0.20),
+    'date': (0.55, 0.15, 0.85, 0.32),
+    'payee': (0.08, 0.28, 0.74, 0.46),
+    'amount': (0.74, 0.28, 0.99, 0.46),
+    'caption': (0.00, 1.00, 1.00, 1.14),
+}
+
+# Single text line; numeric fields restricted to the characters they can contain
+TEXT_CONFIG = r'--oem 3 --psm 7'
+DIGITS_CONFIG = r'--oem 3 --psm 7 -c tessedit_char_whitelist=0123456789$,.#/-'
+FIELD_CONFIGS = {
+    'check_number': DIGITS_CONFIG,
+    'date': DIGITS_CONFIG,
+    'payee': TEXT_CONFIG,
+    'amount': DIGITS_CONFIG,
+    'caption': TEXT_CONFIG,
+}
+
+CAPTION_PATTERN = re.compile(r'(\d{1,2}/\d{1,2}/\d{2,4})\s*[-–]\s*\$?([0-9,]+\.\d{2})\s*[-–]\s*#(\d{3,6})')
+AMOUNT_PATTERN = re.compile(r'\d[\d,]*\.\d{2}')
+DATE_PATTERN = re.compile(r'\d{1,2}/\d{1,2}/\d{2,4}')
+PAYEE_PREFIX = re.compile(r'^(?:.*?order\s+of|.*?pay\s+to(?:\s+the)?)\s*[:\-]?\s*', re.IGNORECASE)
+
+
+def _field_box(tile, field_box, width: int, height: int):
+    """Pixel box of a field, given its tile (page fractions) and relative field box."""
+    tx0, ty0, tx1, ty1 = tile
+    fx0, fy0, fx1, fy1 = field_box
+    tile_w, tile_h = tx1 - tx0, ty1 - ty0
+    x0 = int((tx0 + fx0 * tile_w) * width)
+    y0 = int((ty0 + fy0 * tile_h) * height)
+    x1 = int((tx0 + fx1 * tile_w) * width)
+    y1 = int((ty0 + fy1 * tile_h) * height)
+    x0, y0 = max(0, min(x0, width - 1)), max(0, min(y0, height - 1))
+    return x0, y0, max(x0 + 1, min(x1, width)), max(y0 + 1, min(y1, height))
+
+
+def _parse_amount(text: str) -> Optional[float]:
+    match = AMOUNT_PATTERN.search(text or '')
+    if not match:
+        return None
+    try:
+        return float(match.group(0).replace(',', ''))
+    except ValueError:
+        return None
+
+
+def _parse_payee(text: str) -> Optional[str]:
+    payee = PAYEE_PREFIX.sub('', (text or '').strip())
+    payee = re.sub(r'[^A-Za-z0-9\s\.,&\'\-]', ' ', payee)
+    payee = re.sub(r'\s+', ' ', payee).strip(' .,-')
+    return payee if re.search(r'[A-Za-z]{2}', payee) else None
+
+
+def parse_check_fields(texts: Dict[str, str]) -> Dict:
+    """
+    Turn raw field OCR text into a check record.
+
+    The bank's caption is printed, not handwritten, so its date, amount and
+    check number win over the fields read from the check itself.
+
+    Returns:
+        Dict with check_number, date, amount, payee (None where unreadable)
+    """
+    record = {'check_number': None, 'date': None, 'amount': None,
+              'payee': _parse_payee(texts.get('payee'))}
+
+    number = re.search(r'\d{3,6}', texts.get('check_number', '') or '')
+    if number:
+        record['check_number'] = number.group(0)
+    date = DATE_PATTERN.search(texts.get('date', '') or '')
+    if date:
+        record['date'] = date.group(0)
+    record['amount'] = _parse_amount(texts.get('amount'))
+
+    caption = CAPTION_PATTERN.search(texts.get('caption', '') or '')
+    if caption:
+        record['date'] = caption.group(1)
+        record['amount'] = _parse_amount(caption.group(2))
+        record['check_number'] = caption.group(3)
+    return record
+
+
+def ocr_check_fields(image, tiles: List = None, timer: PassTimer = None) -> List[Dict]:
+    """
+    OCR the payee, amount, date and check-number fields of every check tile.
+
+    Args:
+        image: Page image
+        tiles: Check tile boxes as page fractions (default: find_check_tiles(image))
+        timer: Pass timer of the page (best model tier)
+
+    Returns:
+        One record per tile (see parse_check_fields()) plus 'tile' (its box)
+    """
+    if tiles is None:
+        tiles = find_check_tiles(image)
+    if not tiles:
+        return []
+
+    timer = timer or PassTimer()
+    width, height = image.size
+    jobs = []
+    for index, tile in enumerate(tiles):
+        for field, box in FIELD_BOXES.items():
+            jobs.append((index, field, image.crop(_field_box(tile, box, width, height))))
+
+    # Field crops are tiny; OCRed one after another in the page worker, so they reuse
+    # its tesseract engine and stay within its governor slot (pages run in parallel already)
+    texts = [timer.image_to_string(crop, FIELD_CONFIGS[field], step='check_field')
+             for _, field, crop in jobs]
+
+    fields = [{} for _ in tiles]
+    for (index, field, _), text in zip(jobs, texts):
+        fields[index][field] = text.strip()
+
+    records = []
+    for tile, tile_texts in zip(tiles, fields):
+        record = parse_check_fields(tile_texts)
+        record['tile'] = [round(v, 4) for v in tile]
+        records.append(record)
+    return records
+
+
+def checks_by_number(results: List[Dict]) -> Dict[str, Dict]:
+    """
+    Collect the check records of page results, keyed by check number.
+
+    Args:
+        results: ocr_page() result dicts (records under 'checks')
+
+    Returns:
+        Dict check_number -> {date, amount, payee, page}; first record per number wins
+    """
+    checks = {}
+    for result in results:
+        for record in result.get('checks') or []:
+            number = record.get('check_number')
+            if not number or number in checks:
+                continue
+            checks[number] = {'date': record.get('date'), 'amount': record.get('amount'),
+                              'payee': record.get('payee'), 'page': result['page']}
+    return checks
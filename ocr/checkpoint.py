@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+OCR Job Checkpoints - Resume a document's OCR at the first missing page
+
+A 200-page OCR run killed halfway (container restart, deploy, OOM) used to
+start over: the document cache is only written once every page is done, and
+the page cache still has to re-render every page to compute its pixel key.
+Each OCR job now appends its finished pages to a checkpoint file:
+
+    data/ocr_jobs/<job id>.jsonl
+        {"job": ..., "file_path": ..., "file_hash": ..., "pages": [...], "started": ...}
+        {"page": 1, "dpi": 350, "page_type": "transaction", "text": ..., ...}
+        ...
+
+The job id is derived from the document cache key, so it covers the same
+document content, page set, OCR settings and template OCR profiles. When the
+same file (by content hash) is OCRed again - normally a re-upload, since
+uploads are temp files that don't outlive the request - pages already in
+the checkpoint are neither rendered nor OCRed. Pages are keyed by (page, DPI), so adaptive-DPI
+escalations resume correctly too. The file is deleted once the document
+result is in the OCR cache.
+
+Lines are appended and fsynced one page at a time; a line cut short by a
+crash is ignored on load.
+"""
+
+import os
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from config import DATA_DIR, OCR_JOB_MAX_AGE_HOURS
+except ImportError:
+    DATA_DIR = 'data'
+    OCR_JOB_MAX_AGE_HOURS = 48
+
+JOBS_DIR = os.path.join(DATA_DIR, 'ocr_jobs')
+
+# Page result keys worth persisting (log lines, pass counts and timings are per run)
+CHECKPOINT_KEYS = ('page', 'dpi', 'page_type', 'text', 'triage', 'mean_conf', 'pixel_ratio', 'checks')
+
+
+class OCRCheckpoint:
+    """
+    Append-only log of one OCR job's finished pages.
+
+    Usage:
+        checkpoint = OCRCheckpoint(job_id, file_path=path, file_hash=doc_hash)
+        done = checkpoint.completed()      # {(page, dpi): result}
+        checkpoint.record(result)          # after each page
+        checkpoint.complete()              # once the document result is cached
+    """
+
+    def __init__(self, job_id: str, file_path: str = None, file_hash: str = None,
+                 pages: List[int] = None, jobs_dir: str = None):
+        """
+        Args:
+            job_id: Job identity (derived from the document cache key)
+            file_path: Source PDF, recorded so a restarted worker can resume
+            file_hash: Content hash of the source PDF
+            pages: 1-based pages the job OCRs (None = all)
+            jobs_dir: Checkpoint directory (default: data/ocr_jobs)
+        """
+        self.job_id = job_id
+        self.jobs_dir = jobs_dir or JOBS_DIR
+        self.path = os.path.join(self.jobs_dir, f"{job_id}.jsonl")
+        self.header = {'job': job_id, 'file_path': os.path.abspath(file_path) if file_path else None,
+                       'file_hash': file_hash, 'pages': pages}
+        self._started = False
+
+    def completed(self) -> Dict[Tuple[int, int], Dict]:
+        """Pages finished by earlier runs of this job, keyed by (page, dpi)."""
+        header, pages = read_checkpoint(self.path)
+        if header is not None:
+            self._started = True
+        return pages
+
+    def record(self, result: Dict):
+        """Append one finished page (fsynced, so it survives a crash right after)."""
+        entry = {key: result[key] for key in CHECKPOINT_KEYS if result.get(key) is not None}
+        lines = []
+        if not self._started and not os.path.exists(self.path):
+            lines.append(dict(self.header, started=time.time()))
+        lines.append(entry)
+        data = ''.join(json.dumps(line, separators=(',', ':')) + '\n' for line in lines).encode('utf-8')
+
+        try:
+            os.makedirs(self.jobs_dir, exist_ok=True)
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, data)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            self._started = True
+        except OSError as e:
+            print(f"[WARNING] Could not write OCR checkpoint {self.path}: {e}", flush=True)
+
+    def complete(self):
+        """Drop the checkpoint once the job's result is safely cached."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"[WARNING] Could not remove OCR checkpoint {self.path}: {e}", flush=True)
+
+
+def read_checkpoint(path: str) -> Tuple[Optional[Dict], Dict[Tuple[int, int], Dict]]:
+    """
+    Load a checkpoint file.
+
+    Returns:
+        (header or None, {(page, dpi): page result}); unreadable lines are skipped
+    """
+    header = None
+    pages = {}
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue  # Line cut short by a crash
+                if 'job' in entry:
+                    header = header or entry
+                elif 'page' in entry:
+                    pages[(entry['page'], entry.get('dpi'))] = entry
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        print(f"[WARNING] Could not read OCR checkpoint {path}: {e}", flush=True)
+    return header, pages
+
+
+def pending_jobs(jobs_dir: str = None, max_age_hours: float = None) -> List[Dict]:
+    """
+    Unfinished OCR jobs, oldest first. Checkpoints older than max_age_hours
+    (default: config.OCR_JOB_MAX_AGE_HOURS) are deleted instead.
+
+    Returns:
+        Checkpoint headers plus 'pages_done' and 'path'
+    """
+    jobs_dir = jobs_dir or JOBS_DIR
+    max_age = (OCR_JOB_MAX_AGE_HOURS if max_age_hours is None else max_age_hours) * 3600
+    jobs = []
+    try:
+        names = os.listdir(jobs_dir)
+    except FileNotFoundError:
+        return []
+
+    for name in names:
+        if not name.endswith('.jsonl'):
+            continue
+        path = os.path.join(jobs_dir, name)
+        try:
+            if max_age and time.time() - os.path.getmtime(path) > max_age:
+                os.remove(path)
+                continue
+        except OSError:
+            continue
+        header, pages = read_checkpoint(path)
+        if header is None:
+            continue
+        jobs.append(dict(header, pages_done=len(pages), path=path))
+    return sorted(jobs, key=lambda job: job.get('started', 0))
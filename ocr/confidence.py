@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+Confidence-Driven OCR - Decide on fallback passes from tesseract's own scores
+
+The PSM cascade in engine.py picks between passes by counting date matches
+and, for CrossFirst, runs PSM 4 / 11 / 3 whenever a withdrawal-with-date
+line is missing. With OCR_MODE=confidence every pass is an image_to_data()
+call instead, and each pass is scored by:
+
+- mean word confidence (tesseract's 0-100 per-word score)
+- transaction-line yield: the share of dated lines that have a transaction
+  row shape - one of the detected bank template's patterns, or a date with
+  a well-formed amount
+
+Fallback passes stop as soon as a page is good enough on both counts, so
+clean pages cost one tesseract pass. Transaction lines found only by a
+fallback pass are merged into the best pass, once per (date, amount).
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from config import OCR_FALLBACK_MIN_CONF, OCR_FALLBACK_MIN_YIELD
+except ImportError:
+    OCR_FALLBACK_MIN_CONF = 80
+    OCR_FALLBACK_MIN_YIELD = 0.8
+
+# Page segmentation modes, in the order they are tried
+FALLBACK_PSMS = (6, 4, 11, 3)
+
+DATE_PATTERN = re.compile(r'\d{1,2}/\d{1,2}(?:/\d{2,4})?')
+AMOUNT_PATTERN = re.compile(r'\d[\d,]*\.\d{2}')
+
+
+def lines_from_data(data: Dict) -> List[Dict]:
+    """
+    Group image_to_data() words into tesseract's own text lines.
+
+    Returns:
+        List of {'text', 'conf'} dicts in reading order (conf = mean word confidence)
+    """
+    lines = []
+    current_key = None
+    for i, text in enumerate(data.get('text', [])):
+        text = (text or '').strip()
+        if not text:
+            continue
+        try:
+            conf = float(data['conf'][i])
+        except (TypeError, ValueError):
+            conf = -1.0
+        if conf < 0:
+            continue
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        if key != current_key:
+            lines.append({'words': [], 'confs': []})
+            current_key = key
+        lines[-1]['words'].append(text)
+        lines[-1]['confs'].append(conf)
+
+    return [{'text': ' '.join(line['words']),
+             'conf': round(sum(line['confs']) / len(line['confs']), 1)} for line in lines]
+
+
+def compile_line_patterns(patterns: Optional[List[str]]) -> List:
+    """Compile template transaction patterns, skipping any that don't compile."""
+    compiled = []
+    for pattern in patterns or []:
+        try:
+            compiled.append(re.compile(pattern, re.IGNORECASE))
+        except re.error:
+            continue
+    return compiled
+
+
+def is_transaction_line(text: str, line_patterns: List) -> bool:
+    """
+    True if a line has the shape of a transaction row: one of the template's
+    transaction patterns, or a date followed by a well-formed amount (raw OCR
+    lines are not yet cleaned, so template patterns alone would under-count).
+    """
+    if any(pattern.search(text) for pattern in line_patterns):
+        return True
+    return bool(DATE_PATTERN.search(text) and AMOUNT_PATTERN.search(text))
+
+
+def transaction_key(text: str) -> Optional[Tuple[str, str]]:
+    """(date, amount) identifying the transaction on a line, used to avoid merging duplicates."""
+    date = DATE_PATTERN.search(text)
+    amounts = AMOUNT_PATTERN.findall(text)
+    if not date or not amounts:
+        return None
+    return date.group(0), amounts[-1].replace(',', '')
+
+
+def score_lines(lines: List[Dict], line_patterns: List) -> Dict:
+    """
+    Score one OCR pass.
+
+    Returns:
+        Dict with conf (mean word confidence, weighted by line), dated (lines
+        with a date), matched (dated lines with a transaction shape) and yield
+    """
+    conf = sum(line['conf'] for line in lines) / len(lines) if lines else 0.0
+    dated = matched = 0
+    for line in lines:
+        if DATE_PATTERN.search(line['text']):
+            dated += 1
+            if is_transaction_line(line['text'], line_patterns):
+                matched += 1
+    return {
+        'conf': round(conf, 1),
+        'dated': dated,
+        'matched': matched,
+        'yield': round(matched / dated, 2) if dated else 1.0,
+    }
+
+
+def good_enough(score: Dict, min_conf: float = None, min_yield: float = None) -> bool:
+    """True if a pass needs no fallback (pages without dated lines are judged on confidence alone)."""
+    min_conf = OCR_FALLBACK_MIN_CONF if min_conf is None else min_conf
+    min_yield = OCR_FALLBACK_MIN_YIELD if min_yield is None else min_yield
+    return score['conf'] >= min_conf and score['yield'] >= min_yield
+
+
+def merge_transaction_lines(best_lines: List[Dict], other_passes: List[List[Dict]],
+                            line_patterns: List, min_conf: float = None) -> Tuple[List[str], int]:
+    """
+    Add confident transaction lines that only other passes found.
+
+    Returns:
+        (page lines, number of merged lines)
+    """
+    min_conf = OCR_FALLBACK_MIN_CONF if min_conf is None else min_conf
+    text_lines = [line['text'] for line in best_lines]
+    seen = {transaction_key(text) for text in text_lines} - {None}
+
+    merged = 0
+    for lines in other_passes:
+        for line in lines:
+            if line['conf'] < min_conf or not is_transaction_line(line['text'], line_patterns):
+                continue
+            key = transaction_key(line['text'])
+            if key is None or key in seen:
+                continue
+            seen.add(key)
+            text_lines.append(line['text'])
+            merged += 1
+    return text_lines, merged
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Digital Text Extraction - Page text layers through a pluggable backend
+
+Backends (same interface: extract_range(file_path, start, stop) -> page texts):
+- pdfplumber: pdfplumber extract_text() (pure Python, the long-standing default)
+- pdftotext:  poppler's `pdftotext -layout` in a subprocess (found next to the
+              other poppler binaries via config.POPPLER_PATH, else on PATH)
+
+The backend is PDF_TEXT_BACKEND, or a bank template's "ocr": {"text_backend": ...}
+once the bank is known. Compare backends per template with:
+    python -m ocr.benchmark text statement.pdf --expected expected.json
+
+Long documents are split into contiguous page chunks extracted in worker
+processes (pdfplumber is CPU-bound, so threads don't help); page texts are
+reassembled in order. The pool size is reserved from the OCR governor (see
+governor.py), which also bounds concurrent OCR. Short documents are extracted in-process, where the
+pool start-up would cost more than it saves.
+
+Usage:
+    page_texts = extract_page_texts("statement.pdf")   # one string per page
+"""
+
+import os
+import shutil
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+from .governor import get_governor
+
+try:
+    import pdfplumber
+    PDFPLUMBER_AVAILABLE = True
+except ImportError:
+    PDFPLUMBER_AVAILABLE = False
+
+try:
+    from config import PDF_TEXT_WORKERS, PDF_TEXT_BACKEND, POPPLER_PATH
+except ImportError:
+    PDF_TEXT_WORKERS = 1
+    PDF_TEXT_BACKEND = 'pdfplumber'
+    POPPLER_PATH = None
+
+# Documents shorter than this are extracted in-process
+MIN_PARALLEL_PAGES = 8
+
+# Seconds allowed per pdftotext call
+PDFTOTEXT_TIMEOUT = 120
+
+
+class PdfplumberTextBackend:
+    """pdfplumber extract_text() per page."""
+
+    name = 'pdfplumber'
+
+    def __init__(self):
+        if not PDFPLUMBER_AVAILABLE:
+            raise ImportError("pdfplumber not installed. Run: pip install pdfplumber")
+
+    def extract_range(self, file_path: str, start: int, stop: int) -> List[str]:
+        """Text of pages [start, stop) (0-based)."""
+        with pdfplumber.open(file_path) as pdf:
+            return [page.extract_text() or '' for page in pdf.pages[start:stop]]
+
+
+class PdftotextBackend:
+    """poppler `pdftotext -layout`, one subprocess per page range."""
+
+    name = 'pdftotext'
+
+    def __init__(self):
+        self.binary = None
+        if POPPLER_PATH and os.path.isdir(POPPLER_PATH):
+            self.binary = shutil.which('pdftotext', path=POPPLER_PATH)
+        self.binary = self.binary or shutil.which('pdftotext')
+        if not self.binary:
+            raise FileNotFoundError("pdftotext not found. Install poppler-utils or set POPPLER_PATH")
+
+    def extract_range(self, file_path: str, start: int, stop: int) -> List[str]:
+        """Text of pages [start, stop) (0-based); pdftotext ends every page with a form feed."""
+        result = subprocess.run(
+            [self.binary, '-layout', '-enc', 'UTF-8', '-f', str(start + 1), '-l', str(stop),
+             file_path, '-'],
+            capture_output=True, timeout=PDFTOTEXT_TIMEOUT, check=True
+        )
+        pages = result.stdout.decode('utf-8', errors='replace').split('\f')[:stop - start]
+        pages += [''] * (stop - start - len(pages))
+        return [page.rstrip() for page in pages]
+
+
+_TEXT_BACKENDS = {
+    'pdfplumber': PdfplumberTextBackend,
+    'pdftotext': PdftotextBackend,
+}
+
+_text_backend_instances = {}
+
+
+def get_text_backend(name: Optional[str] = None):
+    """
+    Get a digital text backend (default: config.PDF_TEXT_BACKEND).
+
+    Falls back to pdfplumber (with a warning) if the requested backend is
+    unknown or unavailable.
+    """
+    name = (name or PDF_TEXT_BACKEND or 'pdfplumber').lower()
+    if name in _text_backend_instances:
+        return _text_backend_instances[name]
+
+    backend_class = _TEXT_BACKENDS.get(name)
+    if backend_class is None:
+        print(f"[WARNING] Unknown text backend '{name}', using pdfplumber", flush=True)
+        backend = get_text_backend('pdfplumber')
+    else:
+        try:
+            backend = backend_class()
+        except (ImportError, FileNotFoundError) as e:
+            if name == 'pdfplumber':
+                raise
+            print(f"[WARNING] Text backend '{name}' unavailable ({e}), using pdfplumber", flush=True)
+            backend = get_text_backend('pdfplumber')
+
+    _text_backend_instances[name] = backend
+    return backend
+
+
+def _extract_range(args: Tuple[str, str, int, int]) -> List[str]:
+    """Pool entry point - text of pages [start, stop) (0-based) with the named backend."""
+    backend_name, file_path, start, stop = args
+    return get_text_backend(backend_name).extract_range(file_path, start, stop)
+
+
+def extract_page_texts(file_path: str, page_count: Optional[int] = None, workers: int = None,
+                       backend: str = None, start: int = 0) -> List[str]:
+    """
+    Extract the text layer of every page (from page index `start` on).
+
+    Args:
+        file_path: Path to PDF
+        page_count: Number of pages, if already known (e.g. from PDF triage)
+        workers: Worker processes (default: config.PDF_TEXT_WORKERS)
+        backend: Text backend name (default: config.PDF_TEXT_BACKEND)
+        start: 0-based index of the first page to extract
+
+    Returns:
+        One text string per page, in page order ('' for pages without text)
+    """
+    if not PDFPLUMBER_AVAILABLE:
+        return []
+
+    backend_name = get_text_backend(backend).name
+    workers = max(1, workers if workers is not None else PDF_TEXT_WORKERS)
+    if page_count is None:
+        with pdfplumber.open(file_path) as pdf:
+            page_count = len(pdf.pages)
+    if start >= page_count:
+        return []
+
+    if workers == 1 or page_count - start < MIN_PARALLEL_PAGES:
+        return _extract_range((backend_name, file_path, start, page_count))
+
+    with get_governor().job(min(workers, page_count - start)) as workers:
+        if workers == 1:
+            return _extract_range((backend_name, file_path, start, page_count))
+
+        chunk = -(-(page_count - start) // workers)
+        tasks = [(backend_name, file_path, first, min(page_count, first + chunk))
+                 for first in range(start, page_count, chunk)]
+        try:
+            with ProcessPoolExecutor(max_workers=len(tasks)) as pool:
+                page_texts = []
+                for texts in pool.map(_extract_range, tasks):
+                    page_texts.extend(texts)
+            return page_texts
+        except Exception as e:
+            # Pool could not start (e.g. restricted environment) - extract in-process
+            print(f"[WARNING] Parallel text extraction failed ({e}), falling back to sequential", flush=True)
+            return _extract_range((backend_name, file_path, start, page_count))
@@ -0,0 +1,822 @@
+# -*- coding: utf-8 -*-
+"""
+OCR Engine - Per-page OCR with optional page-parallel execution
+
+Each page goes through the same steps SmartParser has always used:
+1. Quick PSM 6 pass, used for page classification
+2. Skip boilerplate pages
+3. PSM 4 merge for check-image pages
+4. PSM 4 / 11 / 3 fallbacks for CrossFirst transaction tables
+
+Pages are independent, so they can be OCRed in a process pool. Results are
+always reassembled in page order, so the document text is byte-identical to
+the sequential path.
+
+With OCR_MODE=layout the cascade is replaced by a single image_to_data()
+pass whose word boxes are rebuilt into rows and columns (see layout.py).
+When the bank template declares OCR regions, only those crops of the page
+are OCRed (see regions.py). Check-image pages can additionally get
+per-check field OCR (payee / amount / check number, see check_fields.py).
+
+With OCR_MODE=confidence the PSM passes are chosen and stopped by word
+confidence and template line shapes instead of date counting (see
+confidence.py).
+
+Every run() reserves its pool size from the process-wide OCR governor
+(see governor.py), so concurrent uploads share the available CPUs.
+
+Pages can be given as images or as lazy PageRef objects (see rasterizer.py).
+PageRefs are rendered inside the worker, so at most OCR_PAGE_WINDOW page
+bitmaps exist at any time no matter how long the document is.
+
+run_adaptive() OCRs PageRefs rendered at a low DPI and re-renders at a higher
+DPI only the pages whose result looks weak (few complete transaction lines,
+or low word confidence in layout mode).
+
+run_until() OCRs PageRefs in page-order batches and asks a caller's
+stop_check(text so far) after each one; pages after the stop are returned
+as 'skipped' without being rendered or OCRed.
+
+With a job checkpoint (see checkpoint.py) every finished page is appended
+as it completes, and pages already in the checkpoint from an earlier,
+interrupted run of the same job are neither rendered nor OCRed again.
+
+Usage:
+    engine = OCREngine(workers=4)
+    results = engine.run(page_refs(file_path, dpi=350))   # per-page dicts, in order
+    results = engine.run_adaptive(page_refs(file_path, dpi=250), dpi=350)
+"""
+
+import os
+import re
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import pytesseract
+    TESSERACT_AVAILABLE = True
+except ImportError:
+    TESSERACT_AVAILABLE = False
+
+try:
+    from config import (TESSERACT_CMD, OCR_WORKERS, OCR_PAGE_WINDOW, OCR_PAGE_CACHE, OCR_TRIAGE,
+                        OCR_MODE, OCR_PREPROCESS, OCR_ADAPTIVE_MIN_YIELD, OCR_ADAPTIVE_MIN_CONF,
+                        OCR_CHECK_FIELDS)
+except ImportError:
+    TESSERACT_CMD = None
+    OCR_WORKERS = 1
+    OCR_PAGE_WINDOW = 0
+    OCR_PAGE_CACHE = True
+    OCR_TRIAGE = False
+    OCR_MODE = 'psm'
+    OCR_PREPROCESS = 'none'
+    OCR_ADAPTIVE_MIN_YIELD = 0.8
+    OCR_ADAPTIVE_MIN_CONF = 70
+    OCR_CHECK_FIELDS = False
+
+from .rasterizer import PageRef
+from .page_cache import PageOCRCache
+from .triage import triage_page
+from .layout import ocr_layout
+from .backends import get_backend
+from .tessdata import PassTimer, FAST, fast_tier_enabled, models_signature
+from .governor import get_governor, apply_thread_limit
+from .preprocess import preprocess_image, profile_name
+from .check_fields import FIELD_BOXES, ocr_check_fields
+from .regions import regions_for_page, ocr_regions, regions_signature
+from .tesseract_options import options_signature
+from .confidence import (FALLBACK_PSMS, lines_from_data, compile_line_patterns, score_lines,
+                         good_enough, merge_transaction_lines)
+
+# DPI assumed for page images passed in directly (SmartParser's default)
+DEFAULT_DPI = 350
+
+
+# Boilerplate page indicators - pages containing ONLY these patterns are skipped
+BOILERPLATE_PATTERNS = [
+    r'HOW TO RECONCILE',
+    r'CHECKS OUTSTANDING',
+    r'DISCLOSURES',
+    r'Choice of Law',
+    r'IMPORTANT INFORMATION',
+    r'Privacy Notice',
+    r'Member FDIC',
+    r'Equal Housing Lender',
+]
+
+# Transaction indicators - if a page has these, it likely has transaction data
+TRANSACTION_INDICATORS = [
+    r'\d{1,2}/\d{1,2}(?:/\d{2,4})?\s+\d',  # Date followed by number
+    r'DEPOSIT|WITHDRAWAL|CHECK\s*#',       # Transaction keywords
+    r'INTEREST|SERVICE\s*FEE',              # More transaction keywords
+    r'NUMBERED CHECKS',                     # Check section
+    r'BUSINESS ACCOUNT',                    # Account activity section
+    r'PREVIOUS BALANCE|ENDING BALANCE',     # Balance info
+]
+
+# Check image indicators - pages with check images need full OCR
+CHECK_IMAGE_INDICATORS = [
+    r'Pay\s+to|PAY\s+TO',
+    r'Authorized\s+Signature',
+    r'ENDORSE HERE',
+    r'FOR MOBILE DEPOSIT',
+    r'\d{1,2}/\d{1,2}/\d{2,4}\s*[-–]\s*\$',  # Check annotation format
+]
+
+# Fast OCR config for classification
+FAST_CONFIG = r'--oem 3 --psm 6'
+
+# Transaction-line yield: lines with a date, and which of them also carry an amount
+DATED_LINE_PATTERN = re.compile(r'\d{1,2}/\d{1,2}')
+AMOUNT_PATTERN = re.compile(r'\d[\d,]*\.\d{2}')
+
+
+def score_page(text: str) -> Tuple[int, int, int]:
+    """Count (boilerplate, transaction, check_image) indicator hits in page text."""
+    # Check for boilerplate indicators
+    boilerplate_score = 0
+    for pattern in BOILERPLATE_PATTERNS:
+        if re.search(pattern, text, re.IGNORECASE):
+            boilerplate_score += 1
+
+    # Check for transaction indicators
+    transaction_score = 0
+    for pattern in TRANSACTION_INDICATORS:
+        if re.search(pattern, text, re.IGNORECASE):
+            transaction_score += 1
+
+    # Check for check image indicators
+    check_image_score = 0
+    for pattern in CHECK_IMAGE_INDICATORS:
+        if re.search(pattern, text, re.IGNORECASE):
+            check_image_score += 1
+
+    return boilerplate_score, transaction_score, check_image_score
+
+
+def classify_page(text: str) -> str:
+    """
+    Classify a page based on its OCR text.
+
+    Returns:
+        'transaction' - Page has transaction data
+        'check_image' - Page has check images
+        'boilerplate' - Page has only boilerplate content (skip)
+        'unknown' - Can't classify, process anyway
+    """
+    boilerplate_score, transaction_score, check_image_score = score_page(text)
+
+    # Decision logic
+    if check_image_score >= 2:
+        return 'check_image'
+    elif transaction_score >= 2:
+        return 'transaction'
+    elif boilerplate_score >= 2 and transaction_score == 0:
+        return 'boilerplate'
+    elif transaction_score >= 1:
+        return 'transaction'
+    elif check_image_score >= 1:
+        return 'check_image'
+    elif boilerplate_score >= 1 and transaction_score == 0:
+        return 'boilerplate'
+    else:
+        # Unknown - process it to be safe
+        return 'unknown'
+
+
+def _has_withdrawal_with_date(text: str) -> bool:
+    """Check for a CrossFirst withdrawal line with its date on the same line."""
+    for line in text.split('\n'):
+        # Date followed by anything then Withdrawal (may have OCR garbage between)
+        if re.search(r'\d{2}/\d{2}/\d{4}', line) and re.search(r'[Ww]ithd', line):
+            return True
+        # Date on line that has parenthetical amount (withdrawal indicator)
+        if re.search(r'\d{2}/\d{2}/\d{4}', line) and re.search(r'\([^)]*\d+\.\d{2}', line):
+            return True
+    return False
+
+
+def transaction_line_yield(text: str) -> Tuple[int, int]:
+    """Count (dated lines, dated lines that also contain an amount) in page text."""
+    dated = complete = 0
+    for line in text.split('\n'):
+        if DATED_LINE_PATTERN.search(line):
+            dated += 1
+            if AMOUNT_PATTERN.search(line):
+                complete += 1
+    return dated, complete
+
+
+def needs_higher_dpi(result: Dict, min_yield: float = None, min_conf: float = None) -> Optional[str]:
+    """
+    Decide whether a page result is too weak to keep at its render DPI.
+
+    Args:
+        result: ocr_page() result dict
+        min_yield: Minimum fraction of dated lines that must also carry an amount
+                   (default: config.OCR_ADAPTIVE_MIN_YIELD)
+        min_conf: Minimum mean word confidence for layout-mode results
+                  (default: config.OCR_ADAPTIVE_MIN_CONF)
+
+    Returns:
+        Reason string if the page should be re-OCRed at a higher DPI, else None
+    """
+    min_yield = OCR_ADAPTIVE_MIN_YIELD if min_yield is None else min_yield
+    min_conf = OCR_ADAPTIVE_MIN_CONF if min_conf is None else min_conf
+
+    if result['page_type'] in ('boilerplate', 'blank'):
+        return None
+    if result['page_type'] == 'unknown':
+        # Nothing recognisable - often garbled text from a low-resolution render
+        return 'unclassified'
+
+    mean_conf = result.get('mean_conf')
+    if mean_conf is not None and mean_conf < min_conf:
+        return f"confidence {mean_conf}"
+
+    dated, complete = transaction_line_yield(result['text'])
+    if not dated:
+        return 'no dated lines'
+    if complete / dated < min_yield:
+        return f"transaction-line yield {complete}/{dated}"
+    return None
+
+
+def ocr_page(image, page_number: int, dpi: int = DEFAULT_DPI, triage: bool = False,
+             mode: str = 'psm', preprocess=None, line_patterns: List[str] = None,
+             regions: List[Dict] = None, tesseract: Dict[str, Dict] = None,
+             timer: PassTimer = None) -> Dict:
+    """
+    OCR a single page image.
+
+    Args:
+        image: PIL image of the page
+        page_number: 1-based page number (used for log messages)
+        dpi: DPI the page was rendered at
+        triage: Run image-based triage first (blank / check tiles / thumbnail)
+        mode: 'psm' (PSM 6 + 4/11/3 fallbacks), 'layout' (single word-box pass)
+            or 'confidence' (fallbacks driven by word confidence and line shapes)
+        preprocess: Preprocessing preset name or options dict (see preprocess.py),
+            applied after triage and before the full-resolution passes
+        line_patterns: Bank template transaction regexes (confidence mode)
+        regions: Bank template OCR regions (relative boxes); when any apply to
+            this page only those crops are OCRed
+        tesseract: Bank template tesseract options per pass (see tesseract_options.py)
+        timer: Pass timer to record tesseract time in (default: a new one
+            applying `tesseract`)
+
+    Returns:
+        Dict with page, page_type, text, triage, passes (tesseract runs),
+        pass_ms (tesseract time per step and model tier, see tessdata.py) and
+        log (debug lines, in order)
+    """
+    timer = timer or PassTimer(options=tesseract, dpi=dpi)
+    result = _ocr_page(image, page_number, dpi, triage, mode, preprocess, line_patterns, regions, timer)
+    result['pass_ms'] = timer.summary()
+    return result
+
+
+def _ocr_page(image, page_number: int, dpi: int, triage: bool, mode: str, preprocess,
+              line_patterns: Optional[List[str]], regions: Optional[List[Dict]], timer: PassTimer) -> Dict:
+    """ocr_page() without the pass timing summary."""
+    log = []
+    triage_info = None
+
+    if triage:
+        triage_info = triage_page(image, dpi, score_page, timer)
+        if triage_info['decision'] == 'skip':
+            page_type = 'blank' if triage_info['reason'] == 'blank' else 'boilerplate'
+            log.append(f"[DEBUG] Page {page_number}: SKIPPED ({triage_info['reason']}, no full OCR)")
+            return {'page': page_number, 'page_type': page_type, 'text': '', 'triage': triage_info,
+                    'passes': 0, 'log': log}
+
+    if profile_name(preprocess):
+        image = preprocess_image(image, preprocess)
+        log.append(f"[DEBUG] Page {page_number}: preprocessed ({profile_name(preprocess)})")
+
+    page_regions = regions_for_page(regions, page_number) if regions else []
+    if page_regions:
+        region_ocr = ocr_regions(image, page_regions, timer)
+        if region_ocr['text'].strip():
+            return _ocr_page_regions(region_ocr, page_number, triage_info, log)
+        log.append(f"[DEBUG] Page {page_number}: OCR regions empty, OCRing full page")
+
+    if mode == 'layout':
+        return _ocr_page_layout(image, page_number, triage_info, log, timer)
+    if mode == 'confidence':
+        return _ocr_page_confidence(image, page_number, triage_info, log, line_patterns, timer)
+
+    # Quick OCR scan for classification
+    quick_text = timer.image_to_string(image, FAST_CONFIG, step='classify', tier=FAST)
+    passes = 1
+
+    # Classify the page
+    page_type = classify_page(quick_text)
+
+    if page_type == 'boilerplate':
+        log.append(f"[DEBUG] Page {page_number}: SKIPPED (boilerplate)")
+        return {'page': page_number, 'page_type': page_type, 'text': '', 'triage': triage_info,
+                'passes': passes, 'log': log}
+
+    if fast_tier_enabled():
+        # The classification pass ran on the fast model - read the page with the best one
+        quick_text = timer.image_to_string(image, FAST_CONFIG, step='detail')
+        passes += 1
+
+    # For transaction/check pages, the quick OCR is usually sufficient
+    # Only do additional processing for check images that need layout analysis
+    if page_type == 'check_image':
+        # Try PSM 4 which is better for columnar check data
+        psm4_text = timer.image_to_string(image, r'--oem 3 --psm 4', step='fallback')
+        passes += 1
+
+        # Use whichever has more date content
+        quick_dates = len(re.findall(r'\d{1,2}/\d{1,2}', quick_text))
+        psm4_dates = len(re.findall(r'\d{1,2}/\d{1,2}', psm4_text))
+
+        if psm4_dates > quick_dates:
+            page_text = psm4_text
+        else:
+            page_text = quick_text
+
+        # Merge important lines from both
+        other = psm4_text if page_text == quick_text else quick_text
+        for line in other.split('\n'):
+            line = line.strip()
+            if ('Pay to' in line or 'CHECK' in line) and line not in page_text:
+                page_text += '\n' + line
+    else:
+        page_text = quick_text
+
+    # For CrossFirst and similar table-based statements,
+    # PSM 6 often misses withdrawal lines entirely due to table formatting.
+    # Try PSM 4 (single column) which works best for CrossFirst tables.
+    if 'CrossFirst' in quick_text or 'IntraFi' in quick_text or 'Account Transaction Detail' in quick_text:
+        if not _has_withdrawal_with_date(page_text):
+            # PSM 4 (single column) works best for CrossFirst transaction tables
+            psm4_text = timer.image_to_string(image, r'--oem 3 --psm 4', step='fallback')
+            passes += 1
+
+            if _has_withdrawal_with_date(psm4_text):
+                log.append(f"[DEBUG] Page {page_number}: Using PSM 4 - found withdrawal with date")
+                page_text = psm4_text
+            else:
+                # PSM 11 produces fragmented output, only use as last resort
+                # and only if it captures the date + withdrawal on coherent lines
+                psm11_text = timer.image_to_string(image, r'--oem 3 --psm 11', step='fallback')
+                passes += 1
+
+                if _has_withdrawal_with_date(psm11_text):
+                    log.append(f"[DEBUG] Page {page_number}: Using PSM 11 - found withdrawal with date")
+                    page_text = psm11_text
+
+        # If still no withdrawal found, try PSM 3 as final fallback
+        if not _has_withdrawal_with_date(page_text):
+            psm3_text = timer.image_to_string(image, r'--oem 3 --psm 3', step='fallback')
+            passes += 1
+
+            if re.search(r'[Ww]ithdrawal.*\d+\.\d{2}', psm3_text):
+                # Merge withdrawal lines from PSM 3
+                for line in psm3_text.split('\n'):
+                    if re.search(r'[Ww]ithdrawal.*\(\s*\$?\s*[\d,]+\.\d{2}\s*\)', line):
+                        if line.strip() not in page_text:
+                            page_text += '\n' + line.strip()
+                            log.append(f"[DEBUG] Merged withdrawal line from PSM 3: {line.strip()[:60]}")
+
+    return {'page': page_number, 'page_type': page_type, 'text': page_text, 'triage': triage_info,
+            'passes': passes, 'log': log}
+
+
+def _ocr_page_layout(image, page_number: int, triage_info: Optional[Dict], log: List[str],
+                     timer: PassTimer) -> Dict:
+    """Single-pass layout OCR: one image_to_data() call, rows rebuilt from word boxes."""
+    layout = ocr_layout(image, timer=timer)
+    page_text = layout['text']
+    page_type = classify_page(page_text)
+
+    if page_type == 'boilerplate':
+        log.append(f"[DEBUG] Page {page_number}: SKIPPED (boilerplate)")
+        page_text = ''
+
+    log.append(f"[DEBUG] Page {page_number}: layout OCR, {len(layout['words'])} words, "
+               f"mean confidence {layout['mean_conf']}")
+    return {'page': page_number, 'page_type': page_type, 'text': page_text, 'triage': triage_info,
+            'passes': 1, 'mean_conf': layout['mean_conf'], 'log': log}
+
+
+def _ocr_page_regions(region_ocr: Dict, page_number: int, triage_info: Optional[Dict],
+                      log: List[str]) -> Dict:
+    """Page result from template region OCR."""
+    page_text = region_ocr['text'] + '\n'
+    page_type = classify_page(page_text)
+    if page_type == 'boilerplate':
+        log.append(f"[DEBUG] Page {page_number}: SKIPPED (boilerplate)")
+        page_text = ''
+
+    names = ', '.join(region['name'] for region in region_ocr['regions'])
+    log.append(f"[DEBUG] Page {page_number}: OCRed region(s) {names}, "
+               f"{region_ocr['pixel_ratio']:.0%} of page pixels")
+    return {'page': page_number, 'page_type': page_type, 'text': page_text, 'triage': triage_info,
+            'passes': region_ocr['passes'], 'pixel_ratio': region_ocr['pixel_ratio'], 'log': log}
+
+
+def _ocr_page_confidence(image, page_number: int, triage_info: Optional[Dict], log: List[str],
+                         line_patterns: List[str] = None, timer: PassTimer = None) -> Dict:
+    """PSM passes in order until word confidence and transaction-line yield are good enough."""
+    timer = timer or PassTimer()
+    patterns = compile_line_patterns(line_patterns)
+    page_type = None
+    scores = []
+    pass_lines = []
+    best = 0
+    classify_passes = 0
+
+    if fast_tier_enabled():
+        # Classify with the fast model; the scored passes below all use the best one
+        page_type = classify_page(timer.image_to_string(image, FAST_CONFIG, step='classify', tier=FAST))
+        classify_passes = 1
+        if page_type == 'boilerplate':
+            log.append(f"[DEBUG] Page {page_number}: SKIPPED (boilerplate)")
+            return {'page': page_number, 'page_type': page_type, 'text': '', 'triage': triage_info,
+                    'passes': 1, 'log': log}
+
+    for psm in FALLBACK_PSMS:
+        data = timer.image_to_data(image, f'--oem 3 --psm {psm}', step='detail' if not scores else 'fallback')
+        lines = lines_from_data(data)
+        score = score_lines(lines, patterns)
+        score['psm'] = psm
+        scores.append(score)
+        pass_lines.append(lines)
+
+        if page_type is None:
+            # Classify from the first (PSM 6) pass, as the PSM cascade does
+            page_type = classify_page('\n'.join(line['text'] for line in lines))
+            if page_type == 'boilerplate':
+                log.append(f"[DEBUG] Page {page_number}: SKIPPED (boilerplate)")
+                return {'page': page_number, 'page_type': page_type, 'text': '', 'triage': triage_info,
+                        'passes': 1, 'mean_conf': score['conf'], 'log': log}
+
+        if (score['matched'], score['conf']) > (scores[best]['matched'], scores[best]['conf']):
+            best = len(scores) - 1
+        if good_enough(scores[best]):
+            break
+
+    others = [lines for i, lines in enumerate(pass_lines) if i != best]
+    text_lines, merged = merge_transaction_lines(pass_lines[best], others, patterns)
+
+    summary = ', '.join(f"PSM {s['psm']}: conf {s['conf']}, yield {s['matched']}/{s['dated']}" for s in scores)
+    log.append(f"[DEBUG] Page {page_number}: {len(scores)} pass(es) [{summary}], using PSM "
+               f"{scores[best]['psm']}" + (f", merged {merged} line(s)" if merged else ''))
+
+    page_text = '\n'.join(text_lines) + '\n' if text_lines else ''
+    return {'page': page_number, 'page_type': page_type, 'text': page_text, 'triage': triage_info,
+            'passes': classify_passes + len(scores), 'mean_conf': scores[best]['conf'], 'log': log}
+
+
+def patterns_signature(line_patterns: Optional[List[str]]) -> Optional[str]:
+    """Short hash of a list of line patterns (None when there are none)."""
+    if not line_patterns:
+        return None
+    return hashlib.sha1(json.dumps(list(line_patterns)).encode('utf-8')).hexdigest()[:12]
+
+
+def ocr_settings(triage: bool, mode: str, preprocess=None, line_patterns: List[str] = None,
+                 regions: List[Dict] = None, check_fields: bool = False,
+                 tesseract: Dict[str, Dict] = None) -> Dict:
+    """Settings that change the text OCR produces - part of every OCR cache key."""
+    settings = {'triage': triage, 'mode': mode, 'backend': get_backend().name}
+    if profile_name(preprocess):
+        settings['preprocess'] = profile_name(preprocess)
+    if mode == 'confidence' and line_patterns:
+        settings['line_patterns'] = patterns_signature(line_patterns)
+    if regions:
+        settings['regions'] = regions_signature(regions)
+    if check_fields:
+        settings['check_fields'] = True
+    if tesseract:
+        settings['tesseract'] = options_signature(tesseract)
+    if models_signature():
+        settings['models'] = models_signature()
+    return settings
+
+
+def _init_worker(tesseract_cmd: Optional[str]):
+    """
+    Process pool initializer - point pytesseract at the configured binary and
+    cap tesseract's OpenMP threads (in this OCR-only worker, not the app process).
+    """
+    if tesseract_cmd and os.path.exists(tesseract_cmd):
+        pytesseract.pytesseract.tesseract_cmd = tesseract_cmd
+    apply_thread_limit(process_env=True)
+
+
+def _is_check_page(result: Dict) -> bool:
+    """True for OCRed pages holding check images (by text or by triage tile layout)."""
+    if result['page_type'] in ('boilerplate', 'blank'):
+        return False
+    return result['page_type'] == 'check_image' or (result.get('triage') or {}).get('reason') == 'check_tiles'
+
+
+def _ocr_page_task(args) -> Dict:
+    """Picklable pool entry point - renders PageRefs on demand, checks the page cache."""
+    page, page_number, options = args
+    image = page.load() if isinstance(page, PageRef) else page
+    if image is None:
+        return {'page': page_number, 'page_type': 'unknown', 'text': '', 'triage': None,
+                'passes': 0, 'log': [], 'cached': False}
+
+    dpi = page.dpi if isinstance(page, PageRef) else DEFAULT_DPI
+    cache = key = None
+    if options['cache_dir']:
+        cache = PageOCRCache(options['cache_dir'])
+        key = cache.make_key(image, dpi, options['settings'])
+        cached = cache.get(key)
+        if cached is not None:
+            result = {'page': page_number, 'page_type': cached['page_type'], 'text': cached['text'],
+                      'triage': cached.get('triage'), 'passes': 0, 'dpi': dpi,
+                      'log': [f"[DEBUG] Page {page_number}: page OCR cache hit"], 'cached': True}
+            if cached.get('mean_conf') is not None:
+                result['mean_conf'] = cached['mean_conf']
+            if cached.get('checks') is not None:
+                result['checks'] = cached['checks']
+            return result
+
+    timer = PassTimer(options=options['tesseract'], dpi=dpi)
+    result = ocr_page(image, page_number, dpi=dpi, triage=options['triage'], mode=options['mode'],
+                      preprocess=options['preprocess'], line_patterns=options['line_patterns'],
+                      regions=options['regions'], timer=timer)
+    result['dpi'] = dpi
+    result['cached'] = False
+    if options['check_fields'] and _is_check_page(result):
+        result['checks'] = ocr_check_fields(image, timer=timer)
+        result['passes'] += len(result['checks']) * len(FIELD_BOXES)
+        result['pass_ms'] = timer.summary()
+        result['log'].append(f"[DEBUG] Page {page_number}: field OCR on {len(result['checks'])} check tile(s)")
+    if cache is not None:
+        cache.put(key, result)
+    return result
+
+
+class OCREngine:
+    """
+    Runs per-page OCR sequentially or across a process pool.
+
+    Worker count comes from config.OCR_WORKERS (env: OCR_WORKERS), capped by
+    the CPU slots the OCR governor grants the run (shared by concurrent jobs).
+    1 runs in-process; anything higher uses a ProcessPoolExecutor.
+    The number of pages in flight is capped by config.OCR_PAGE_WINDOW.
+    Completed pages are stored in the page-level OCR cache as they finish,
+    so a re-run after a crash only OCRs the pages that are still missing;
+    with a job checkpoint those pages are not even re-rendered.
+    """
+
+    def __init__(self, workers: int = None, window: int = None, use_cache: bool = None,
+                 cache_dir: str = None, triage: bool = None, mode: str = None, preprocess=None,
+                 line_patterns: List[str] = None, regions: List[Dict] = None, check_fields: bool = None,
+                 tesseract: Dict[str, Dict] = None, checkpoint=None, debug: bool = False):
+        """
+        Initialize OCR engine.
+
+        Args:
+            workers: Number of OCR worker processes (default: config.OCR_WORKERS)
+            window: Max pages rendered/queued at once (default: config.OCR_PAGE_WINDOW,
+                    0 = 2 per worker)
+            use_cache: Use the page-level OCR cache (default: config.OCR_PAGE_CACHE)
+            cache_dir: OCR cache store root (default: data/ocr_cache)
+            triage: Run image-based page triage before full OCR (default: config.OCR_TRIAGE)
+            mode: 'psm', 'layout' or 'confidence' (default: config.OCR_MODE)
+            preprocess: Preprocessing preset or options dict (default: config.OCR_PREPROCESS)
+            line_patterns: Bank template transaction regexes used to score passes
+                in confidence mode (default: date + amount line shape)
+            regions: Bank template OCR regions - only these page crops are OCRed
+            check_fields: Field OCR on check tiles of check-image pages
+                (default: config.OCR_CHECK_FIELDS)
+            tesseract: Bank template tesseract options per pass (whitelist, user
+                patterns, DPI hint - see tesseract_options.py)
+            checkpoint: OCRCheckpoint of this job - finished pages are recorded
+                and pages from an interrupted run are resumed
+            debug: Print per-page debug lines
+        """
+        self.workers = max(1, workers if workers is not None else OCR_WORKERS)
+        window = window if window is not None else OCR_PAGE_WINDOW
+        self.window = max(1, window or self.workers * 2)
+        use_cache = OCR_PAGE_CACHE if use_cache is None else use_cache
+        self.cache_dir = (cache_dir or PageOCRCache().cache_dir) if use_cache else None
+        self.triage = OCR_TRIAGE if triage is None else triage
+        self.mode = mode or OCR_MODE
+        self.preprocess = preprocess or OCR_PREPROCESS
+        self.line_patterns = list(line_patterns) if line_patterns else None
+        self.regions = list(regions) if regions else None
+        self.check_fields = OCR_CHECK_FIELDS if check_fields is None else check_fields
+        self.tesseract = dict(tesseract) if tesseract else None
+        self.checkpoint = checkpoint
+        self.debug = debug
+
+    def settings(self) -> Dict:
+        """OCR settings this engine runs with (used in cache keys)."""
+        return ocr_settings(self.triage, self.mode, self.preprocess, self.line_patterns, self.regions,
+                            self.check_fields, self.tesseract)
+
+    def run(self, pages: Iterable) -> List[Dict]:
+        """
+        OCR every page and return per-page results in page order.
+
+        Args:
+            pages: PIL page images (page 1 first) or PageRef objects
+
+        Returns:
+            List of ocr_page() result dicts, ordered by page number
+        """
+        options = {'cache_dir': self.cache_dir, 'triage': self.triage, 'mode': self.mode,
+                   'preprocess': self.preprocess, 'line_patterns': self.line_patterns,
+                   'regions': self.regions, 'check_fields': self.check_fields,
+                   'tesseract': self.tesseract, 'settings': self.settings()}
+        tasks = [(page, page.page_number if isinstance(page, PageRef) else i + 1, options)
+                 for i, page in enumerate(pages)]
+        tasks, resumed = self._resume(tasks)
+
+        results = list(resumed)
+        if tasks:
+            with get_governor().job(min(self.workers, len(tasks))) as workers:
+                if workers > 1 and len(tasks) > 1:
+                    try:
+                        results += self._run_parallel(tasks, workers)
+                    except Exception as e:
+                        # Pool could not start (e.g. restricted environment) - run in-process
+                        print(f"[WARNING] Parallel OCR failed ({e}), falling back to sequential", flush=True)
+                        results = list(resumed) + [self._record(_ocr_page_task(task)) for task in tasks]
+                else:
+                    results += [self._record(_ocr_page_task(task)) for task in tasks]
+
+        results.sort(key=lambda r: r['page'])
+
+        if resumed:
+            print(f"[INFO] OCR checkpoint: {len(resumed)}/{len(results)} pages resumed", flush=True)
+
+        cache_hits = sum(1 for r in results if r.get('cached'))
+        if cache_hits:
+            print(f"[INFO] Page OCR cache: {cache_hits}/{len(results)} pages reused", flush=True)
+
+        if self.debug:
+            for result in results:
+                for line in result['log']:
+                    print(line, flush=True)
+                if result['page_type'] not in ('boilerplate', 'blank'):
+                    print(f"[DEBUG] Page {result['page']}: {result['page_type']}", flush=True)
+
+        return results
+
+    def run_adaptive(self, pages: List[PageRef], dpi: int) -> List[Dict]:
+        """
+        OCR pages at their render DPI, then re-render and re-OCR at `dpi` only
+        the pages whose result is too weak (see needs_higher_dpi()).
+
+        Args:
+            pages: PageRef objects rendered at the starting (lower) DPI
+            dpi: DPI used for escalated pages
+
+        Returns:
+            List of ocr_page() result dicts, ordered by page number. Escalated
+            pages carry 'escalated' (the reason) and their final 'dpi'.
+        """
+        results = self.run(pages)
+        refs = {page.page_number: page for page in pages}
+
+        reasons = {}
+        for result in results:
+            if result.get('dpi', dpi) >= dpi:
+                continue
+            reason = needs_higher_dpi(result)
+            if reason:
+                reasons[result['page']] = reason
+        if not reasons:
+            print(f"[INFO] Adaptive DPI: all {len(results)} page(s) kept at the starting DPI", flush=True)
+            return results
+
+        print(f"[INFO] Adaptive DPI: re-OCR {len(reasons)}/{len(results)} page(s) at {dpi} DPI", flush=True)
+        if self.debug:
+            for page_number, reason in sorted(reasons.items()):
+                print(f"[DEBUG] Page {page_number}: escalating to {dpi} DPI ({reason})", flush=True)
+
+        retry = [PageRef(refs[n].file_path, n, dpi, refs[n].grayscale) for n in sorted(reasons)]
+        escalated = {}
+        for result in self.run(retry):
+            result['escalated'] = reasons[result['page']]
+            escalated[result['page']] = result
+        return [escalated.get(result['page'], result) for result in results]
+
+    def run_until(self, pages: List[PageRef], stop_check: Callable[[str], Optional[str]],
+                  dpi: int = None) -> List[Dict]:
+        """
+        OCR pages in page-order batches of `window` pages until stop_check says
+        the document is complete.
+
+        Args:
+            pages: PageRef objects
+            stop_check: Called with the assembled text of the pages OCRed so far;
+                returns a reason string to stop, or None to continue
+            dpi: Escalation DPI - batches go through run_adaptive() when the
+                pages are rendered below it
+
+        Returns:
+            List of result dicts for every page, in page order. Pages after the
+            stop have page_type 'skipped', no text and the reason in 'triage'.
+        """
+        results = []
+        for start in range(0, len(pages), self.window):
+            batch = pages[start:start + self.window]
+            if dpi and any(page.dpi < dpi for page in batch):
+                results.extend(self.run_adaptive(batch, dpi))
+            else:
+                results.extend(self.run(batch))
+
+            remaining = pages[start + self.window:]
+            if not remaining:
+                break
+            reason = stop_check(self.assemble_text(results))
+            if reason:
+                print(f"[INFO] Early stop after page {batch[-1].page_number} ({reason}): "
+                      f"skipping {len(remaining)} page(s)", flush=True)
+                results.extend({'page': page.page_number, 'page_type': 'skipped', 'text': '',
+                                'triage': {'reason': 'early_stop'}, 'passes': 0, 'log': [],
+                                'cached': False} for page in remaining)
+                break
+        return results
+
+    def _resume(self, tasks) -> Tuple[List, List[Dict]]:
+        """Split tasks into pages still to OCR and results resumed from the checkpoint."""
+        done = self.checkpoint.completed() if self.checkpoint is not None else {}
+        if not done:
+            return tasks, []
+
+        todo, resumed = [], []
+        for task in tasks:
+            page, page_number = task[0], task[1]
+            dpi = page.dpi if isinstance(page, PageRef) else DEFAULT_DPI
+            entry = done.get((page_number, dpi))
+            if entry is None:
+                todo.append(task)
+            else:
+                resumed.append(dict(entry, passes=0, cached=False, resumed=True,
+                                    log=[f"[DEBUG] Page {page_number}: resumed from OCR checkpoint"]))
+        return todo, resumed
+
+    def _record(self, result: Dict) -> Dict:
+        """Append a finished page to the job checkpoint (pages that failed to render have no dpi)."""
+        if self.checkpoint is not None and result.get('dpi'):
+            self.checkpoint.record(result)
+        return result
+
+    def _run_parallel(self, tasks, workers: int) -> List[Dict]:
+        """OCR pages in a pool of `workers` processes, keeping at most `window` pages in flight."""
+        results = []
+        max_in_flight = self.window
+
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(TESSERACT_CMD,)) as pool:
+            pending = []
+            for task in tasks:
+                pending.append(pool.submit(_ocr_page_task, task))
+                if len(pending) >= max_in_flight:
+                    results.append(self._record(pending.pop(0).result()))
+            for future in pending:
+                results.append(self._record(future.result()))
+
+        return results
+
+    @staticmethod
+    def triage_summary(results: List[Dict]) -> List[Dict]:
+        """Per-page triage decisions for parsing metadata."""
+        summary = []
+        for result in results:
+            entry = {'page': result['page'], 'page_type': result['page_type'],
+                     'passes': result.get('passes', 0)}
+            if result.get('mean_conf') is not None:
+                entry['mean_conf'] = result['mean_conf']
+            if result.get('pixel_ratio') is not None:
+                entry['pixel_ratio'] = result['pixel_ratio']
+            if result.get('pass_ms'):
+                entry['pass_ms'] = result['pass_ms']
+            if result.get('cached'):
+                entry['cached'] = True
+            if result.get('resumed'):
+                entry['resumed'] = True
+            if result.get('dpi'):
+                entry['dpi'] = result['dpi']
+            if result.get('escalated'):
+                entry['escalated'] = result['escalated']
+            if result.get('triage'):
+                entry.update(result['triage'])
+            summary.append(entry)
+        return summary
+
+    @staticmethod
+    def assemble_text(results: List[Dict]) -> str:
+        """Join page texts in order, skipping empty pages."""
+        all_text = ""
+        for result in results:
+            if result['text']:
+                all_text += result['text'] + "\n"
+        return all_text
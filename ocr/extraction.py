@@ -0,0 +1,479 @@
+# -*- coding: utf-8 -*-
+"""
+Text Extraction Service - One place that turns a PDF into text
+
+SmartParser, LLMParser and PDFParser all need "text layer, then OCR" and
+UniversalParser may run more than one of them on the same upload. They all
+call get_extraction_service().extract(file_path), which:
+
+1. Triages the PDF (metadata, page images, first pages' text layers); scanned
+   documents skip text extraction, others have their text layer read page by
+   page across a process pool, with the bank template's text backend
+2. OCRs only the pages without a usable text layer (all pages for scanned
+   documents) through OCREngine - classification, triage, PSM fallbacks
+   with the detected bank template's OCR profile (e.g. preprocessing)
+3. Caches the OCR output in the managed OCR cache store
+4. Memoizes the finished extraction per document (by content hash), so a
+   fallback parser on the same upload gets the text without re-reading,
+   re-rasterizing or re-OCRing anything
+
+A caller that can tell when a statement is complete (SmartParser, once the
+parsed totals reconcile) passes stop_check; for templates with "ocr":
+{"early_stop": true} scanned documents are then OCRed in page batches and
+the remaining pages skipped. Early-stopped text is memoized and cached
+separately, so callers without a stop_check still get every page.
+
+OCR jobs are checkpointed page by page (see checkpoint.py): if the process
+dies mid-document, OCRing the same file again (re-uploading it - uploads are
+temp files, so the checkpoint is keyed by content) picks up at the first
+missing page.
+
+The returned text is raw (not cleaned); each parser applies its own cleaning.
+"""
+
+import os
+import hashlib
+import threading
+import time
+from importlib.util import find_spec
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+# Availability probes only - the text layer and OCR themselves run in digital.py / engine.py
+PDFPLUMBER_AVAILABLE = find_spec('pdfplumber') is not None
+OCR_AVAILABLE = find_spec('pdf2image') is not None and find_spec('pytesseract') is not None
+
+try:
+    from config import (EXTRACTION_MEMO_SIZE, OCR_DPI_MODE, OCR_ADAPTIVE_START_DPI,
+                        OCR_ADAPTIVE_MIN_YIELD, OCR_ADAPTIVE_MIN_CONF, OCR_JOB_CHECKPOINTS)
+except ImportError:
+    EXTRACTION_MEMO_SIZE = 8
+    OCR_DPI_MODE = 'fixed'
+    OCR_ADAPTIVE_START_DPI = 250
+    OCR_ADAPTIVE_MIN_YIELD = 0.8
+    OCR_ADAPTIVE_MIN_CONF = 70
+    OCR_JOB_CHECKPOINTS = True
+
+from .engine import OCREngine
+from .rasterizer import render_page, page_refs
+from .tessdata import PassTimer, FAST, merge_pass_ms, format_pass_ms
+from .cache_store import get_cache_store
+from .checkpoint import OCRCheckpoint, pending_jobs
+from .page_cache import PIPELINE_SIGNATURE
+from .profiles import detect_bank, ocr_profile, templates_signature
+from .check_fields import checks_by_number
+from .pdf_triage import triage_pdf
+from .digital import extract_page_texts, get_text_backend
+
+# Documents with less text than this are treated as fully scanned
+MIN_DOCUMENT_TEXT_CHARS = 100
+
+# Pages whose text layer is shorter than this are treated as scanned and OCRed
+MIN_PAGE_TEXT_CHARS = 50
+
+# Cache namespace for whole-document / scanned-page-set OCR output
+NAMESPACE = 'documents'
+
+# Resolution the first page is rendered at for the bank-detection peek
+PEEK_DPI = 150
+
+
+def file_hash(file_path: str) -> str:
+    """MD5 of a file's contents (document identity for memo and cache keys)."""
+    hasher = hashlib.md5()
+    with open(file_path, 'rb') as f:
+        # Read in chunks for large files
+        for chunk in iter(lambda: f.read(65536), b''):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class TextExtractionService:
+    """
+    Shared PDF text extraction with OCR cache and per-document memo.
+
+    Usage:
+        extraction = get_extraction_service().extract("statement.pdf")
+        text = extraction['text']
+    """
+
+    def __init__(self, use_cache: bool = True, memo_size: int = None):
+        """
+        Initialize extraction service.
+
+        Args:
+            use_cache: Use the OCR cache store for OCR output
+            memo_size: Number of finished extractions kept in memory
+                       (default: config.EXTRACTION_MEMO_SIZE)
+        """
+        self.use_cache = use_cache
+        self.memo_size = memo_size if memo_size is not None else EXTRACTION_MEMO_SIZE
+        self.cache = get_cache_store()
+        self._memo = OrderedDict()
+        self._lock = threading.Lock()
+
+    def extract(self, file_path: str, debug: bool = False,
+                stop_check: Callable[[str], Optional[str]] = None) -> Dict:
+        """
+        Extract a PDF's text, OCRing at most once per document.
+
+        Args:
+            file_path: Path to PDF
+            debug: Print per-page OCR debug lines
+            stop_check: Called with the OCR text so far after each page batch of
+                a scanned document; a returned reason skips the remaining pages
+                (only for templates with "ocr": {"early_stop": true})
+
+        Returns:
+            Dict with 'text' (raw, pages in order), 'ocr_used', 'page_sources'
+            ({'digital': [...], 'ocr': [...]}), 'page_triage', 'check_fields'
+            (check-image field OCR keyed by check number), 'pdf_triage',
+            'early_stop' ({'after_page', 'skipped_pages'} or None) and 'file_hash'
+        """
+        doc_hash = file_hash(file_path)
+        memo_keys = [f"{doc_hash}:early", doc_hash] if stop_check else [doc_hash]
+        memo = None
+        with self._lock:
+            for memo_key in memo_keys:
+                memo = self._memo.get(memo_key)
+                if memo is not None:
+                    self._memo.move_to_end(memo_key)
+                    break
+        if memo is not None:
+            print("[INFO] Reusing text already extracted for this document", flush=True)
+            return dict(memo)
+
+        extraction = self._extract(file_path, doc_hash, debug, stop_check)
+
+        if self.memo_size:
+            memo_key = f"{doc_hash}:early" if extraction.get('early_stop') else doc_hash
+            with self._lock:
+                self._memo[memo_key] = extraction
+                while len(self._memo) > self.memo_size:
+                    self._memo.popitem(last=False)
+        return dict(extraction)
+
+    def forget(self, file_path: str = None):
+        """Drop one document (or everything) from the in-memory memo."""
+        with self._lock:
+            if file_path is None:
+                self._memo.clear()
+            else:
+                doc_hash = file_hash(file_path)
+                self._memo.pop(doc_hash, None)
+                self._memo.pop(f"{doc_hash}:early", None)
+
+    def resume_pending(self) -> int:
+        """
+        Finish OCR jobs interrupted by a crash or restart (see checkpoint.py).
+
+        Only helps deployments that keep uploaded files on disk: app uploads
+        are temp files deleted after parsing, so their jobs are skipped here
+        and stay checkpointed for a re-upload of the same file (checkpoints
+        expire after OCR_JOB_MAX_AGE_HOURS).
+
+        Returns:
+            Number of jobs resumed
+        """
+        resumed = 0
+        for job in pending_jobs():
+            path = job.get('file_path')
+            if not path or not os.path.exists(path) or file_hash(path) != job.get('file_hash'):
+                print(f"[INFO] Skipping OCR job {job['job'][:12]}: source file missing or changed "
+                      f"(kept for a re-upload)", flush=True)
+                continue
+            print(f"[INFO] Resuming OCR job {job['job'][:12]} for {os.path.basename(path)} "
+                  f"({job['pages_done']} page(s) done)", flush=True)
+            try:
+                self.extract(path)
+                resumed += 1
+            except Exception as e:
+                print(f"[WARNING] Could not resume OCR job {job['job'][:12]}: {e}", flush=True)
+        return resumed
+
+    def _extract(self, file_path: str, doc_hash: str, debug: bool,
+                 stop_check: Callable[[str], Optional[str]] = None) -> Dict:
+        """
+        Extract text page by page: text layer where present, OCR for the rest.
+
+        Mixed statements (digital summary pages + scanned check images) keep
+        their digital pages as-is and only OCR the pages without a text layer.
+        Documents with no usable text layer at all are OCRed in full.
+        """
+        page_texts = []
+        pdf_triage = triage_pdf(file_path)
+
+        if pdf_triage['path'] == 'scanned' and OCR_AVAILABLE:
+            # No text layer worth reading - straight to OCR
+            print(f"[INFO] PDF triage: scanned ({pdf_triage['reason']}), skipping text extraction", flush=True)
+        elif PDFPLUMBER_AVAILABLE:
+            try:
+                page_texts = self._extract_text_layer(file_path, pdf_triage['pages'] or None)
+            except Exception as e:
+                print(f"[WARNING] pdfplumber failed: {e}")
+
+        text = "".join(page_text + "\n" for page_text in page_texts if page_text)
+        extraction = {
+            'text': text,
+            'ocr_used': False,
+            'page_sources': {'digital': list(range(1, len(page_texts) + 1)), 'ocr': []},
+            'page_triage': [],
+            'check_fields': {},
+            'pdf_triage': pdf_triage,
+            'early_stop': None,
+            'file_hash': doc_hash,
+        }
+
+        if not OCR_AVAILABLE:
+            return extraction
+
+        if len(text.strip()) < MIN_DOCUMENT_TEXT_CHARS:
+            # If text is too short, OCR the whole document (with caching)
+            print("[INFO] Using OCR for text extraction...", flush=True)
+            entry = self._cache_get(f"{doc_hash}:early") if stop_check else None
+            entry = entry or self._cache_get(doc_hash)
+            if entry and len(entry.get('text', '')) > MIN_DOCUMENT_TEXT_CHARS:
+                print("[INFO] Using cached OCR result", flush=True)
+            else:
+                checkpoint = self._checkpoint(doc_hash, file_path, doc_hash)
+                results = self.ocr_pages(file_path, debug=debug, stop_check=stop_check,
+                                         checkpoint=checkpoint)
+                skipped = [r['page'] for r in results if r['page_type'] == 'skipped']
+                entry = {'text': OCREngine.assemble_text(results),
+                         'page_triage': OCREngine.triage_summary(results),
+                         'pages': [r['page'] for r in results if r['page_type'] != 'skipped'],
+                         'check_fields': checks_by_number(results)}
+                if skipped:
+                    entry['early_stop'] = {'after_page': skipped[0] - 1, 'skipped_pages': skipped}
+                if len(entry['text'].strip()) >= MIN_DOCUMENT_TEXT_CHARS:
+                    self._cache_put(f"{doc_hash}:early" if skipped else doc_hash, entry)
+                if results and checkpoint is not None:
+                    checkpoint.complete()
+
+            extraction.update({
+                'text': entry['text'],
+                'ocr_used': True,
+                'page_sources': {'digital': [], 'ocr': entry.get('pages', [])},
+                'page_triage': entry.get('page_triage', []),
+                'check_fields': entry.get('check_fields', {}),
+                'early_stop': entry.get('early_stop'),
+            })
+            return extraction
+
+        # Hybrid: OCR only the pages without a usable text layer
+        scanned_pages = [n for n, page_text in enumerate(page_texts, 1)
+                         if len(page_text.strip()) < MIN_PAGE_TEXT_CHARS]
+        if not scanned_pages:
+            return extraction
+
+        print(f"[INFO] Mixed PDF: {len(page_texts) - len(scanned_pages)} digital page(s), "
+              f"OCR for {len(scanned_pages)} scanned page(s)", flush=True)
+
+        cache_id = f"{doc_hash}:pages:{','.join(map(str, scanned_pages))}"
+        entry = self._cache_get(cache_id)
+        if entry and entry.get('page_texts'):
+            print(f"[INFO] Using cached OCR result for {len(scanned_pages)} scanned page(s)", flush=True)
+        else:
+            checkpoint = self._checkpoint(cache_id, file_path, doc_hash, scanned_pages)
+            results = self.ocr_pages(file_path, scanned_pages, bank_hint_text=text, debug=debug,
+                                     checkpoint=checkpoint)
+            entry = {'page_texts': {str(r['page']): r['text'] for r in results},
+                     'page_triage': OCREngine.triage_summary(results),
+                     'check_fields': checks_by_number(results)}
+            if any(entry['page_texts'].values()):
+                self._cache_put(cache_id, entry)
+            if results and checkpoint is not None:
+                checkpoint.complete()
+        ocr_texts = {int(n): page_text for n, page_text in entry['page_texts'].items()}
+
+        merged = []
+        for n, page_text in enumerate(page_texts, 1):
+            if n in ocr_texts:
+                page_text = ocr_texts[n]
+            if page_text:
+                merged.append(page_text)
+
+        extraction.update({
+            'text': "".join(page_text + "\n" for page_text in merged),
+            'ocr_used': True,
+            'page_sources': {
+                'digital': [n for n in range(1, len(page_texts) + 1) if n not in ocr_texts],
+                'ocr': sorted(ocr_texts),
+            },
+            'page_triage': entry.get('page_triage', []),
+            'check_fields': entry.get('check_fields', {}),
+        })
+        return extraction
+
+    def _extract_text_layer(self, file_path: str, page_count: Optional[int]) -> List[str]:
+        """
+        Page text layers with the configured text backend, or with the bank
+        template's ("ocr": {"text_backend": ...}) once page 1 identifies the bank.
+        """
+        default = get_text_backend()
+        first_page = default.extract_range(file_path, 0, 1)
+        bank_name, template = detect_bank(first_page[0] if first_page else '')
+        backend = get_text_backend(ocr_profile(template, bank_name)['text_backend'])
+
+        if backend.name == default.name:
+            return first_page + extract_page_texts(file_path, page_count, backend=default.name, start=1)
+
+        print(f"[INFO] Using {backend.name} text backend for {bank_name}", flush=True)
+        try:
+            return extract_page_texts(file_path, page_count, backend=backend.name)
+        except Exception as e:
+            print(f"[WARNING] {backend.name} text extraction failed ({e}), using {default.name}", flush=True)
+            return first_page + extract_page_texts(file_path, page_count, backend=default.name, start=1)
+
+    def ocr_pages(self, file_path: str, page_numbers: List[int] = None,
+                  bank_hint_text: str = None, debug: bool = False,
+                  stop_check: Callable[[str], Optional[str]] = None,
+                  checkpoint: OCRCheckpoint = None) -> List[Dict]:
+        """
+        OCR pages with optimized smart page processing.
+
+        Performance Optimizations:
+        1. Page-at-a-time grayscale rendering at 350 DPI (bounded memory), or
+           adaptive DPI: a lower starting DPI with only weak pages re-rendered
+        2. Quick classification using fast OCR settings
+        3. Skip boilerplate pages after quick scan
+        4. Full OCR only on pages with transaction content
+        5. Pages OCRed in parallel across OCR_WORKERS processes
+        6. Early stop: with a stop_check and a template that enables it, pages
+           are OCRed in batches and the rest skipped once the statement is complete
+        7. Resume: with a job checkpoint, pages finished by an interrupted run
+           are reused without rendering or OCR
+
+        Args:
+            file_path: Path to PDF
+            page_numbers: 1-based pages to OCR (default: all pages)
+            bank_hint_text: Text already extracted from the document (digital
+                pages); used for bank detection instead of an OCR peek
+            debug: Print per-page debug lines
+            stop_check: Early-stop check, called with the OCR text so far (see
+                OCREngine.run_until()); used if the template enables early_stop
+            checkpoint: Job checkpoint finished pages are recorded to / resumed from
+
+        Returns:
+            Per-page OCR result dicts in page order (empty list on failure);
+            pages skipped by an early stop have page_type 'skipped'
+        """
+        start_time = time.time()
+
+        try:
+            # Check if this might be a CrossFirst statement by peeking at first page
+            # CrossFirst requires higher DPI (400+) for PSM 4 to capture withdrawal lines
+            dpi = 350  # Default DPI
+            adaptive = OCR_DPI_MODE == 'adaptive'
+            render_dpi = min(OCR_ADAPTIVE_START_DPI, dpi) if adaptive else dpi
+            peek_timer = PassTimer()
+
+            if bank_hint_text:
+                peek_text = bank_hint_text
+            else:
+                # Cheap low-DPI render for the peek; the working DPI depends on
+                # what the peek finds (CrossFirst, template DPI hints), so the
+                # full-resolution render is left to the OCR pass below
+                peek_text = ''
+                peek_image = render_page(file_path, (page_numbers or [1])[0], dpi=PEEK_DPI)
+                if peek_image is not None:
+                    peek_text = peek_timer.image_to_string(peek_image, '--oem 3 --psm 6', step='peek', tier=FAST)
+                del peek_image
+
+            if 'CrossFirst' in peek_text or 'IntraFi' in peek_text or 'CROSSFIRST' in peek_text:
+                dpi = 400  # Higher DPI for CrossFirst to capture transaction details
+                if debug:
+                    print("[DEBUG] Detected CrossFirst - using 400 DPI for better OCR", flush=True)
+                if not adaptive:
+                    render_dpi = dpi
+
+            # Per-bank OCR settings (template "ocr" section)
+            bank_name, template = detect_bank(peek_text)
+            profile = ocr_profile(template, bank_name)
+            if profile['dpi'] and profile['dpi'] != dpi:
+                dpi = profile['dpi']  # Template render DPI hint
+                if debug:
+                    print(f"[DEBUG] {bank_name} template asks for {dpi} DPI", flush=True)
+                render_dpi = min(OCR_ADAPTIVE_START_DPI, dpi) if adaptive else dpi
+            if debug and bank_name:
+                print(f"[DEBUG] OCR profile for {bank_name}: preprocess={profile['preprocess']}, "
+                      f"{len(profile['regions'])} region(s)", flush=True)
+
+            # Pages are rendered one at a time (inside the OCR workers) so peak
+            # memory is bounded by the in-flight window, not the page count
+            pages = page_refs(file_path, render_dpi, page_numbers=page_numbers)
+
+            total_pages = len(pages)
+            engine = OCREngine(preprocess=profile['preprocess'], line_patterns=profile['line_patterns'],
+                               regions=profile['regions'], check_fields=profile['check_fields'],
+                               tesseract=profile['tesseract'], checkpoint=checkpoint, debug=debug)
+            dpi_label = f"{render_dpi} DPI (adaptive, up to {dpi})" if render_dpi < dpi else f"{dpi} DPI"
+            print(f"[INFO] Processing {total_pages} pages at {dpi_label} with smart OCR "
+                  f"({engine.workers} worker(s), window {engine.window})...", flush=True)
+
+            # Classification, boilerplate skipping and PSM fallbacks happen per page
+            if stop_check and profile['early_stop']:
+                results = engine.run_until(pages, stop_check, dpi if render_dpi < dpi else None)
+            elif render_dpi < dpi:
+                results = engine.run_adaptive(pages, dpi)
+            else:
+                results = engine.run(pages)
+
+            processed_count = sum(1 for r in results if r['text'])
+            skipped_count = sum(1 for r in results if r['page_type'] in ('boilerplate', 'blank', 'skipped'))
+            passes = sum(r.get('passes', 0) for r in results)
+
+            elapsed = time.time() - start_time
+            print(f"[INFO] OCR complete: {processed_count} pages processed, {skipped_count} skipped, "
+                  f"{passes} tesseract passes in {elapsed:.1f}s", flush=True)
+            pass_ms = merge_pass_ms([peek_timer.summary()] + [r.get('pass_ms') for r in results])
+            if pass_ms:
+                print(f"[INFO] Tesseract time by pass: {format_pass_ms(pass_ms)}", flush=True)
+
+            return results
+
+        except Exception as e:
+            print(f"[ERROR] OCR failed: {e}")
+            import traceback
+            traceback.print_exc()
+            return []
+
+    def _cache_key(self, cache_id: str) -> str:
+        """Document cache key: document id + OCR pipeline, settings, DPI strategy and template OCR profiles."""
+        engine = OCREngine()
+        settings = dict(engine.settings(),
+                        templates=templates_signature(include_patterns=engine.mode == 'confidence'))
+        if OCR_DPI_MODE == 'adaptive':
+            settings['dpi_mode'] = (f"adaptive:{OCR_ADAPTIVE_START_DPI}:"
+                                    f"{OCR_ADAPTIVE_MIN_YIELD}:{OCR_ADAPTIVE_MIN_CONF}")
+        return self.cache.make_key(cache_id, PIPELINE_SIGNATURE, settings=settings)
+
+    def _checkpoint(self, cache_id: str, file_path: str, doc_hash: str,
+                    page_numbers: List[int] = None) -> Optional[OCRCheckpoint]:
+        """Checkpoint for an OCR job, identified like its document cache entry."""
+        if not OCR_JOB_CHECKPOINTS:
+            return None
+        return OCRCheckpoint(self._cache_key(cache_id), file_path=file_path, file_hash=doc_hash,
+                             pages=page_numbers)
+
+    def _cache_get(self, cache_id: str) -> Optional[Dict]:
+        if not self.use_cache:
+            return None
+        return self.cache.get(NAMESPACE, self._cache_key(cache_id))
+
+    def _cache_put(self, cache_id: str, entry: Dict):
+        if self.use_cache:
+            self.cache.put(NAMESPACE, self._cache_key(cache_id), entry)
+            self.cache.flush_stats()  # Document done - merge this job's cache counters
+
+
+# Singleton instance
+_service_instance = None
+
+
+def get_extraction_service() -> TextExtractionService:
+    """Get the process-wide text extraction service."""
+    global _service_instance
+    if _service_instance is None:
+        _service_instance = TextExtractionService()
+    return _service_instance
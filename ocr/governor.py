@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+OCR Resource Governor - One CPU budget for every OCR job in the process
+
+Each upload's OCREngine starts its own pool of OCR_WORKERS processes, and
+every tesseract child may start its own OpenMP threads. With several users
+uploading scanned statements at once (plus Flask's own threads) that is
+uploads x workers x OpenMP threads on the same cores, and page throughput
+collapses. The governor keeps it predictable:
+
+- A process-wide pool of CPU slots, sized from the CPUs this process may
+  actually use: sched affinity and the cgroup v2 / v1 CPU quota (containers
+  often report the host's core count through os.cpu_count()), or
+  OCR_MAX_CONCURRENCY.
+- Each job (one OCREngine.run() or one parallel text-layer extraction)
+  reserves between 1 and its own worker count in slots, waiting while none
+  are free, and sizes its pool to what it was granted.
+- OMP_THREAD_LIMIT (OCR_OMP_THREAD_LIMIT, default 1) for tesseract, since
+  page-level parallelism already uses every slot. It goes into the
+  environment of spawned tesseract processes only, plus os.environ of the
+  OCR pool workers (for in-process tesserocr) - never the app process's own
+  environment, where it would also cap numpy / torch / chromadb.
+
+stats() reports slot usage, queue depth and wait times (GET /api/ocr/governor).
+The budget is per process; with several app server processes, divide the
+CPUs between them with OCR_MAX_CONCURRENCY.
+
+Usage:
+    with get_governor().job(workers=4) as granted:
+        ...  # run at most `granted` OCR processes
+"""
+
+import os
+import threading
+import time
+from collections import ChainMap
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+try:
+    import pytesseract
+    TESSERACT_AVAILABLE = True
+except ImportError:
+    TESSERACT_AVAILABLE = False
+
+try:
+    from config import OCR_MAX_CONCURRENCY, OCR_OMP_THREAD_LIMIT
+except ImportError:
+    OCR_MAX_CONCURRENCY = 0
+    OCR_OMP_THREAD_LIMIT = 1
+
+# cgroup CPU quota files (v2 first, then the v1 mount points)
+CGROUP_V2_CPU_MAX = '/sys/fs/cgroup/cpu.max'
+CGROUP_V1_DIRS = ('/sys/fs/cgroup/cpu', '/sys/fs/cgroup/cpu,cpuacct')
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_limit() -> Optional[int]:
+    """CPUs allowed by the cgroup CPU quota (rounded up), or None if unlimited/unknown."""
+    cpu_max = _read(CGROUP_V2_CPU_MAX)
+    if cpu_max:
+        parts = cpu_max.split()
+        if len(parts) == 2 and parts[0] != 'max':
+            try:
+                quota, period = int(parts[0]), int(parts[1])
+                if quota > 0 and period > 0:
+                    return max(1, -(-quota // period))
+            except ValueError:
+                pass
+        return None
+
+    for cgroup_dir in CGROUP_V1_DIRS:
+        quota = _read(os.path.join(cgroup_dir, 'cpu.cfs_quota_us'))
+        period = _read(os.path.join(cgroup_dir, 'cpu.cfs_period_us'))
+        if quota is None or period is None:
+            continue
+        try:
+            quota, period = int(quota), int(period)
+        except ValueError:
+            continue
+        if quota > 0 and period > 0:
+            return max(1, -(-quota // period))
+    return None
+
+
+def available_cpus() -> int:
+    """CPUs this process can use: affinity mask, capped by the cgroup quota."""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except (AttributeError, OSError):
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit:
+        cpus = min(cpus, limit)
+    return max(1, cpus)
+
+
+def apply_thread_limit(limit: int = None, process_env: bool = False):
+    """
+    Set OMP_THREAD_LIMIT for tesseract started from this process.
+
+    Spawned tesseract processes (pytesseract) get it through their own
+    environment - a live view of os.environ plus the limit - so nothing else
+    in the process is capped. In-process engines (tesserocr) read it from
+    os.environ when OpenMP starts, which also caps every other OpenMP
+    library in the process; process_env=True does that and is meant for the
+    OCR pool workers only (engine._init_worker).
+
+    An OMP_THREAD_LIMIT already set in the environment wins; limit 0 leaves
+    tesseract's default.
+    """
+    limit = OCR_OMP_THREAD_LIMIT if limit is None else limit
+    if not limit or 'OMP_THREAD_LIMIT' in os.environ:
+        return
+    if process_env:
+        os.environ['OMP_THREAD_LIMIT'] = str(limit)
+    # pytesseract passes its module-level `environ` to every tesseract Popen
+    if TESSERACT_AVAILABLE and hasattr(pytesseract.pytesseract, 'environ'):
+        pytesseract.pytesseract.environ = ChainMap({'OMP_THREAD_LIMIT': str(limit)}, os.environ)
+
+
+class OCRGovernor:
+    """Process-wide CPU slots shared by concurrent OCR jobs."""
+
+    def __init__(self, slots: int = None):
+        """
+        Initialize governor.
+
+        Args:
+            slots: Concurrent OCR processes allowed (default: OCR_MAX_CONCURRENCY,
+                   0 = available_cpus())
+        """
+        self.slots = max(1, slots or OCR_MAX_CONCURRENCY or available_cpus())
+        self._cond = threading.Condition()
+        self._free = self.slots
+        self._waiting = 0
+        self._active_jobs = 0
+        self._jobs = 0
+        self._waited_jobs = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @contextmanager
+    def job(self, workers: int = 1):
+        """
+        Reserve CPU slots for one OCR job, waiting while none are free.
+
+        Args:
+            workers: Slots the job would like (its worker count)
+
+        Yields:
+            Slots granted (1..workers) - the job's pool size
+        """
+        wanted = max(1, min(workers, self.slots))
+        start = time.perf_counter()
+        with self._cond:
+            self._waiting += 1
+            while self._free == 0:
+                self._cond.wait()
+            self._waiting -= 1
+            granted = min(wanted, self._free)
+            self._free -= granted
+            self._active_jobs += 1
+            self._jobs += 1
+
+            waited = time.perf_counter() - start
+            if waited >= 0.001:
+                self._waited_jobs += 1
+            self._wait_total += waited
+            self._wait_max = max(self._wait_max, waited)
+
+        if waited >= 1:
+            print(f"[INFO] OCR governor: waited {waited:.1f}s for CPU slots "
+                  f"({granted}/{wanted} granted)", flush=True)
+        try:
+            yield granted
+        finally:
+            with self._cond:
+                self._free += granted
+                self._active_jobs -= 1
+                self._cond.notify_all()
+
+    def stats(self) -> Dict:
+        """Slot usage, queue depth and wait times since start-up."""
+        with self._cond:
+            return {
+                'slots': self.slots,
+                'in_use': self.slots - self._free,
+                'active_jobs': self._active_jobs,
+                'queue_depth': self._waiting,
+                'jobs': self._jobs,
+                'waited_jobs': self._waited_jobs,
+                'wait_total_s': round(self._wait_total, 3),
+                'wait_avg_s': round(self._wait_total / self._jobs, 3) if self._jobs else 0.0,
+                'wait_max_s': round(self._wait_max, 3),
+                'omp_thread_limit': os.environ.get('OMP_THREAD_LIMIT') or OCR_OMP_THREAD_LIMIT or None,
+            }
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor() -> OCRGovernor:
+    """Get the process-wide OCR governor."""
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = OCRGovernor()
+        return _governor
+
+
+apply_thread_limit()
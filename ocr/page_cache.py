@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Page OCR Cache - Per-page OCR results keyed by page content + OCR settings
+
+The whole-document cache is all-or-nothing: a crash on page 40, a DPI change
+or a tweak to the PSM fallbacks throws it away. This cache stores each page
+separately under a key built from:
+
+- SHA-256 of the rendered page pixels (so identical pages shared between
+  statements - check-image inserts, disclosures - hit the same entry)
+- render DPI
+- OCR pipeline signature plus per-run settings (triage, OCR mode, ...)
+- tesseract version and cache format version
+
+Entries live in the 'pages' namespace of the managed OCR cache store
+(compressed, size-capped, LRU-evicted - see cache_store.py), which is safe
+to share between concurrent OCR workers.
+"""
+
+import hashlib
+from typing import Dict, Optional
+
+from .cache_store import get_cache_store
+
+# Bump when ocr_page() changes what text it produces for the same image
+PIPELINE_SIGNATURE = 'psm6-classify/psm4-check/psm4-11-3-crossfirst/v1'
+
+NAMESPACE = 'pages'
+
+
+def page_content_hash(image) -> str:
+    """SHA-256 of a page image's mode, size and pixel data."""
+    hasher = hashlib.sha256()
+    hasher.update(f"{image.mode}:{image.size[0]}x{image.size[1]}:".encode('ascii'))
+    hasher.update(image.tobytes())
+    return hasher.hexdigest()
+
+
+class PageOCRCache:
+    """
+    Per-page OCR results in the managed OCR cache store.
+
+    Usage:
+        cache = PageOCRCache()
+        key = cache.make_key(image, dpi=350)
+        result = cache.get(key)
+        if result is None:
+            result = ocr_page(image, 1)
+            cache.put(key, result)
+    """
+
+    def __init__(self, cache_dir: str = None):
+        """
+        Args:
+            cache_dir: Cache store root (default: data/ocr_cache)
+        """
+        self.store = get_cache_store(cache_dir)
+        self.cache_dir = self.store.cache_dir
+
+    def make_key(self, image, dpi: Optional[int] = None, settings: Optional[Dict] = None) -> str:
+        """Build the cache key for a rendered page."""
+        return self.store.make_key(page_content_hash(image), dpi or 0, PIPELINE_SIGNATURE,
+                                   settings=settings)
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Return cached {'page_type', 'text', 'triage', 'mean_conf', 'checks'} for a key, or None."""
+        return self.store.get(NAMESPACE, key)
+
+    def put(self, key: str, result: Dict):
+        """Store a page result (page_type, text, triage, mean_conf, check field records)."""
+        self.store.put(NAMESPACE, key, {'page_type': result['page_type'], 'text': result['text'],
+                                        'triage': result.get('triage'),
+                                        'mean_conf': result.get('mean_conf'),
+                                        'checks': result.get('checks')})
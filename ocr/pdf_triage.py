@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+PDF Triage - Pick the extraction path before any full-document work
+
+Running pdfplumber's text extraction over every page of a 100-page scanned
+statement only to find there is no text layer wastes seconds before OCR
+even starts. Triage looks at a few cheap signals instead:
+
+1. Document metadata - scanner / capture software in Producer or Creator
+2. Image XObjects in each sampled page's resources (no content-stream parsing)
+3. Character counts of the first OCR_TRIAGE_SAMPLE_PAGES pages' text layers
+
+Paths:
+- 'scanned': no sampled page has a usable text layer and they carry page
+  images - skip text extraction, go straight to OCR
+- 'digital': every sampled page has a text layer
+- 'mixed':   anything else (both are extracted page by page as before)
+"""
+
+import re
+from typing import Dict
+
+try:
+    import pdfplumber
+    from pdfminer.pdftypes import resolve1
+    PDFPLUMBER_AVAILABLE = True
+except ImportError:
+    PDFPLUMBER_AVAILABLE = False
+
+try:
+    from config import OCR_TRIAGE_SAMPLE_PAGES
+except ImportError:
+    OCR_TRIAGE_SAMPLE_PAGES = 3
+
+# Sampled pages with fewer text-layer characters than this count as image-only
+MIN_SAMPLE_CHARS = 50
+
+# Producer / Creator values written by scanners and capture software
+SCANNER_PRODUCERS = re.compile(
+    r'scan|capture|canon|xerox|ricoh|konica|km_|kyocera|sharp|brother|epson|fujitsu|'
+    r'lexmark|hp digital sending|twain|image ?(?:to|2) ?pdf|ocrmypdf',
+    re.IGNORECASE
+)
+
+
+def _image_xobjects(resources, depth: int = 0) -> int:
+    """Count image XObjects in a resource dict (one level into form XObjects)."""
+    if not resources:
+        return 0
+    xobjects = resolve1(resolve1(resources).get('XObject')) or {}
+    count = 0
+    for ref in xobjects.values():
+        xobject = resolve1(ref)
+        attrs = getattr(xobject, 'attrs', {})
+        subtype = getattr(resolve1(attrs.get('Subtype')), 'name', None)
+        if subtype == 'Image':
+            count += 1
+        elif subtype == 'Form' and depth == 0:
+            count += _image_xobjects(attrs.get('Resources'), depth + 1)
+    return count
+
+
+def triage_pdf(file_path: str, sample_pages: int = None) -> Dict:
+    """
+    Classify a PDF as digital, scanned or mixed from cheap signals.
+
+    Args:
+        file_path: Path to PDF
+        sample_pages: Pages whose text layer is checked (default: config.OCR_TRIAGE_SAMPLE_PAGES)
+
+    Returns:
+        Dict with 'path' ('digital', 'scanned', 'mixed' or 'unknown'), 'reason',
+        'pages' (page count), 'producer' and per-sample 'sample_chars' /
+        'sample_images'
+    """
+    sample_pages = sample_pages or OCR_TRIAGE_SAMPLE_PAGES
+    if not PDFPLUMBER_AVAILABLE:
+        return {'path': 'unknown', 'reason': 'pdfplumber_unavailable', 'pages': 0}
+
+    try:
+        with pdfplumber.open(file_path) as pdf:
+            metadata = pdf.metadata or {}
+            producer = ' '.join(str(metadata.get(k, '')) for k in ('Producer', 'Creator')).strip()
+            pages = len(pdf.pages)
+
+            sample_chars = []
+            sample_images = []
+            for page in pdf.pages[:sample_pages]:
+                sample_chars.append(len([c for c in page.chars if not c['text'].isspace()]))
+                try:
+                    sample_images.append(_image_xobjects(page.page_obj.resources))
+                except Exception:
+                    sample_images.append(0)
+    except Exception as e:
+        print(f"[WARNING] PDF triage failed: {e}", flush=True)
+        return {'path': 'unknown', 'reason': 'triage_failed', 'pages': 0}
+
+    triage = {'pages': pages, 'producer': producer, 'sample_chars': sample_chars,
+              'sample_images': sample_images}
+
+    has_text = [chars >= MIN_SAMPLE_CHARS for chars in sample_chars]
+    if not sample_chars:
+        triage.update({'path': 'unknown', 'reason': 'no_pages'})
+    elif not any(has_text) and (all(sample_images) or SCANNER_PRODUCERS.search(producer)):
+        reason = 'scanner_producer' if SCANNER_PRODUCERS.search(producer) else 'image_pages'
+        triage.update({'path': 'scanned', 'reason': reason})
+    elif all(has_text):
+        triage.update({'path': 'digital', 'reason': 'text_layer'})
+    else:
+        triage.update({'path': 'mixed', 'reason': 'partial_text_layer'})
+    return triage
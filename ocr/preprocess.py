@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Image Preprocessing - NumPy page cleanup before tesseract
+
+Steps (each optional, combined through named presets or per-template dicts):
+- borders:      Blank out dark scanner frames / shadows along the page edges
+- deskew:       Projection-profile skew estimate (vectorized shear + bincount)
+                and a single rotation of the page
+- binarize:     Adaptive (local mean, integral image) thresholding, robust to
+                uneven lighting and security-pattern backgrounds
+- denoise:      Remove isolated specks (ink pixels with at most one ink neighbour)
+- glyph_height: Downscale so text lines are about this many pixels tall;
+                tesseract is fastest and most accurate around 30-40 px lines,
+                so oversized scans are shrunk instead of OCRed at full size
+
+Selected with OCR_PREPROCESS (default 'none') or per bank template:
+    "ocr": {"preprocess": "clean"}
+    "ocr": {"preprocess": {"preset": "binarize", "glyph_height": 32}}
+"""
+
+import math
+from typing import Dict, Optional, Union
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+PRESETS = {
+    'none': {},
+    'deskew': {'deskew': True},
+    'clean': {'deskew': True, 'borders': True, 'denoise': True},
+    'binarize': {'deskew': True, 'borders': True, 'binarize': True, 'denoise': True},
+    'fast': {'deskew': True, 'borders': True, 'binarize': True, 'denoise': True, 'glyph_height': 36},
+}
+
+# Skew search range / resolution (degrees); smaller angles are left alone
+MAX_SKEW = 5.0
+SKEW_STEP = 0.25
+MIN_SKEW = 0.3
+
+# Working width for skew estimation
+SKEW_WIDTH = 1000
+
+# Pixels darker than this count as ink for masks and statistics
+INK_LEVEL = 128
+
+# Border removal: edge rows/columns this dark (ink fraction), within this margin
+BORDER_INK = 0.6
+BORDER_MARGIN = 0.05
+
+# Adaptive threshold: window as a fraction of page width, and how far below
+# the local mean a pixel must be to count as ink
+BINARIZE_WINDOW = 0.02
+BINARIZE_SENSITIVITY = 0.15
+
+# Rows processed at a time by binarization (bounds temporary arrays)
+STRIP_ROWS = 256
+
+# Downscaling never goes below this factor
+MIN_SCALE = 0.5
+
+
+def resolve_profile(profile: Union[str, Dict, None]) -> Dict:
+    """
+    Turn a preset name or options dict into preprocessing options.
+
+    Dicts may name a base preset ({'preset': 'clean', 'glyph_height': 32}).
+    """
+    if not profile:
+        return {}
+    if isinstance(profile, str):
+        if profile.lower() not in PRESETS:
+            print(f"[WARNING] Unknown OCR preprocess preset '{profile}', skipping preprocessing", flush=True)
+            return {}
+        return dict(PRESETS[profile.lower()])
+
+    options = resolve_profile(profile.get('preset')) if profile.get('preset') else {}
+    options.update({k: v for k, v in profile.items() if k != 'preset'})
+    return options
+
+
+def profile_name(profile: Union[str, Dict, None]) -> Optional[str]:
+    """Stable name of a profile for cache keys/metadata (None = no preprocessing)."""
+    options = resolve_profile(profile)
+    if not any(options.values()):
+        return None
+    if isinstance(profile, str):
+        return profile.lower()
+    return ','.join(f"{k}={options[k]}" for k in sorted(options))
+
+
+def estimate_skew(pixels) -> float:
+    """
+    Skew angle in degrees (positive = text rises to the right).
+
+    Shears the ink coordinates for each candidate angle and scores how sharply
+    they fall into rows (sum of squared row counts) - no image rotations.
+    """
+    height, width = pixels.shape
+    step = max(1, width // SKEW_WIDTH)
+    ink = pixels[::step, ::step] < INK_LEVEL
+    ys, xs = np.nonzero(ink)
+    if len(ys) < 500:
+        return 0.0
+
+    best_angle, best_score = 0.0, -1.0
+    for angle in np.arange(-MAX_SKEW, MAX_SKEW + SKEW_STEP / 2, SKEW_STEP):
+        rows = ys + np.round(xs * math.tan(math.radians(angle))).astype(np.int64)
+        counts = np.bincount(rows - rows.min()).astype(np.float64)
+        score = float(np.dot(counts, counts))
+        if score > best_score:
+            best_angle, best_score = float(angle), score
+    return best_angle
+
+
+def _edge_extent(density, margin: int) -> int:
+    """Number of leading entries (within margin) up to the last one above BORDER_INK."""
+    dark = np.nonzero(density[:margin] > BORDER_INK)[0]
+    return int(dark.max()) + 1 if len(dark) else 0
+
+
+def remove_borders(pixels):
+    """Whiten dark frames along the page edges (scanner lids, copy shadows)."""
+    height, width = pixels.shape
+    ink = pixels < INK_LEVEL
+    rows = ink.mean(axis=1)
+    cols = ink.mean(axis=0)
+    margin_y = max(1, int(height * BORDER_MARGIN))
+    margin_x = max(1, int(width * BORDER_MARGIN))
+
+    top = _edge_extent(rows, margin_y)
+    bottom = _edge_extent(rows[::-1], margin_y)
+    left = _edge_extent(cols, margin_x)
+    right = _edge_extent(cols[::-1], margin_x)
+
+    if top or bottom or left or right:
+        pixels = pixels.copy()
+        pixels[:top] = 255
+        pixels[height - bottom:] = 255
+        pixels[:, :left] = 255
+        pixels[:, width - right:] = 255
+    return pixels
+
+
+def adaptive_binarize(pixels, window: int = None, sensitivity: float = BINARIZE_SENSITIVITY):
+    """
+    Local-mean threshold (Bradley): ink where a pixel is `sensitivity` darker
+    than the mean of its window. Uses an integral image built per row strip
+    (the strip plus a window of overlap), so memory stays at a few strips
+    rather than a full-page int64 integral.
+    """
+    height, width = pixels.shape
+    window = window or max(15, int(width * BINARIZE_WINDOW) | 1)
+    half = window // 2
+
+    x0 = np.clip(np.arange(width) - half, 0, width)
+    x1 = np.clip(np.arange(width) + half + 1, 0, width)
+    out = np.empty_like(pixels, dtype=np.uint8)
+    scale = int(round((1.0 - sensitivity) * 1000))
+
+    for start in range(0, height, STRIP_ROWS):
+        stop = min(height, start + STRIP_ROWS)
+        # Rows the strip's windows reach; uint32 holds 255 x (strip + overlap) x width
+        top, bottom = max(0, start - half), min(height, stop + half)
+        integral = np.zeros((bottom - top + 1, width + 1), dtype=np.uint32)
+        np.cumsum(np.cumsum(pixels[top:bottom], axis=0, dtype=np.uint32), axis=1, out=integral[1:, 1:])
+
+        y = np.arange(start, stop)
+        y0 = np.clip(y - half, 0, height) - top
+        y1 = np.clip(y + half + 1, 0, height) - top
+        sums = (integral[np.ix_(y1, x1)].astype(np.int64) - integral[np.ix_(y0, x1)]
+                - integral[np.ix_(y1, x0)] + integral[np.ix_(y0, x0)])
+        counts = (y1 - y0)[:, None] * (x1 - x0)[None, :]
+        # pixel < mean * (1 - sensitivity), in integer arithmetic
+        ink = pixels[start:stop].astype(np.int64) * counts * 1000 < sums * scale
+        out[start:stop] = np.where(ink, 0, 255)
+    return out
+
+
+def remove_noise(pixels):
+    """Whiten isolated ink pixels (at most one ink neighbour in the 3x3 block)."""
+    ink = (pixels < INK_LEVEL).astype(np.uint8)
+    padded = np.pad(ink, 1)
+    height, width = ink.shape
+    neighbours = np.zeros_like(ink)
+    for dy in (0, 1, 2):
+        for dx in (0, 1, 2):
+            if dy == 1 and dx == 1:
+                continue
+            neighbours += padded[dy:dy + height, dx:dx + width]
+    specks = (ink == 1) & (neighbours <= 1)
+    if specks.any():
+        pixels = pixels.copy()
+        pixels[specks] = 255
+    return pixels
+
+
+def text_line_height(pixels) -> float:
+    """Median height (px) of text lines, from runs of inked rows. 0 if unknown."""
+    density = (pixels < INK_LEVEL).mean(axis=1)
+    # Relative threshold so stray specks between lines don't join them up
+    rows = density > max(0.002, float(density.max()) * 0.05)
+    # Run boundaries of consecutive inked rows
+    edges = np.diff(np.concatenate(([0], rows.astype(np.int8), [0])))
+    starts = np.nonzero(edges == 1)[0]
+    stops = np.nonzero(edges == -1)[0]
+    heights = stops - starts
+    heights = heights[heights >= 4]
+    return float(np.median(heights)) if len(heights) else 0.0
+
+
+def rescale_to_glyph_height(image, glyph_height: int, pixels=None):
+    """Downscale so the median text line is about `glyph_height` pixels tall."""
+    if pixels is None:
+        pixels = np.asarray(image.convert('L'))
+    line_height = text_line_height(pixels)
+    if not line_height:
+        return image
+    scale = max(MIN_SCALE, glyph_height / line_height)
+    if scale >= 0.9:
+        return image
+    size = (max(1, int(image.size[0] * scale)), max(1, int(image.size[1] * scale)))
+    return image.resize(size, Image.LANCZOS)
+
+
+def preprocess_image(image, profile: Union[str, Dict, None]):
+    """
+    Apply a preprocessing profile to a page image.
+
+    Args:
+        image: PIL page image
+        profile: Preset name ('none', 'deskew', 'clean', 'binarize', 'fast') or options dict
+
+    Returns:
+        Preprocessed grayscale PIL image (the input image if nothing applies)
+    """
+    options = resolve_profile(profile)
+    if not any(options.values()) or not NUMPY_AVAILABLE:
+        return image
+
+    gray = image if image.mode == 'L' else image.convert('L')
+    pixels = np.asarray(gray)
+
+    # Borders first - a dark frame would dominate the skew estimate
+    if options.get('borders'):
+        pixels = remove_borders(pixels)
+    if options.get('deskew'):
+        angle = estimate_skew(pixels)
+        if abs(angle) >= MIN_SKEW:
+            rotated = Image.fromarray(pixels).rotate(-angle, resample=Image.BICUBIC, fillcolor=255)
+            pixels = np.asarray(rotated)
+    if options.get('binarize'):
+        pixels = adaptive_binarize(pixels)
+    if options.get('denoise'):
+        pixels = remove_noise(pixels)
+
+    result = Image.fromarray(pixels)
+    if options.get('glyph_height'):
+        result = rescale_to_glyph_height(result, int(options['glyph_height']), pixels)
+    return result
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+OCR Profiles - Per-bank OCR settings from config/bank_templates.json
+
+OCR runs before the parsers know which bank a statement is from, so the
+extraction service detects the bank from text it already has (the digital
+pages, or the low-DPI first-page peek) and looks up that template's "ocr"
+section:
+
+    "ocr": {
+        "preprocess": "clean",
+        "regions": [{"name": "transactions", "box": [0.03, 0.12, 0.97, 0.92]}],
+        "check_fields": true,
+        "text_backend": "pdftotext",
+        "early_stop": true,
+        "end_marker": "Daily Balance Summary",
+        "tesseract": {"fallback": {"patterns": ["MM/DD", "#,###.##"]}},
+        "dpi": 400
+    }
+
+Keys not set by the template fall back to the global config values. The
+template's transaction patterns are also returned as line shapes for
+confidence-driven OCR (OCR_MODE=confidence). Regions are described in
+regions.py, per-pass tesseract options and the render DPI hint in
+tesseract_options.py.
+"""
+
+import os
+import json
+import hashlib
+from typing import Dict, List, Optional, Tuple
+
+try:
+    from config import OCR_PREPROCESS, OCR_CHECK_FIELDS, PDF_TEXT_BACKEND, OCR_EARLY_STOP
+except ImportError:
+    OCR_PREPROCESS = 'none'
+    OCR_CHECK_FIELDS = False
+    PDF_TEXT_BACKEND = 'pdfplumber'
+    OCR_EARLY_STOP = False
+
+from .bank_detection import BankDetector
+from .regions import clean_regions
+from .tesseract_options import clean_pass_options
+
+TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'config', 'bank_templates.json')
+
+_templates = None
+_detector = None
+
+
+def load_bank_templates() -> Dict:
+    """Bank templates keyed by bank name (loaded once per process)."""
+    global _templates
+    if _templates is None:
+        try:
+            with open(TEMPLATES_PATH, 'r', encoding='utf-8') as f:
+                _templates = json.load(f).get('banks', {})
+        except Exception as e:
+            print(f"[WARNING] Could not load bank templates for OCR profiles: {e}", flush=True)
+            _templates = {}
+    return _templates
+
+
+def get_bank_detector() -> BankDetector:
+    """Bank detector over the bank templates (built once per process)."""
+    global _detector
+    if _detector is None:
+        _detector = BankDetector(load_bank_templates())
+    return _detector
+
+
+def detect_bank(text: str) -> Tuple[Optional[str], Optional[Dict]]:
+    """Best-scoring template for the text (same detector as SmartParser, see bank_detection.py)."""
+    result = get_bank_detector().detect(text)
+    return result['bank'], result['template']
+
+
+def line_patterns(template: Optional[Dict]) -> List[str]:
+    """Regexes of a template's transaction rows (transaction_patterns + legacy transaction_pattern)."""
+    template = template or {}
+    patterns = [p['pattern'] for p in template.get('transaction_patterns', []) if p.get('pattern')]
+    if template.get('transaction_pattern'):
+        patterns.append(template['transaction_pattern'])
+    return patterns
+
+
+def ocr_profile(template: Optional[Dict], bank_name: str = None) -> Dict:
+    """OCR settings for a template (global defaults for unknown banks)."""
+    ocr = (template or {}).get('ocr', {})
+    dpi = ocr.get('dpi')
+    if dpi is not None and not (isinstance(dpi, int) and 150 <= dpi <= 600):
+        print(f"[WARNING] Ignoring OCR dpi {dpi!r} for {bank_name or 'template'}: expected 150-600",
+              flush=True)
+        dpi = None
+    return {
+        'preprocess': ocr.get('preprocess', OCR_PREPROCESS),
+        'line_patterns': line_patterns(template),
+        'regions': clean_regions(ocr.get('regions'), bank_name),
+        'check_fields': bool(ocr.get('check_fields', OCR_CHECK_FIELDS)),
+        'text_backend': ocr.get('text_backend', PDF_TEXT_BACKEND),
+        'early_stop': bool(ocr.get('early_stop', OCR_EARLY_STOP)),
+        'end_marker': ocr.get('end_marker'),
+        'tesseract': clean_pass_options(ocr.get('tesseract'), bank_name),
+        'dpi': dpi,
+    }
+
+
+def templates_signature(include_patterns: bool = False) -> str:
+    """
+    Hash of every template's "ocr" section - changes invalidate document OCR cache keys.
+
+    With include_patterns the transaction line shapes are hashed too
+    (they change which pass confidence-driven OCR keeps).
+    """
+    sections = {name: template.get('ocr') for name, template in load_bank_templates().items()}
+    if include_patterns:
+        sections = {name: {'ocr': section, 'line_patterns': line_patterns(load_bank_templates()[name])}
+                    for name, section in sections.items()}
+    return hashlib.sha1(json.dumps(sections, sort_keys=True).encode('utf-8')).hexdigest()[:12]
@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Page Rasterizer - Page-at-a-time PDF rendering with bounded memory
+
+convert_from_path() on a whole document keeps every full-resolution page
+image alive at once, which is what gets long combined statements OOM-killed.
+This module renders one page per poppler call instead, in single-channel
+grayscale by default (a third of the RGB footprint; tesseract binarizes
+grayscale input anyway).
+
+Usage:
+    for page_number, image in iter_pages("statement.pdf", dpi=350):
+        ...
+
+    # Or hand lazy page references to OCREngine so rendering happens
+    # inside the worker that OCRs the page
+    pages = page_refs("statement.pdf", dpi=350)
+"""
+
+import os
+from typing import Iterator, List, Optional, Tuple
+
+try:
+    from pdf2image import convert_from_path, pdfinfo_from_path
+    PDF2IMAGE_AVAILABLE = True
+except ImportError:
+    PDF2IMAGE_AVAILABLE = False
+
+try:
+    from config import POPPLER_PATH, OCR_GRAYSCALE
+except ImportError:
+    POPPLER_PATH = None
+    OCR_GRAYSCALE = True
+
+
+def _poppler_kwargs() -> dict:
+    """Return poppler_path kwarg if a bundled/configured Poppler exists."""
+    if POPPLER_PATH and os.path.exists(POPPLER_PATH):
+        return {'poppler_path': POPPLER_PATH}
+    return {}
+
+
+def get_page_count(file_path: str) -> int:
+    """Get number of pages in a PDF without rendering it."""
+    try:
+        info = pdfinfo_from_path(file_path, **_poppler_kwargs())
+        return int(info.get('Pages', 0))
+    except Exception as e:
+        print(f"[WARNING] pdfinfo failed ({e}), counting pages with pdfplumber", flush=True)
+
+    try:
+        import pdfplumber
+        with pdfplumber.open(file_path) as pdf:
+            return len(pdf.pages)
+    except Exception:
+        return 0
+
+
+def render_page(file_path: str, page_number: int, dpi: int, grayscale: bool = None):
+    """
+    Render a single page.
+
+    Args:
+        file_path: Path to PDF
+        page_number: 1-based page number
+        dpi: Render resolution
+        grayscale: Render single-channel 'L' image (default: config.OCR_GRAYSCALE)
+
+    Returns:
+        PIL image, or None if the page could not be rendered
+    """
+    if grayscale is None:
+        grayscale = OCR_GRAYSCALE
+
+    images = convert_from_path(file_path, dpi=dpi, first_page=page_number, last_page=page_number,
+                               grayscale=grayscale, **_poppler_kwargs())
+    return images[0] if images else None
+
+
+def iter_pages(file_path: str, dpi: int, grayscale: bool = None,
+               first_page: int = 1, last_page: Optional[int] = None) -> Iterator[Tuple[int, object]]:
+    """
+    Yield (page_number, image) one page at a time.
+
+    Only the page currently held by the caller is alive, so peak memory
+    stays flat regardless of page count.
+    """
+    if last_page is None:
+        last_page = get_page_count(file_path)
+
+    for page_number in range(first_page, last_page + 1):
+        image = render_page(file_path, page_number, dpi, grayscale)
+        if image is not None:
+            yield page_number, image
+
+
+class PageRef:
+    """
+    Lazy, picklable reference to a page that is rendered on demand.
+
+    Passed to OCR workers instead of an image so that rendering happens in
+    the worker and the parent never holds page bitmaps.
+    """
+
+    __slots__ = ('file_path', 'page_number', 'dpi', 'grayscale')
+
+    def __init__(self, file_path: str, page_number: int, dpi: int, grayscale: bool = None):
+        self.file_path = file_path
+        self.page_number = page_number
+        self.dpi = dpi
+        self.grayscale = OCR_GRAYSCALE if grayscale is None else grayscale
+
+    def __getstate__(self):
+        return (self.file_path, self.page_number, self.dpi, self.grayscale)
+
+    def __setstate__(self, state):
+        self.file_path, self.page_number, self.dpi, self.grayscale = state
+
+    def load(self):
+        """Render the referenced page."""
+        return render_page(self.file_path, self.page_number, self.dpi, self.grayscale)
+
+
+def page_refs(file_path: str, dpi: int, grayscale: bool = None,
+              page_numbers: List[int] = None) -> List[PageRef]:
+    """Build lazy references for every page of a PDF (or only the given 1-based pages)."""
+    if page_numbers is None:
+        page_numbers = range(1, get_page_count(file_path) + 1)
+    return [PageRef(file_path, n, dpi, grayscale) for n in page_numbers]
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Region-of-Interest OCR - OCR only the parts of a page a bank template names
+
+On recurring statement layouts most of each page is logos, disclosures and
+margins. A bank template can declare the regions that matter, as fractions
+of the page width/height, in its "ocr" section:
+
+    "ocr": {
+        "regions": [
+            {"name": "summary", "box": [0.05, 0.10, 0.95, 0.35], "pages": "first"},
+            {"name": "transactions", "box": [0.03, 0.12, 0.97, 0.92], "pages": "rest", "psm": 6}
+        ]
+    }
+
+box:   [left, top, right, bottom], each 0-1
+pages: "all" (default), "first", "rest" (every page after the first) or a
+       list of 1-based page numbers
+psm:   Tesseract page segmentation mode for the region (default 6)
+tesseract: Tesseract options for the region - whitelist, user patterns, DPI
+       hint (see tesseract_options.py); numeric-only regions OCR faster and
+       cleaner with a whitelist
+
+Regions of a page are cropped and OCRed one after another in the page's
+worker (so they reuse its tesseract engine and its governor slot) and
+their text is joined top to bottom. Pages no region applies to, and pages whose regions
+come back empty (e.g. a changed statement layout), get full-page OCR.
+Keep the bank's identifier (usually the first-page header) inside a region
+or out of region OCR, since the parsers detect the bank from the OCR text.
+"""
+
+import hashlib
+import json
+from typing import Dict, List, Optional
+
+from .tessdata import PassTimer
+from .tesseract_options import clean_tesseract_options
+
+DEFAULT_REGION_PSM = 6
+
+
+def valid_region(region: Dict) -> bool:
+    """True if a region has a usable relative box."""
+    box = region.get('box') if isinstance(region, dict) else None
+    if not isinstance(box, (list, tuple)) or len(box) != 4:
+        return False
+    try:
+        left, top, right, bottom = (float(v) for v in box)
+    except (TypeError, ValueError):
+        return False
+    return 0 <= left < right <= 1 and 0 <= top < bottom <= 1
+
+
+def clean_regions(regions: Optional[List[Dict]], bank_name: str = None) -> List[Dict]:
+    """Drop (with a warning) template regions whose box is missing or out of range, and unusable tesseract options."""
+    cleaned = []
+    for region in regions or []:
+        if valid_region(region):
+            if 'tesseract' in region:
+                region = dict(region)
+                where = f"{bank_name or 'template'} region {region.get('name', '?')}"
+                options = clean_tesseract_options(region.pop('tesseract'), where)
+                if options:
+                    region['tesseract'] = options
+            cleaned.append(region)
+        else:
+            print(f"[WARNING] Ignoring OCR region {region!r} for {bank_name or 'template'}: "
+                  f"box must be [left, top, right, bottom] fractions", flush=True)
+    return cleaned
+
+
+def regions_for_page(regions: List[Dict], page_number: int) -> List[Dict]:
+    """Regions that apply to a 1-based page number."""
+    selected = []
+    for region in regions or []:
+        pages = region.get('pages', 'all')
+        if pages == 'all':
+            applies = True
+        elif pages == 'first':
+            applies = page_number == 1
+        elif pages == 'rest':
+            applies = page_number > 1
+        elif isinstance(pages, (list, tuple)):
+            applies = page_number in pages
+        else:
+            applies = False
+        if applies:
+            selected.append(region)
+    return selected
+
+
+def regions_signature(regions: Optional[List[Dict]]) -> Optional[str]:
+    """Short hash of a region list for cache keys (None when there are none)."""
+    if not regions:
+        return None
+    return hashlib.sha1(json.dumps(regions, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+def crop_region(image, box):
+    """Crop a relative [left, top, right, bottom] box out of a page image."""
+    width, height = image.size
+    left, top, right, bottom = (float(v) for v in box)
+    return image.crop((int(left * width), int(top * height),
+                       max(int(left * width) + 1, int(right * width)),
+                       max(int(top * height) + 1, int(bottom * height))))
+
+
+def ocr_regions(image, regions: List[Dict], timer: PassTimer = None) -> Dict:
+    """
+    OCR each region of a page, in the calling page worker.
+
+    Args:
+        image: Full page image
+        regions: Regions that apply to this page (see regions_for_page())
+        timer: Pass timer of the page (best model tier)
+
+    Returns:
+        Dict with 'text' (regions joined top to bottom), 'regions' (name and
+        character count per region), 'pixel_ratio' (share of the page OCRed)
+        and 'passes' (tesseract runs)
+    """
+    timer = timer or PassTimer()
+    ordered = sorted(regions, key=lambda r: (float(r['box'][1]), float(r['box'][0])))
+    crops = [crop_region(image, region['box']) for region in ordered]
+
+    # Sequential on purpose: pages are already OCRed in parallel (one governor
+    # slot per worker), and extra threads would each build their own tesserocr engine
+    texts = [timer.image_to_string(crop, f"--oem 3 --psm {region.get('psm', DEFAULT_REGION_PSM)}",
+                                   step='region', options=region.get('tesseract'))
+             for region, crop in zip(ordered, crops)]
+
+    page_pixels = max(1, image.size[0] * image.size[1])
+    region_pixels = sum(crop.size[0] * crop.size[1] for crop in crops)
+    return {
+        'text': '\n'.join(text.strip() for text in texts if text.strip()),
+        'regions': [{'name': region.get('name', f'region{i + 1}'), 'chars': len(text.strip())}
+                    for i, (region, text) in enumerate(zip(ordered, texts))],
+        'pixel_ratio': round(min(1.0, region_pixels / page_pixels), 3),
+        'passes': len(crops),
+    }
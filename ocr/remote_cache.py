@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Remote OCR Cache Tier - OCR results shared across app nodes via MongoDB GridFS
+
+Each app container has its own local data/ocr_cache. With this tier enabled,
+entries written on one node are also uploaded to a GridFS bucket, and a local
+miss on another node is served from GridFS (then kept locally), so a
+re-upload that lands on a different node skips OCR entirely.
+
+The tier never opens its own connection: it is given a db provider (app.py's
+get_db) and does nothing while that returns None. Entry bytes are the same
+compressed JSON the local store writes.
+
+Usage (app.py):
+    from ocr import enable_remote_cache
+    enable_remote_cache(get_db)
+"""
+
+from datetime import datetime
+from typing import Callable, Dict, Optional
+
+try:
+    import gridfs
+    GRIDFS_AVAILABLE = True
+except ImportError:
+    GRIDFS_AVAILABLE = False
+
+try:
+    from config import OCR_REMOTE_CACHE_BUCKET
+except ImportError:
+    OCR_REMOTE_CACHE_BUCKET = 'ocr_cache'
+
+from .cache_store import get_cache_store
+
+
+class GridFSCacheTier:
+    """
+    GridFS-backed cache tier.
+
+    Files are named '<namespace>/<key>'; keys are content + settings hashes,
+    so an existing file never needs to be overwritten.
+    """
+
+    def __init__(self, db_provider: Callable, bucket_name: str = None):
+        """
+        Args:
+            db_provider: Callable returning a pymongo Database, or None when unavailable
+            bucket_name: GridFS bucket name (default: config.OCR_REMOTE_CACHE_BUCKET)
+        """
+        if not GRIDFS_AVAILABLE:
+            raise ImportError("pymongo/gridfs not installed. Run: pip install pymongo")
+        self.db_provider = db_provider
+        self.bucket_name = bucket_name or OCR_REMOTE_CACHE_BUCKET
+        self._db = None
+        self._bucket = None
+
+    def _get_bucket(self):
+        db = self.db_provider()
+        if db is None:
+            return None
+        if self._bucket is None or db is not self._db:
+            self._db = db
+            self._bucket = gridfs.GridFSBucket(db, bucket_name=self.bucket_name)
+            # Lookups are by filename; GridFS only indexes (filename, uploadDate)
+            # once the first file is written, so make sure it exists up front
+            db[f"{self.bucket_name}.files"].create_index([('filename', 1), ('uploadDate', 1)])
+        return self._bucket
+
+    def get(self, namespace: str, key: str) -> Optional[bytes]:
+        """Entry bytes for a key, or None (missing or MongoDB unavailable)."""
+        try:
+            bucket = self._get_bucket()
+            if bucket is None:
+                return None
+            with bucket.open_download_stream_by_name(f"{namespace}/{key}") as stream:
+                return stream.read()
+        except gridfs.errors.NoFile:
+            return None
+        except Exception as e:
+            print(f"[WARNING] Remote OCR cache read failed: {e}", flush=True)
+            return None
+
+    def put(self, namespace: str, key: str, data: bytes) -> bool:
+        """Upload entry bytes unless the key is already stored. Returns True if uploaded."""
+        filename = f"{namespace}/{key}"
+        try:
+            bucket = self._get_bucket()
+            if bucket is None:
+                return False
+            if self._db[f"{self.bucket_name}.files"].find_one({'filename': filename}, {'_id': 1}):
+                return False
+            bucket.upload_from_stream(filename, data, metadata={
+                'namespace': namespace,
+                'created_at': datetime.utcnow(),
+            })
+            return True
+        except Exception as e:
+            print(f"[WARNING] Remote OCR cache write failed: {e}", flush=True)
+            return False
+
+    def stats(self) -> Dict:
+        """Entry count and stored bytes in the bucket."""
+        try:
+            bucket = self._get_bucket()
+            if bucket is None:
+                return {'available': False, 'bucket': self.bucket_name}
+            totals = list(self._db[f"{self.bucket_name}.files"].aggregate([
+                {'$group': {'_id': None, 'entries': {'$sum': 1}, 'bytes': {'$sum': '$length'}}}
+            ]))
+            totals = totals[0] if totals else {'entries': 0, 'bytes': 0}
+            return {'available': True, 'bucket': self.bucket_name,
+                    'entries': totals['entries'], 'bytes': totals['bytes']}
+        except Exception as e:
+            return {'available': False, 'bucket': self.bucket_name, 'error': str(e)}
+
+
+def enable_remote_cache(db_provider: Callable, bucket_name: str = None) -> bool:
+    """
+    Put a GridFS tier behind the process-wide OCR cache store.
+
+    Args:
+        db_provider: Callable returning a pymongo Database or None (app.py's get_db)
+        bucket_name: GridFS bucket name (default: config.OCR_REMOTE_CACHE_BUCKET)
+
+    Returns:
+        True if the tier was enabled
+    """
+    try:
+        tier = GridFSCacheTier(db_provider, bucket_name)
+    except ImportError as e:
+        print(f"[WARNING] Remote OCR cache unavailable: {e}", flush=True)
+        return False
+    get_cache_store().set_remote_tier(tier)
+    print(f"[INFO] Remote OCR cache enabled (GridFS bucket '{tier.bucket_name}')", flush=True)
+    return True
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Tesseract Model Tiers - Fast model for throwaway passes, best model for detail
+
+Every tesseract call used `--oem 3` with the installed traineddata, including
+passes whose text is thrown away: the triage thumbnail, the bank-detection
+peek and the PSM 6 classification pass. Two tiers can be configured:
+
+- fast (OCR_MODEL_FAST): triage thumbnails, peeks and page classification -
+  e.g. the integer tessdata_fast models
+- best (OCR_MODEL_BEST): every pass whose text is kept - transaction pages,
+  fallback PSMs, template regions, check fields, layout mode
+
+Each value is either a tessdata directory (passed as --tessdata-dir) or the
+name of a traineddata file in the default directory (passed as -l, e.g.
+"eng_fast"). An empty best model means the installed default; an empty fast
+model means the fast tier uses the best model. Without a separate fast model
+nothing changes: the classification pass doubles as the page text, as before.
+With one, content pages get their text from a separate best-model pass.
+
+PassTimer wraps the OCR backend and records wall time per step and tier, so
+the savings show up in each page's 'pass_ms' and in the OCR log. It also
+applies the bank template's tesseract options for each step (see
+tesseract_options.py).
+
+Usage:
+    timer = PassTimer()
+    text = timer.image_to_string(image, '--oem 3 --psm 6', step='classify', tier=FAST)
+    timer.summary()   # {'classify/fast': {'passes': 1, 'ms': 212.4}}
+"""
+
+import os
+import shlex
+import threading
+import time
+from typing import Dict, List, Optional
+
+try:
+    from config import OCR_MODEL_FAST, OCR_MODEL_BEST
+except ImportError:
+    OCR_MODEL_FAST = ''
+    OCR_MODEL_BEST = ''
+
+from .backends import get_backend
+from .tesseract_options import build_config
+
+FAST = 'fast'
+BEST = 'best'
+
+
+def _model_args(model: str) -> str:
+    """Command-line arguments selecting a model: a tessdata directory or a traineddata name."""
+    if not model:
+        return ''
+    if os.path.isdir(model):
+        return f" --tessdata-dir {shlex.quote(model)}"
+    return f" -l {shlex.quote(model)}"
+
+
+def fast_tier_enabled() -> bool:
+    """True if the fast tier uses a different model than the best tier."""
+    return bool(OCR_MODEL_FAST) and OCR_MODEL_FAST != OCR_MODEL_BEST
+
+
+def effective_tier(tier: str) -> str:
+    """Tier a pass actually runs with (fast passes use the best model when no fast model is set)."""
+    return FAST if tier == FAST and fast_tier_enabled() else BEST
+
+
+def tier_config(config: str, tier: str = BEST) -> str:
+    """Add the tier's model selection to a tesseract config string."""
+    model = OCR_MODEL_FAST if effective_tier(tier) == FAST else OCR_MODEL_BEST
+    return (config or '') + _model_args(model)
+
+
+def models_signature() -> Optional[Dict]:
+    """Configured models for cache keys (None when both tiers use the installed default)."""
+    if not OCR_MODEL_FAST and not OCR_MODEL_BEST:
+        return None
+    return {FAST: OCR_MODEL_FAST or None, BEST: OCR_MODEL_BEST or None}
+
+
+class PassTimer:
+    """OCR backend front-end that applies the model tier and template options, and times every pass."""
+
+    def __init__(self, backend=None, options: Dict[str, Dict] = None, dpi: int = None):
+        """
+        Args:
+            backend: OCR backend (default: get_backend())
+            options: Template tesseract options per step (see tesseract_options.py)
+            dpi: Render DPI of the page, for "dpi": true options
+        """
+        self.backend = backend or get_backend()
+        self.options = options or {}
+        self.dpi = dpi
+        self.totals = {}
+        self._lock = threading.Lock()
+
+    def _config(self, config: str, step: str, tier: str, options: Optional[Dict]) -> str:
+        options = options if options is not None else self.options.get(step)
+        return build_config(tier_config(config, tier), options, self.dpi)
+
+    def _record(self, step: str, tier: str, seconds: float):
+        key = f"{step}/{tier}"
+        with self._lock:
+            entry = self.totals.setdefault(key, {'passes': 0, 'ms': 0.0})
+            entry['passes'] += 1
+            entry['ms'] += seconds * 1000
+
+    def image_to_string(self, image, config: str, step: str, tier: str = BEST,
+                        options: Dict = None) -> str:
+        """OCR with the step's template options (or `options`, e.g. a region's own)."""
+        start = time.perf_counter()
+        try:
+            return self.backend.image_to_string(image, config=self._config(config, step, tier, options))
+        finally:
+            self._record(step, effective_tier(tier), time.perf_counter() - start)
+
+    def image_to_data(self, image, config: str, step: str, tier: str = BEST,
+                      options: Dict = None) -> Dict:
+        start = time.perf_counter()
+        try:
+            return self.backend.image_to_data(image, config=self._config(config, step, tier, options))
+        finally:
+            self._record(step, effective_tier(tier), time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict]:
+        """Passes and milliseconds per 'step/tier'."""
+        with self._lock:
+            return {key: {'passes': entry['passes'], 'ms': round(entry['ms'], 1)}
+                    for key, entry in self.totals.items()}
+
+
+def merge_pass_ms(summaries: List[Optional[Dict]]) -> Dict[str, Dict]:
+    """Add up per-page 'pass_ms' summaries (pages without one, e.g. cache hits, are skipped)."""
+    totals = {}
+    for summary in summaries:
+        for key, entry in (summary or {}).items():
+            total = totals.setdefault(key, {'passes': 0, 'ms': 0.0})
+            total['passes'] += entry.get('passes', 0)
+            total['ms'] = round(total['ms'] + entry.get('ms', 0.0), 1)
+    return totals
+
+
+def format_pass_ms(totals: Dict[str, Dict]) -> str:
+    """One-line 'step/tier Nx S.Ss' report, slowest first."""
+    ordered = sorted(totals.items(), key=lambda item: -item[1]['ms'])
+    return ', '.join(f"{key} {entry['passes']}x {entry['ms'] / 1000:.1f}s" for key, entry in ordered)
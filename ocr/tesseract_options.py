@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Template Tesseract Options - Constrain tesseract per pass or per region
+
+Transaction tables hold dates, amounts and check numbers, but tesseract
+reads them with the full English model and dictionary, which is where most
+of SmartParser's OCR repairs (O/0, S/5, l/1 in dates and amounts) come
+from. A bank template can constrain individual passes in its "ocr" section:
+
+    "ocr": {
+        "tesseract": {
+            "fallback": {"patterns": ["MM/DD", "#,###.##"]}
+        },
+        "regions": [
+            {"name": "checks", "box": [0.03, 0.55, 0.97, 0.95], "pages": "first",
+             "tesseract": {"whitelist": "0123456789/.,$-# ", "patterns": ["MM/DD", "#,###.##"],
+                           "variables": {"load_system_dawg": 0, "load_freq_dawg": 0}}}
+        ],
+        "dpi": 400
+    }
+
+Options (per pass under "tesseract", or per region):
+- whitelist: characters tesseract may output (-c tessedit_char_whitelist)
+- patterns:  user patterns (--user-patterns); presets "MM/DD", "MM/DD/YY",
+             "MM/DD/YYYY", "#,###.##", "check_number", or raw tesseract
+             patterns such as "\\d\\d/\\d\\d"
+- variables: other tesseract variables (-c name=value)
+- dpi:       resolution hint (--dpi); true = the page's render DPI
+
+Passes: classify, detail, fallback, layout and region (every region without
+options of its own). Only whitelist numeric passes/regions - a whitelist on
+a full page would drop the transaction descriptions. The template-level
+"dpi" is a render DPI hint for the whole statement (like the built-in
+400 DPI for CrossFirst).
+"""
+
+import os
+import json
+import shlex
+import hashlib
+import tempfile
+from typing import Dict, List, Optional
+
+# Passes a template can configure (tessdata.PassTimer step names)
+CONFIGURABLE_STEPS = ('classify', 'detail', 'fallback', 'layout', 'region')
+
+# Tesseract user-pattern presets (\d = digit, \* = repeat the previous class)
+PATTERN_PRESETS = {
+    'MM/DD': [r'\d/\d', r'\d/\d\d', r'\d\d/\d', r'\d\d/\d\d'],
+    'MM/DD/YY': [r'\d/\d/\d\d', r'\d/\d\d/\d\d', r'\d\d/\d/\d\d', r'\d\d/\d\d/\d\d'],
+    'MM/DD/YYYY': [r'\d/\d/\d\d\d\d', r'\d/\d\d/\d\d\d\d', r'\d\d/\d/\d\d\d\d', r'\d\d/\d\d/\d\d\d\d'],
+    '#,###.##': [r'\d\*.\d\d', r'\d\*,\d\d\d.\d\d', r'\d\*,\d\d\d,\d\d\d.\d\d',
+                 r'$\d\*.\d\d', r'$\d\*,\d\d\d.\d\d', r'$\d\*,\d\d\d,\d\d\d.\d\d'],
+    'check_number': [r'\d\d\d', r'\d\d\d\d', r'\d\d\d\d\d', r'#\d\d\d\d'],
+}
+
+# User-pattern files are written once per pattern set, shared by all workers
+PATTERNS_DIR = os.path.join(tempfile.gettempdir(), 'ocr_user_patterns')
+
+
+def clean_tesseract_options(options, where: str = 'template') -> Optional[Dict]:
+    """
+    Keep the usable keys of a tesseract options dict (warning about the rest).
+
+    Returns:
+        Dict with whitelist / patterns / variables / dpi, or None if nothing is usable
+    """
+    if not isinstance(options, dict):
+        if options is not None:
+            print(f"[WARNING] Ignoring tesseract options {options!r} for {where}: expected an object",
+                  flush=True)
+        return None
+
+    cleaned = {}
+    for key, value in options.items():
+        if key == 'whitelist' and isinstance(value, str) and value:
+            cleaned['whitelist'] = value
+        elif key == 'patterns' and isinstance(value, list) and all(isinstance(p, str) for p in value):
+            cleaned['patterns'] = value
+        elif key == 'variables' and isinstance(value, dict):
+            cleaned['variables'] = {str(name): str(v) for name, v in value.items()}
+        elif key == 'dpi' and (value is True or (isinstance(value, int) and 70 <= value <= 1200)):
+            cleaned['dpi'] = value
+        else:
+            print(f"[WARNING] Ignoring tesseract option {key}={value!r} for {where}", flush=True)
+    return cleaned or None
+
+
+def clean_pass_options(passes, bank_name: str = None) -> Dict[str, Dict]:
+    """Per-pass options of a template's "tesseract" section, keyed by step name."""
+    cleaned = {}
+    for step, options in (passes or {}).items():
+        where = f"{bank_name or 'template'} {step} pass"
+        if step not in CONFIGURABLE_STEPS:
+            print(f"[WARNING] Ignoring tesseract options for {where}: passes are "
+                  f"{', '.join(CONFIGURABLE_STEPS)}", flush=True)
+            continue
+        options = clean_tesseract_options(options, where)
+        if options:
+            cleaned[step] = options
+    return cleaned
+
+
+def options_signature(options: Optional[Dict]) -> Optional[str]:
+    """Short hash of tesseract options for cache keys (None when there are none)."""
+    if not options:
+        return None
+    return hashlib.sha1(json.dumps(options, sort_keys=True).encode('utf-8')).hexdigest()[:12]
+
+
+def expand_patterns(patterns: List[str]) -> List[str]:
+    """Replace preset names with their tesseract patterns."""
+    expanded = []
+    for pattern in patterns:
+        for line in PATTERN_PRESETS.get(pattern, [pattern]):
+            if line not in expanded:
+                expanded.append(line)
+    return expanded
+
+
+def patterns_file(patterns: List[str]) -> str:
+    """Path of a user-patterns file holding these patterns (written on first use)."""
+    content = '\n'.join(expand_patterns(patterns)) + '\n'
+    digest = hashlib.sha1(content.encode('utf-8')).hexdigest()[:12]
+    path = os.path.join(PATTERNS_DIR, f"{digest}.patterns")
+    if not os.path.exists(path):
+        os.makedirs(PATTERNS_DIR, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    return path
+
+
+def build_config(config: str, options: Optional[Dict], dpi: int = None) -> str:
+    """
+    Add template tesseract options to a config string.
+
+    Args:
+        config: Base config (e.g. '--oem 3 --psm 6')
+        options: Cleaned options (see clean_tesseract_options())
+        dpi: Render DPI of the image, used for "dpi": true
+
+    Returns:
+        Config string with --dpi / --user-patterns / -c arguments appended
+    """
+    if not options:
+        return config
+    parts = [config]
+    hint = dpi if options.get('dpi') is True else options.get('dpi')
+    if hint:
+        parts.append(f"--dpi {int(hint)}")
+    if options.get('patterns'):
+        parts.append(f"--user-patterns {shlex.quote(patterns_file(options['patterns']))}")
+    if options.get('whitelist'):
+        parts.append('-c ' + shlex.quote(f"tessedit_char_whitelist={options['whitelist']}"))
+    for name, value in (options.get('variables') or {}).items():
+        parts.append('-c ' + shlex.quote(f"{name}={value}"))
+    return ' '.join(parts)
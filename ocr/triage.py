@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+Page Triage - Cheap pre-OCR decisions made from the page image
+
+Before a page gets a full-resolution tesseract pass, triage answers:
+1. Is the page blank?            -> NumPy ink statistics, no OCR at all
+2. Does it hold check images?    -> tile layout from pixel projections, no OCR
+3. Is it boilerplate?            -> one fast OCR pass on a low-DPI thumbnail
+
+Blank and clearly-boilerplate pages are skipped without ever OCRing the
+full-resolution image. Everything else continues to full OCR, where the
+page is classified again from the full-resolution text as before.
+
+Each decision is returned as a dict so it can be recorded in the parsing
+metadata.
+"""
+
+from typing import Dict, List, Tuple
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+try:
+    from config import OCR_TRIAGE_DPI
+except ImportError:
+    OCR_TRIAGE_DPI = 120
+
+from .tessdata import PassTimer, FAST
+
+# Fraction of ink pixels below which a page counts as blank (a single
+# line of text is ~0.0007, so only genuinely empty pages fall under it)
+BLANK_INK_RATIO = 0.0003
+
+# Ink threshold (0-255 grayscale) - generous, since downscaling turns thin strokes gray
+INK_THRESHOLD = 200
+
+# Check tiles: scanned checks are large mid-tone rectangles (security
+# pattern background), unlike text pages which are mostly white
+TILE_MIDTONE_RANGE = (60, 225)
+TILE_BAND_DENSITY = 0.25
+TILE_FILL_RATIO = 0.45
+TILE_MIN_HEIGHT = 0.06        # Fraction of page height
+TILE_MIN_WIDTH = 0.20         # Fraction of page width
+TILE_ASPECT_RANGE = (1.6, 3.5)  # Width / height of a personal/business check
+
+# Working width for pixel statistics (keeps NumPy work tiny)
+STATS_WIDTH = 400
+
+
+def _to_array(image, width: int = STATS_WIDTH):
+    """Downscale to a small grayscale array for statistics."""
+    gray = image if image.mode == 'L' else image.convert('L')
+    if gray.size[0] > width:
+        height = max(1, int(gray.size[1] * width / gray.size[0]))
+        gray = gray.resize((width, height))
+    return np.asarray(gray, dtype=np.uint8)
+
+
+def ink_ratio(image) -> float:
+    """Fraction of dark (ink) pixels on the page."""
+    pixels = _to_array(image)
+    return float((pixels < INK_THRESHOLD).mean())
+
+
+def is_blank_page(image) -> bool:
+    """True if the page has (almost) no ink."""
+    return ink_ratio(image) < BLANK_INK_RATIO
+
+
+def _bands(density, threshold: float, min_len: int) -> List[Tuple[int, int]]:
+    """Runs of consecutive indices where density exceeds threshold."""
+    bands = []
+    start = None
+    for i, value in enumerate(density):
+        if value > threshold:
+            if start is None:
+                start = i
+        elif start is not None:
+            if i - start >= min_len:
+                bands.append((start, i))
+            start = None
+    if start is not None and len(density) - start >= min_len:
+        bands.append((start, len(density)))
+    return bands
+
+
+def find_check_tiles(image) -> List[Tuple[float, float, float, float]]:
+    """
+    Locate check-image tiles by their visual layout.
+
+    Returns:
+        List of (x0, y0, x1, y1) boxes as fractions of page width/height,
+        top-to-bottom then left-to-right
+    """
+    pixels = _to_array(image)
+    height, width = pixels.shape
+    low, high = TILE_MIDTONE_RANGE
+    midtone = (pixels > low) & (pixels < high)
+
+    tiles = []
+    row_bands = _bands(midtone.mean(axis=1), TILE_BAND_DENSITY, int(height * TILE_MIN_HEIGHT))
+    for y0, y1 in row_bands:
+        band = midtone[y0:y1]
+        col_bands = _bands(band.mean(axis=0), TILE_BAND_DENSITY, int(width * TILE_MIN_WIDTH))
+        for x0, x1 in col_bands:
+            aspect = (x1 - x0) / max(1, y1 - y0)
+            if not (TILE_ASPECT_RANGE[0] <= aspect <= TILE_ASPECT_RANGE[1]):
+                continue
+            if band[:, x0:x1].mean() < TILE_FILL_RATIO:
+                continue
+            tiles.append((x0 / width, y0 / height, x1 / width, y1 / height))
+
+    return tiles
+
+
+def thumbnail(image, dpi: int, thumb_dpi: int = None):
+    """Downscale a page rendered at `dpi` to the triage DPI."""
+    thumb_dpi = thumb_dpi or OCR_TRIAGE_DPI
+    if not dpi or dpi <= thumb_dpi:
+        return image
+    scale = thumb_dpi / dpi
+    return image.resize((max(1, int(image.size[0] * scale)), max(1, int(image.size[1] * scale))))
+
+
+def triage_page(image, dpi: int, score_page, timer: PassTimer = None) -> Dict:
+    """
+    Decide whether a page needs full-resolution OCR.
+
+    Args:
+        image: Page image
+        dpi: DPI the page was rendered at
+        score_page: Callable text -> (boilerplate, transaction, check_image) scores
+        timer: Pass timer of the page (the thumbnail pass uses the fast model tier)
+
+    Returns:
+        Dict with 'decision' ('skip' or 'ocr'), 'reason' and the statistics used
+    """
+    if not NUMPY_AVAILABLE:
+        return {'decision': 'ocr', 'reason': 'triage_unavailable'}
+
+    ink = ink_ratio(image)
+    if ink < BLANK_INK_RATIO:
+        return {'decision': 'skip', 'reason': 'blank', 'ink_ratio': round(ink, 5)}
+
+    tiles = find_check_tiles(image)
+    if len(tiles) >= 2:
+        return {'decision': 'ocr', 'reason': 'check_tiles', 'ink_ratio': round(ink, 5),
+                'check_tiles': len(tiles)}
+
+    timer = timer or PassTimer()
+    thumb_text = timer.image_to_string(thumbnail(image, dpi), r'--oem 3 --psm 6', step='triage', tier=FAST)
+    boilerplate, transaction, check_image = score_page(thumb_text)
+
+    # Only skip on a strong signal - thumbnail OCR misses small print, so a
+    # single boilerplate hit is not enough to drop a page unseen
+    if boilerplate >= 2 and transaction == 0 and check_image == 0:
+        return {'decision': 'skip', 'reason': 'thumbnail_boilerplate', 'ink_ratio': round(ink, 5),
+                'scores': [boilerplate, transaction, check_image]}
+
+    return {'decision': 'ocr', 'reason': 'thumbnail_content', 'ink_ratio': round(ink, 5),
+            'scores': [boilerplate, transaction, check_image]}
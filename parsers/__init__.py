@@ -18,6 +18,7 @@ To add a new bank:
 
 # Primary parser (recommended)
 from .smart_parser import SmartParser, smart_parse
+from .compiled_template import CompiledTemplate, compile_templates
 
 # Legacy parsers
 from .pdf_parser import PDFParser
@@ -41,7 +42,8 @@ try:
     from .llm_parser import LLMParser, HybridParser
     __all__ = ['SmartParser', 'smart_parse', 'PDFParser', 'ExcelParser',
                'UniversalParser', 'LLMParser', 'HybridParser', 'TemplateParser',
-               'AIParser', 'parse_bank_statement']
+               'AIParser', 'parse_bank_statement', 'CompiledTemplate', 'compile_templates']
 except ImportError:
     __all__ = ['SmartParser', 'smart_parse', 'PDFParser', 'ExcelParser',
-               'UniversalParser', 'TemplateParser', 'AIParser', 'parse_bank_statement']
+               'UniversalParser', 'TemplateParser', 'AIParser', 'parse_bank_statement',
+               'CompiledTemplate', 'compile_templates']
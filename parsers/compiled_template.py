@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Compiled Bank Templates - Template regexes and keyword lists prepared once
+
+The line-by-line template parsers used to work straight off the JSON dicts:
+re.match() with the pattern string for every pattern on every line, and
+Python loops of `skip.lower() in line_lower` over the skip patterns and the
+section start / end markers. CompiledTemplate does that work once, when the
+templates are loaded:
+
+- transaction regexes compiled (invalid ones dropped with a warning)
+- skip patterns, section markers and deposit / withdrawal keywords turned
+  into TermMatchers - one compiled alternation each, so "does any of these
+  occur in the line" is a single C-level scan
+- one combined matcher over all section markers, so lines without any
+  marker (nearly all of them) skip the per-section checks
+- a PatternPrefilter over the transaction_patterns: lines that no pattern
+  can match are rejected in one step (a leading-digit check, then one
+  combined alternation), and the others start at the first pattern that
+  matches instead of trying every pattern in turn
+
+Matching semantics are unchanged: terms are case-normalized the same way
+the parsers normalize the line (skip patterns and markers lowercased,
+keywords uppercased) and matched as plain substrings.
+
+Usage:
+    compiled = compile_templates(templates)['Truist']
+    if compiled.skip_patterns(line.lower()):
+        ...
+    for pattern in compiled.prefilter.candidates(line):
+        match = pattern.regex.match(line)
+"""
+
+import re
+from types import MappingProxyType
+from typing import Dict, Iterable, Optional, Sequence
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+# Legacy single-pattern default (date, description, amount)
+DEFAULT_TRANSACTION_PATTERN = r'^(\d{1,2}/\d{1,2})\s+(.+?)\s+([\d,]+\.\d{2})$'
+
+DEFAULT_DEPOSIT_KEYWORDS = ['DEPOSIT', 'INTEREST', 'CREDIT']
+DEFAULT_WITHDRAWAL_KEYWORDS = ['CHECK', 'DEBIT', 'WITHDRAWAL', 'FEE']
+
+
+class TermMatcher:
+    """True if any of a fixed set of substrings occurs in a text (one compiled alternation)."""
+
+    __slots__ = ('terms', '_search')
+
+    def __init__(self, terms: Iterable[str]):
+        """
+        Args:
+            terms: Substrings, already case-normalized like the texts they are matched against
+        """
+        self.terms = tuple(dict.fromkeys(str(term) for term in terms))
+        # Longest first, so the alternation never stops at a shorter prefix of a longer term
+        ordered = sorted(self.terms, key=len, reverse=True)
+        self._search = re.compile('|'.join(map(re.escape, ordered))).search if self.terms else None
+
+    def __call__(self, text: str) -> bool:
+        return self._search is not None and self._search(text) is not None
+
+    def __bool__(self) -> bool:
+        return bool(self.terms)
+
+    def __repr__(self) -> str:
+        return f"TermMatcher({list(self.terms)!r})"
+
+
+class CompiledPattern:
+    """One entry of a template's transaction_patterns, with its regex compiled."""
+
+    __slots__ = ('name', 'regex', 'groups', 'type')
+
+    def __init__(self, name: str, regex, groups: Dict, txn_type: str):
+        self.name = name
+        self.regex = regex
+        self.groups = MappingProxyType(dict(groups))
+        self.type = txn_type
+
+
+# Backreferences and conditionals refer to group numbers, which shift inside a combined regex
+_GROUP_REFERENCE = re.compile(r'\\[1-9]|\(\?P=|\(\?\(')
+
+
+def _starts_with_digit(items) -> bool:
+    """True if a parsed regex (sre_parse item list) can only match text starting with a decimal digit."""
+    for op, av in items:
+        if op is sre_parse.AT:
+            continue  # ^ / \b take no characters
+        if op is sre_parse.SUBPATTERN:
+            return _starts_with_digit(av[-1])
+        if op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            return av[0] >= 1 and _starts_with_digit(av[2])
+        if op is sre_parse.BRANCH:
+            return all(_starts_with_digit(branch) for branch in av[1])
+        if op is sre_parse.LITERAL:
+            return chr(av).isdecimal()
+        if op is sre_parse.IN:
+            return bool(av) and all(
+                (kind is sre_parse.CATEGORY and value is sre_parse.CATEGORY_DIGIT)
+                or (kind is sre_parse.LITERAL and chr(value).isdecimal())
+                or (kind is sre_parse.RANGE and 48 <= value[0] <= value[1] <= 57)
+                for kind, value in av)
+        return False
+    return False
+
+
+def leading_token(pattern: str) -> str:
+    """Class of the first character a pattern can match: 'digit', or 'any' if unknown."""
+    try:
+        return 'digit' if _starts_with_digit(sre_parse.parse(pattern)) else 'any'
+    except Exception:
+        return 'any'
+
+
+class PatternPrefilter:
+    """
+    Cheap pre-check in front of a template's transaction_patterns (tried with re.match, in order).
+
+    1. Leading token: when every pattern must start with a digit (a date or
+       check number), lines starting with anything else are rejected without
+       running a regex.
+    2. One combined alternation of all patterns, each in a named group: one
+       match() rejects lines no pattern matches, and the group that matched
+       is the first pattern that does.
+
+    Templates with a single pattern skip both steps; its own anchored regex
+    rejects a line just as fast.
+
+    candidates() returns the patterns still worth trying for a line: none,
+    or the first matching pattern and those after it (a parser that rejects
+    the first match, e.g. for a bad date, falls through to the next pattern
+    as before).
+    """
+
+    __slots__ = ('patterns', 'leading_digit', '_match', '_from', '_single')
+
+    def __init__(self, patterns: Sequence[CompiledPattern]):
+        self.patterns = tuple(patterns)
+        self.leading_digit = bool(self.patterns) and all(
+            leading_token(p.regex.pattern) == 'digit' for p in self.patterns)
+        self._match = self._combine()
+        # One pattern rejects a line as fast as the prefilter would (its regex fails on the first character)
+        self._single = len(self.patterns) < 2
+        # Combined-regex group name -> patterns from that one on
+        self._from = {f"_p{i}": self.patterns[i:] for i in range(len(self.patterns))}
+
+    def _combine(self):
+        """match() of the combined alternation, or None if the patterns can't be combined."""
+        if len(self.patterns) < 2:
+            return None
+        if any(p.regex.flags & ~re.UNICODE or _GROUP_REFERENCE.search(p.regex.pattern)
+               for p in self.patterns):
+            return None
+        try:
+            return re.compile('|'.join(f"(?P<_p{i}>{p.regex.pattern})"
+                                       for i, p in enumerate(self.patterns))).match
+        except re.error:
+            return None  # e.g. the same group name in two patterns, or inline global flags
+
+    def candidates(self, line: str) -> Sequence[CompiledPattern]:
+        """Patterns to try on a line, in order (empty if none can match)."""
+        if self._single:
+            return self.patterns
+        if self.leading_digit and not (line and line[0].isdecimal()):
+            return ()
+        if self._match is None:
+            return self.patterns
+        match = self._match(line)
+        return self._from[match.lastgroup] if match is not None else ()
+
+
+def _compile(pattern, where: str):
+    """Compiled regex, or None (with a warning) if the template pattern is invalid."""
+    try:
+        return re.compile(pattern)
+    except (re.error, TypeError) as e:
+        print(f"[WARNING] Ignoring invalid pattern {pattern!r} in {where}: {e}", flush=True)
+        return None
+
+
+class CompiledTemplate:
+    """
+    Read-only, precompiled form of one bank template.
+
+    The original dict stays available as `source` for the settings the line
+    loops don't need (summary patterns, OCR profile, custom parsers, ...).
+    """
+
+    __slots__ = ('name', 'source', 'date_format', 'deposit_kw', 'withdrawal_kw',
+                 'transaction_pattern', 'transaction_patterns', 'skip_patterns', 'skip_sections',
+                 'sections', 'deposit_start', 'deposit_end', 'withdrawal_start', 'withdrawal_end',
+                 'section_markers', 'section_end', 'prefilter')
+
+    def __init__(self, name: str, template: Dict):
+        """
+        Args:
+            name: Bank name (used in warnings)
+            template: Bank template dict from bank_templates.json
+        """
+        sections = template.get('sections') or {}
+        deposit_sections = sections.get('deposits', {})
+        withdrawal_sections = sections.get('withdrawals', {})
+
+        patterns = []
+        for entry in template.get('transaction_patterns', []):
+            regex = _compile(entry.get('pattern'), f"{name} transaction_patterns")
+            if regex is not None:
+                patterns.append(CompiledPattern(entry.get('name', 'unknown'), regex,
+                                                entry.get('groups', {}), entry.get('type', 'auto')))
+
+        deposit_start = [m.lower() for m in deposit_sections.get('start_markers', [])]
+        deposit_end = [m.lower() for m in deposit_sections.get('end_markers', [])]
+        withdrawal_start = [m.lower() for m in withdrawal_sections.get('start_markers', [])]
+        withdrawal_end = [m.lower() for m in withdrawal_sections.get('end_markers', [])]
+
+        values = {
+            'name': name,
+            'source': template,
+            'date_format': template.get('date_format', 'MM/DD'),
+            'deposit_kw': TermMatcher(kw.upper() for kw in
+                                      template.get('deposit_keywords', DEFAULT_DEPOSIT_KEYWORDS)),
+            'withdrawal_kw': TermMatcher(kw.upper() for kw in
+                                         template.get('withdrawal_keywords', DEFAULT_WITHDRAWAL_KEYWORDS)),
+            'transaction_pattern': (_compile(template.get('transaction_pattern', DEFAULT_TRANSACTION_PATTERN),
+                                             f"{name} transaction_pattern")
+                                    or re.compile(DEFAULT_TRANSACTION_PATTERN)),
+            'transaction_patterns': tuple(patterns),
+            'prefilter': PatternPrefilter(patterns),
+            'skip_patterns': TermMatcher(s.lower() for s in template.get('skip_patterns', [])),
+            'skip_sections': TermMatcher(s.lower() for s in template.get('skip_sections', [])),
+            'sections': bool(sections),
+            'deposit_start': TermMatcher(deposit_start),
+            'deposit_end': TermMatcher(deposit_end),
+            'withdrawal_start': TermMatcher(withdrawal_start),
+            'withdrawal_end': TermMatcher(withdrawal_end),
+            'section_markers': TermMatcher(deposit_start + deposit_end + withdrawal_start + withdrawal_end),
+            'section_end': TermMatcher(deposit_end + withdrawal_end),
+        }
+        for key, value in values.items():
+            object.__setattr__(self, key, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"CompiledTemplate is read-only (tried to set '{name}')")
+
+    def __repr__(self) -> str:
+        return f"CompiledTemplate({self.name!r}, {len(self.transaction_patterns)} pattern(s))"
+
+
+def compile_templates(templates: Dict) -> Dict[str, CompiledTemplate]:
+    """Compile every bank of a loaded bank_templates.json, keyed by bank name."""
+    return {name: CompiledTemplate(name, template)
+            for name, template in (templates or {}).get('banks', {}).items()}
+
+
+def compiled_for(compiled: Dict[str, CompiledTemplate], name: Optional[str],
+                 template: Dict) -> CompiledTemplate:
+    """
+    Precompiled template for `template`: the one compiled at load time if it
+    is still the same dict, otherwise compiled now (templates passed in by callers).
+    """
+    entry = compiled.get(name) if name else None
+    if entry is None or entry.source is not template:
+        entry = CompiledTemplate(name or 'template', template)
+    return entry
@@ -28,7 +28,6 @@ This approach handles:
 5. Validation against bank's stated totals
 """
 
-import os
 import re
 import json
 import requests
@@ -123,57 +122,12 @@ class LLMParser:
         return transactions
 
     def _extract_text(self, file_path: str) -> str:
-        """Extract text from PDF using pdfplumber or OCR"""
-        text = ""
-
-        # Try pdfplumber first
+        """Extract text from PDF (shared extraction service: text layer, OCR where needed)"""
         try:
-            import pdfplumber
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        text += page_text + "\n"
-        except Exception as e:
-            print(f"[WARNING] pdfplumber failed: {e}")
-
-        # If no text, try OCR
-        if not text or len(text.strip()) < 100:
-            text = self._extract_with_ocr(file_path)
-
-        return text
-
-    def _extract_with_ocr(self, file_path: str) -> str:
-        """Extract text using OCR"""
-        try:
-            from pdf2image import convert_from_path
-            import pytesseract
-
-            # Get paths from config
-            try:
-                from config import TESSERACT_CMD, POPPLER_PATH
-                if TESSERACT_CMD and os.path.exists(TESSERACT_CMD):
-                    pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
-                poppler = POPPLER_PATH if POPPLER_PATH and os.path.exists(POPPLER_PATH) else None
-            except:
-                poppler = None
-
-            print("[INFO] Converting PDF to images for OCR...")
-            if poppler:
-                images = convert_from_path(file_path, dpi=300, poppler_path=poppler)
-            else:
-                images = convert_from_path(file_path, dpi=300)
-
-            text = ""
-            for i, image in enumerate(images):
-                print(f"[INFO] OCR processing page {i+1}/{len(images)}...")
-                page_text = pytesseract.image_to_string(image, config='--oem 3 --psm 6')
-                text += page_text + "\n"
-
-            return text
-
+            from ocr import get_extraction_service
+            return get_extraction_service().extract(file_path)['text']
         except Exception as e:
-            print(f"[ERROR] OCR failed: {e}")
+            print(f"[WARNING] Text extraction failed: {e}")
             return ""
 
     def _extract_with_llm(self, text: str) -> List[Dict]:
@@ -45,13 +45,8 @@ class PDFParser:
 
         print(f"[INFO] Parsing PDF: {file_path}", flush=True)
 
-        # Step 1: Try pdfplumber first
-        full_text = self._extract_with_pdfplumber(file_path)
-
-        # Step 2: If empty or too short, use OCR
-        if not full_text or len(full_text.strip()) < 100:
-            print("[INFO] PDF appears to be image-based, using OCR...", flush=True)
-            full_text = self._extract_with_ocr(file_path)
+        # Text layer where present, OCR for image-based pages (shared with other parsers)
+        full_text = self._extract_text(file_path)
 
         if not full_text or len(full_text.strip()) < 100:
             print("[ERROR] Could not extract text from PDF", flush=True)
@@ -312,60 +307,13 @@ class PDFParser:
 
         return '\n'.join(lines)
 
-    def _extract_with_pdfplumber(self, file_path: str) -> str:
-        """Extract text using pdfplumber (for text-based PDFs)"""
-        try:
-            import pdfplumber
-            all_text = ""
-            with pdfplumber.open(file_path) as pdf:
-                for page in pdf.pages:
-                    page_text = page.extract_text()
-                    if page_text:
-                        all_text += page_text + "\n"
-            return all_text
-        except ImportError:
-            print("[WARNING] pdfplumber not installed")
-            return ""
-        except Exception as e:
-            print(f"[ERROR] pdfplumber extraction failed: {e}")
-            return ""
-
-    def _extract_with_ocr(self, file_path: str) -> str:
-        """Extract text using OCR (for image-based/scanned PDFs)"""
+    def _extract_text(self, file_path: str) -> str:
+        """Extract text (shared extraction service: text layer, OCR for image-based pages)"""
         try:
-            from pdf2image import convert_from_path
-            import pytesseract
-
-            # Configure tesseract if path is set
-            if TESSERACT_CMD and os.path.exists(TESSERACT_CMD):
-                pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
-
-            # Convert PDF pages to images
-            print("[INFO] Converting PDF to images...")
-
-            if POPPLER_PATH and os.path.exists(POPPLER_PATH):
-                images = convert_from_path(file_path, dpi=300, poppler_path=POPPLER_PATH)
-            else:
-                images = convert_from_path(file_path, dpi=300)
-
-            print(f"[INFO] Converted {len(images)} pages, running OCR...")
-
-            all_text = ""
-            for i, image in enumerate(images):
-                print(f"[INFO] OCR processing page {i+1}/{len(images)}...")
-                # Use better OCR config for bank statements
-                custom_config = r'--oem 3 --psm 6'
-                page_text = pytesseract.image_to_string(image, config=custom_config)
-                if page_text:
-                    all_text += page_text + "\n"
-
-            return all_text
-
-        except ImportError as e:
-            print(f"[ERROR] OCR libraries not installed: {e}")
-            return ""
+            from ocr import get_extraction_service
+            return get_extraction_service().extract(file_path)['text']
         except Exception as e:
-            print(f"[ERROR] OCR extraction failed: {e}")
+            print(f"[ERROR] Text extraction failed: {e}")
             return ""
 
     def _detect_bank(self, text: str) -> str:
@@ -14,24 +14,17 @@ This approach is scalable - add new banks via JSON config, no code changes neede
 
 import re
 import os
+import copy
 import json
-import hashlib
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Tuple
 
-# OCR and PDF libraries
-try:
-    import pdfplumber
-    PDFPLUMBER_AVAILABLE = True
-except ImportError:
-    PDFPLUMBER_AVAILABLE = False
+# Shared text extraction (text layer + page-level OCR) and page classification
+from ocr import classify_page, get_extraction_service, ocr_profile, merge_pass_ms
+from ocr import BankDetector, format_detection, compact_scores
 
-try:
-    from pdf2image import convert_from_path
-    import pytesseract
-    OCR_AVAILABLE = True
-except ImportError:
-    OCR_AVAILABLE = False
+# Templates precompiled once at load (regexes, skip / section / keyword matchers)
+from .compiled_template import compile_templates, compiled_for, CompiledTemplate, TermMatcher
 
 # AI Parser for fallback
 try:
@@ -47,6 +40,10 @@ except ImportError:
     TESSERACT_CMD = None
     POPPLER_PATH = None
 
+# Ending-balance line that marks the end of the transaction detail, for templates
+# without an "ocr" end_marker or balance_validation ending_pattern (early-stop OCR)
+DEFAULT_END_MARKER = r'(?:ending|closing|new)\s+balance'
+
 
 class SmartParser:
     """
@@ -75,6 +72,8 @@ class SmartParser:
             templates_path = os.path.join(base_dir, 'config', 'bank_templates.json')
 
         self.templates = self._load_templates(templates_path)
+        self.compiled_templates = compile_templates(self.templates)
+        self.bank_detector = BankDetector(self.templates.get('banks', {}))
         self.use_ai_fallback = use_ai_fallback
         # Always create AIParser for enhanced regex fallback, even if AI (LLM) is disabled
         self.ai_parser = AIParser() if AI_AVAILABLE else None
@@ -93,15 +92,16 @@ class SmartParser:
         self._expected_withdrawals = None
         self._ocr_used = False
         self._ocr_fixes = []
+        self._page_triage = []  # Per-page OCR triage decisions (blank/boilerplate/check tiles)
+        self._page_sources = {'digital': [], 'ocr': []}  # Which pages came from the text layer vs OCR
+        self._check_fields = {}  # Check-image field OCR keyed by check number (payee/amount/date)
+        self._pdf_triage = {}  # Up-front digital / scanned / mixed decision for the PDF
+        self._early_stop = None  # Pages skipped once OCRed pages reconciled ({'after_page', 'skipped_pages'})
+        self._bank_detection = None  # Identifier scores per bank and how much text was scanned
         self._crossfirst_withdrawal_date = None  # Date from OCR-detected withdrawal detail line
         self._statement_period_start = None
         self._statement_period_end = None
 
-        # OCR Cache - stores OCR results to avoid re-processing
-        self._ocr_cache_dir = os.path.join(base_dir, 'data', 'ocr_cache')
-        os.makedirs(self._ocr_cache_dir, exist_ok=True)
-        self._use_ocr_cache = True  # Enable/disable caching
-
     def _load_templates(self, path: str) -> Dict:
         """Load bank templates from JSON file."""
         if not os.path.exists(path):
@@ -120,7 +120,7 @@ class SmartParser:
         Parse bank statement using smart detection.
 
         Flow:
-        1. Extract text (pdfplumber -> OCR fallback)
+        1. Extract text (pdfplumber per page -> OCR for pages without a text layer)
         2. Detect bank using template identifiers
         3. If template found: parse with template
         4. If no template OR template fails: use AI fallback
@@ -137,6 +137,18 @@ class SmartParser:
             print("[ERROR] Could not extract text from PDF", flush=True)
             return []
 
+        return self.parse_text(text)
+
+    def parse_text(self, text: str) -> List[Dict]:
+        """
+        Parse already-extracted statement text (steps 2-5 of parse()).
+
+        Args:
+            text: Cleaned statement text (as returned by _extract_text)
+
+        Returns:
+            List of transaction dicts
+        """
         self.raw_text = text
 
         # Step 2: Detect bank
@@ -195,279 +207,83 @@ class SmartParser:
 
         return transactions
 
-    def _get_file_hash(self, file_path: str) -> str:
-        """Generate a hash for the file to use as cache key."""
-        hasher = hashlib.md5()
-        with open(file_path, 'rb') as f:
-            # Read in chunks for large files
-            for chunk in iter(lambda: f.read(65536), b''):
-                hasher.update(chunk)
-        return hasher.hexdigest()
-
-    def _get_cached_ocr(self, file_hash: str) -> Optional[str]:
-        """Check if OCR result is cached and return it."""
-        if not self._use_ocr_cache:
-            return None
-
-        cache_file = os.path.join(self._ocr_cache_dir, f"{file_hash}.txt")
-        if os.path.exists(cache_file):
-            try:
-                with open(cache_file, 'r', encoding='utf-8') as f:
-                    cached_text = f.read()
-                if len(cached_text) > 100:  # Validate cache isn't empty
-                    print(f"[INFO] Using cached OCR result", flush=True)
-                    return cached_text
-            except Exception as e:
-                print(f"[WARNING] Failed to read OCR cache: {e}", flush=True)
-        return None
-
-    def _save_ocr_cache(self, file_hash: str, text: str):
-        """Save OCR result to cache."""
-        if not self._use_ocr_cache or len(text.strip()) < 100:
-            return
-
-        cache_file = os.path.join(self._ocr_cache_dir, f"{file_hash}.txt")
-        try:
-            with open(cache_file, 'w', encoding='utf-8') as f:
-                f.write(text)
-            if self.debug:
-                print(f"[DEBUG] OCR result cached", flush=True)
-        except Exception as e:
-            print(f"[WARNING] Failed to cache OCR result: {e}", flush=True)
-
     def _extract_text(self, file_path: str) -> str:
-        """Extract text using pdfplumber, fallback to OCR with caching."""
-        text = ""
-
-        # Try pdfplumber first
-        if PDFPLUMBER_AVAILABLE:
-            try:
-                with pdfplumber.open(file_path) as pdf:
-                    for page in pdf.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-            except Exception as e:
-                print(f"[WARNING] pdfplumber failed: {e}")
-
-        # If text is too short, use OCR (with caching)
-        if len(text.strip()) < 100 and OCR_AVAILABLE:
-            print("[INFO] Using OCR for text extraction...", flush=True)
-            self._ocr_used = True
-
-            # Check cache first
-            file_hash = self._get_file_hash(file_path)
-            cached_text = self._get_cached_ocr(file_hash)
-
-            if cached_text:
-                text = cached_text
-            else:
-                text = self._extract_with_ocr(file_path)
-                # Cache the result
-                self._save_ocr_cache(file_hash, text)
-
-        # Clean text
-        text = self._clean_text(text)
-
-        return text
-
-    # Boilerplate page indicators - pages containing ONLY these patterns are skipped
-    BOILERPLATE_PATTERNS = [
-        r'HOW TO RECONCILE',
-        r'CHECKS OUTSTANDING',
-        r'DISCLOSURES',
-        r'Choice of Law',
-        r'IMPORTANT INFORMATION',
-        r'Privacy Notice',
-        r'Member FDIC',
-        r'Equal Housing Lender',
-    ]
-
-    # Transaction indicators - if a page has these, it likely has transaction data
-    TRANSACTION_INDICATORS = [
-        r'\d{1,2}/\d{1,2}(?:/\d{2,4})?\s+\d',  # Date followed by number
-        r'DEPOSIT|WITHDRAWAL|CHECK\s*#',       # Transaction keywords
-        r'INTEREST|SERVICE\s*FEE',              # More transaction keywords
-        r'NUMBERED CHECKS',                     # Check section
-        r'BUSINESS ACCOUNT',                    # Account activity section
-        r'PREVIOUS BALANCE|ENDING BALANCE',     # Balance info
-    ]
-
-    # Check image indicators - pages with check images need full OCR
-    CHECK_IMAGE_INDICATORS = [
-        r'Pay\s+to|PAY\s+TO',
-        r'Authorized\s+Signature',
-        r'ENDORSE HERE',
-        r'FOR MOBILE DEPOSIT',
-        r'\d{1,2}/\d{1,2}/\d{2,4}\s*[-–]\s*\$',  # Check annotation format
-    ]
-
-    def _extract_with_ocr(self, file_path: str) -> str:
         """
-        Extract text using optimized OCR with smart page processing.
-
-        Performance Optimizations:
-        1. Single PDF conversion at 350 DPI (balance of speed and accuracy)
-        2. Quick classification using fast OCR settings
-        3. Skip boilerplate pages after quick scan
-        4. Full OCR only on pages with transaction content
+        Extract text via the shared extraction service (text layer per page,
+        OCR only for pages without one; cached and memoized per document).
         """
-        import time
-        start_time = time.time()
-
-        try:
-            if TESSERACT_CMD and os.path.exists(TESSERACT_CMD):
-                pytesseract.pytesseract.tesseract_cmd = TESSERACT_CMD
-
-            # Check if this might be a CrossFirst statement by peeking at first page
-            # CrossFirst requires higher DPI (400+) for PSM 4 to capture withdrawal lines
-            dpi = 350  # Default DPI
-
-            # Quick check with first page at low DPI to detect bank
-            if POPPLER_PATH and os.path.exists(POPPLER_PATH):
-                peek_images = convert_from_path(file_path, dpi=150, poppler_path=POPPLER_PATH, first_page=1, last_page=1)
-            else:
-                peek_images = convert_from_path(file_path, dpi=150, first_page=1, last_page=1)
-
-            if peek_images:
-                peek_text = pytesseract.image_to_string(peek_images[0], config='--oem 3 --psm 6')
-                if 'CrossFirst' in peek_text or 'IntraFi' in peek_text or 'CROSSFIRST' in peek_text:
-                    dpi = 400  # Higher DPI for CrossFirst to capture transaction details
-                    if self.debug:
-                        print("[DEBUG] Detected CrossFirst - using 400 DPI for better OCR", flush=True)
-                del peek_images
-
-            print(f"[INFO] Converting PDF to images ({dpi} DPI)...", flush=True)
-
-            # Single PDF conversion
-            if POPPLER_PATH and os.path.exists(POPPLER_PATH):
-                images = convert_from_path(file_path, dpi=dpi, poppler_path=POPPLER_PATH)
-            else:
-                images = convert_from_path(file_path, dpi=dpi)
-
-            total_pages = len(images)
-            print(f"[INFO] Processing {total_pages} pages with smart OCR...", flush=True)
-
-            all_text = ""
-            processed_count = 0
-            skipped_count = 0
-
-            # Fast OCR config for classification
-            fast_config = r'--oem 3 --psm 6'
-
-            for i, image in enumerate(images):
-                # Quick OCR scan for classification
-                quick_text = pytesseract.image_to_string(image, config=fast_config)
-
-                # Classify the page
-                page_type = self._classify_page(quick_text)
-
-                if page_type == 'boilerplate':
-                    skipped_count += 1
-                    if self.debug:
-                        print(f"[DEBUG] Page {i+1}: SKIPPED (boilerplate)", flush=True)
-                    continue
-
-                # For transaction/check pages, the quick OCR is usually sufficient
-                # Only do additional processing for check images that need layout analysis
-                if page_type == 'check_image':
-                    # Try PSM 4 which is better for columnar check data
-                    psm4_config = r'--oem 3 --psm 4'
-                    psm4_text = pytesseract.image_to_string(image, config=psm4_config)
+        extraction = get_extraction_service().extract(file_path, debug=self.debug,
+                                                      stop_check=self._statement_reconciled)
+        self._ocr_used = extraction['ocr_used']
+        self._page_sources = extraction['page_sources']
+        self._page_triage = extraction['page_triage']
+        self._check_fields = extraction.get('check_fields', {})
+        self._pdf_triage = extraction.get('pdf_triage', {})
+        self._early_stop = extraction.get('early_stop')
 
-                    # Use whichever has more date content
-                    quick_dates = len(re.findall(r'\d{1,2}/\d{1,2}', quick_text))
-                    psm4_dates = len(re.findall(r'\d{1,2}/\d{1,2}', psm4_text))
-
-                    if psm4_dates > quick_dates:
-                        page_text = psm4_text
-                    else:
-                        page_text = quick_text
-
-                    # Merge important lines from both
-                    other = psm4_text if page_text == quick_text else quick_text
-                    for line in other.split('\n'):
-                        line = line.strip()
-                        if ('Pay to' in line or 'CHECK' in line) and line not in page_text:
-                            page_text += '\n' + line
-                else:
-                    page_text = quick_text
-
-                # For CrossFirst and similar table-based statements,
-                # PSM 6 often misses withdrawal lines entirely due to table formatting.
-                # Try PSM 4 (single column) which works best for CrossFirst tables.
-                if 'CrossFirst' in quick_text or 'IntraFi' in quick_text or 'Account Transaction Detail' in quick_text:
-                    # Helper to check for withdrawal with date on same line
-                    def has_withdrawal_with_date(text):
-                        for line in text.split('\n'):
-                            # Date followed by anything then Withdrawal (may have OCR garbage between)
-                            if re.search(r'\d{2}/\d{2}/\d{4}', line) and re.search(r'[Ww]ithd', line):
-                                return True
-                            # Date on line that has parenthetical amount (withdrawal indicator)
-                            if re.search(r'\d{2}/\d{2}/\d{4}', line) and re.search(r'\([^)]*\d+\.\d{2}', line):
-                                return True
-                        return False
-
-                    has_withdrawal_psm6 = has_withdrawal_with_date(page_text)
-
-                    if not has_withdrawal_psm6:
-                        # PSM 4 (single column) works best for CrossFirst transaction tables
-                        psm4_crossfirst = r'--oem 3 --psm 4'
-                        psm4_text = pytesseract.image_to_string(image, config=psm4_crossfirst)
-
-                        has_withdrawal_psm4 = has_withdrawal_with_date(psm4_text)
-
-                        if has_withdrawal_psm4:
-                            if self.debug:
-                                print(f"[DEBUG] Page {i+1}: Using PSM 4 - found withdrawal with date", flush=True)
-                            page_text = psm4_text
-                        else:
-                            # PSM 11 produces fragmented output, only use as last resort
-                            # and only if it captures the date + withdrawal on coherent lines
-                            psm11_config = r'--oem 3 --psm 11'
-                            psm11_text = pytesseract.image_to_string(image, config=psm11_config)
-
-                            # For PSM 11, check if we have better transaction data
-                            # PSM 11 often fragments data, so we check for date patterns more carefully
-                            if has_withdrawal_with_date(psm11_text):
-                                if self.debug:
-                                    print(f"[DEBUG] Page {i+1}: Using PSM 11 - found withdrawal with date", flush=True)
-                                page_text = psm11_text
-
-                    # If still no withdrawal found, try PSM 3 as final fallback
-                    if not has_withdrawal_with_date(page_text):
-                        psm3_config = r'--oem 3 --psm 3'
-                        psm3_text = pytesseract.image_to_string(image, config=psm3_config)
-
-                        if re.search(r'[Ww]ithdrawal.*\d+\.\d{2}', psm3_text):
-                            # Merge withdrawal lines from PSM 3
-                            for line in psm3_text.split('\n'):
-                                if re.search(r'[Ww]ithdrawal.*\(\s*\$?\s*[\d,]+\.\d{2}\s*\)', line):
-                                    if line.strip() not in page_text:
-                                        page_text += '\n' + line.strip()
-                                        if self.debug:
-                                            print(f"[DEBUG] Merged withdrawal line from PSM 3: {line.strip()[:60]}", flush=True)
+        # Clean text
+        return self._clean_text(extraction['text'])
 
-                if page_text:
-                    all_text += page_text + "\n"
-                    processed_count += 1
+    def _statement_reconciled(self, text: str) -> Optional[str]:
+        """
+        Early-stop check for incremental OCR: parse the pages OCRed so far
+        and see whether they already account for the whole statement.
 
-                if self.debug:
-                    print(f"[DEBUG] Page {i+1}: {page_type}", flush=True)
+        The pages are complete once the ending-balance marker has been seen
+        (template "ocr" end_marker, else its balance_validation ending_pattern)
+        and parsed deposits and withdrawals both match the summary totals to
+        the cent. The totals are the raw parse (validation and dedup only):
+        reconciliation would plug a shortfall with an adjustment row, which
+        is exactly what pages not OCRed yet look like. Parser state is
+        restored afterwards, so the final parse of the full text starts clean.
 
-            # Free memory
-            del images
+        Args:
+            text: Raw OCR text of the pages so far
 
-            elapsed = time.time() - start_time
-            print(f"[INFO] OCR complete: {processed_count} pages processed, {skipped_count} skipped in {elapsed:.1f}s", flush=True)
+        Returns:
+            Reason string if the remaining pages can be skipped, else None
+        """
+        text = self._clean_text(text)
+        # Detector directly - _detect_bank() would record and log the partial-text result
+        detection = self.bank_detector.detect(text)
+        bank_name, template = detection['bank'], detection['template']
+        if not template:
+            return None
 
-            return all_text
+        end_marker = (ocr_profile(template, bank_name)['end_marker']
+                      or template.get('balance_validation', {}).get('ending_pattern')
+                      or DEFAULT_END_MARKER)
+        if not re.search(end_marker, text, re.IGNORECASE):
+            return None
 
+        state = {name: copy.copy(value) if isinstance(value, (list, dict, set)) else value
+                 for name, value in self.__dict__.items()}
+        try:
+            self.debug = False
+            self.bank_name, self.bank_template = bank_name, template
+            self._expected_deposits = self._expected_withdrawals = None
+            self._extract_year(text)
+            self._extract_statement_period(text)
+            transactions = self._final_validation(self._parse_with_template(text, template),
+                                                  reconcile=False)
+            expected_deposits, expected_withdrawals = self._expected_deposits, self._expected_withdrawals
         except Exception as e:
-            print(f"[ERROR] OCR failed: {e}")
-            import traceback
-            traceback.print_exc()
-            return ""
+            print(f"[WARNING] Early-stop check failed: {e}", flush=True)
+            return None
+        finally:
+            self.__dict__.clear()
+            self.__dict__.update(state)
+
+        if expected_deposits is None and expected_withdrawals is None:
+            return None
+        transactions = [t for t in transactions if t.get('parsed_by') != 'adjustment']
+        parsed_deposits = sum(t['amount'] for t in transactions if t['amount'] > 0)
+        parsed_withdrawals = sum(abs(t['amount']) for t in transactions if t['amount'] < 0)
+        if (abs(parsed_deposits - (expected_deposits or 0)) > 0.01
+                or abs(parsed_withdrawals - (expected_withdrawals or 0)) > 0.01):
+            return None
+        return (f"reconciled: deposits ${parsed_deposits:,.2f}, "
+                f"withdrawals ${parsed_withdrawals:,.2f}")
 
     def _classify_page(self, text: str) -> str:
         """
@@ -479,42 +295,7 @@ class SmartParser:
             'boilerplate' - Page has only boilerplate content (skip)
             'unknown' - Can't classify, process anyway
         """
-        text_upper = text.upper()
-
-        # Check for boilerplate indicators
-        boilerplate_score = 0
-        for pattern in self.BOILERPLATE_PATTERNS:
-            if re.search(pattern, text, re.IGNORECASE):
-                boilerplate_score += 1
-
-        # Check for transaction indicators
-        transaction_score = 0
-        for pattern in self.TRANSACTION_INDICATORS:
-            if re.search(pattern, text, re.IGNORECASE):
-                transaction_score += 1
-
-        # Check for check image indicators
-        check_image_score = 0
-        for pattern in self.CHECK_IMAGE_INDICATORS:
-            if re.search(pattern, text, re.IGNORECASE):
-                check_image_score += 1
-
-        # Decision logic
-        if check_image_score >= 2:
-            return 'check_image'
-        elif transaction_score >= 2:
-            return 'transaction'
-        elif boilerplate_score >= 2 and transaction_score == 0:
-            return 'boilerplate'
-        elif transaction_score >= 1:
-            return 'transaction'
-        elif check_image_score >= 1:
-            return 'check_image'
-        elif boilerplate_score >= 1 and transaction_score == 0:
-            return 'boilerplate'
-        else:
-            # Unknown - process it to be safe
-            return 'unknown'
+        return classify_page(text)
 
     def _preprocess_image_for_ocr(self, image):
         """Preprocess image to improve OCR accuracy (light preprocessing)."""
@@ -560,23 +341,26 @@ class SmartParser:
 
     def _detect_bank(self, text: str) -> Tuple[str, Optional[Dict]]:
         """
-        Detect bank using template identifiers.
+        Detect bank using template identifiers (best-scoring bank, first page
+        first - see ocr/bank_detection.py).
 
         Returns:
             Tuple of (bank_name, template_dict or None)
         """
-        text_lower = text.lower()
+        result = self.bank_detector.detect(text)
+        self._bank_detection = result
+        print(f"[DEBUG] Bank detection: {format_detection(result)}", flush=True)
 
-        for bank_name, template in self.templates.get('banks', {}).items():
-            identifiers = template.get('identifiers', [])
-            for identifier in identifiers:
-                if identifier.lower() in text_lower:
-                    print(f"[DEBUG] Matched '{identifier}' -> {bank_name}", flush=True)
-                    return bank_name, template
+        if result['bank']:
+            return result['bank'], result['template']
 
         # No template match - return generic
         return "Unknown Bank", None
 
+    def _compiled(self, template: Dict) -> CompiledTemplate:
+        """Precompiled form of a template (see compiled_template.py)."""
+        return compiled_for(self.compiled_templates, self.bank_name, template)
+
     def _extract_year(self, text: str):
         """Extract statement year from text."""
         # Look for full date first
@@ -724,11 +508,9 @@ class SmartParser:
         seen = set()
 
         # Get template config
-        date_format = template.get('date_format', 'MM/DD')
-        deposit_kw = template.get('deposit_keywords', ['DEPOSIT', 'INTEREST', 'CREDIT'])
-        withdrawal_kw = template.get('withdrawal_keywords', ['CHECK', 'DEBIT', 'WITHDRAWAL', 'FEE'])
-        skip_patterns = template.get('skip_patterns', template.get('skip_sections', []))
-        ocr_fixes = template.get('ocr_fixes', {})
+        compiled = self._compiled(template)
+        date_format = compiled.date_format
+        skip_patterns = compiled.skip_patterns if 'skip_patterns' in template else compiled.skip_sections
 
         # Extract expected totals for validation
         self._extract_expected_totals(text, template)
@@ -739,11 +521,9 @@ class SmartParser:
             return self._parse_farmers_statement(text, template)
 
         # Check for new multi-pattern format
-        multi_patterns = template.get('transaction_patterns', [])
-
-        if multi_patterns:
+        if template.get('transaction_patterns'):
             # New format: multiple transaction patterns
-            transactions = self._parse_with_multi_patterns(text, template, multi_patterns)
+            transactions = self._parse_with_multi_patterns(text, template)
         elif template.get('sections'):
             # Section-based parsing
             transactions = self._parse_sections(text, template)
@@ -752,7 +532,7 @@ class SmartParser:
                 transactions = self._reconcile_pnc_transactions(text, transactions, template)
         else:
             # Legacy single pattern
-            txn_pattern = template.get('transaction_pattern', r'^(\d{1,2}/\d{1,2})\s+(.+?)\s+([\d,]+\.\d{2})$')
+            txn_pattern = compiled.transaction_pattern
             lines = text.split('\n')
 
             for line in lines:
@@ -761,12 +541,12 @@ class SmartParser:
                     continue
 
                 # Skip unwanted patterns
-                if any(skip.lower() in line.lower() for skip in skip_patterns):
+                if skip_patterns(line.lower()):
                     continue
 
-                match = re.match(txn_pattern, line)
+                match = txn_pattern.match(line)
                 if match:
-                    txn = self._parse_match(match, line, date_format, deposit_kw, withdrawal_kw)
+                    txn = self._parse_match(match, line, date_format, compiled.deposit_kw, compiled.withdrawal_kw)
                     if txn:
                         key = (txn['date'], txn['description'][:30], abs(txn['amount']))
                         if key not in seen:
@@ -779,11 +559,12 @@ class SmartParser:
 
         return transactions
 
-    def _parse_with_multi_patterns(self, text: str, template: Dict, patterns: List[Dict]) -> List[Dict]:
+    def _parse_with_multi_patterns(self, text: str, template: Dict) -> List[Dict]:
         """
         Parse using multiple transaction patterns with section tracking.
 
-        Each pattern object has:
+        Patterns, skip patterns, section markers and keywords come precompiled
+        (see compiled_template.py). Each pattern object has:
         - name: pattern identifier
         - pattern: regex pattern
         - groups: dict mapping field names to group numbers
@@ -793,19 +574,10 @@ class SmartParser:
         seen = set()
         lines = text.split('\n')
 
-        date_format = template.get('date_format', 'MM/DD')
-        deposit_kw = template.get('deposit_keywords', ['DEPOSIT', 'INTEREST', 'CREDIT'])
-        withdrawal_kw = template.get('withdrawal_keywords', ['CHECK', 'DEBIT', 'WITHDRAWAL', 'FEE'])
-        skip_patterns = template.get('skip_patterns', [])
+        compiled = self._compiled(template)
+        date_format = compiled.date_format
         ocr_fixes = template.get('ocr_fixes', {})
 
-        # Section tracking for Truist and similar formats
-        sections_config = template.get('sections', {})
-        deposit_start = [m.lower() for m in sections_config.get('deposits', {}).get('start_markers', [])]
-        deposit_end = [m.lower() for m in sections_config.get('deposits', {}).get('end_markers', [])]
-        withdrawal_start = [m.lower() for m in sections_config.get('withdrawals', {}).get('start_markers', [])]
-        withdrawal_end = [m.lower() for m in sections_config.get('withdrawals', {}).get('end_markers', [])]
-
         current_section = None  # 'deposit', 'withdrawal', or None
 
         for line in lines:
@@ -815,47 +587,35 @@ class SmartParser:
             if len(line) < 5:
                 continue
 
-            # Track sections (for Truist and similar formats)
-            if sections_config:
+            # Track sections (for Truist and similar formats); one scan for any marker first
+            if compiled.sections and compiled.section_markers(line_lower):
                 # Check for withdrawal section start FIRST (takes priority when both match)
                 section_changed = False
-                for marker in withdrawal_start:
-                    if marker in line_lower:
-                        if current_section != 'withdrawal':
-                            current_section = 'withdrawal'
-                            section_changed = True
-                            if self.debug:
-                                print(f"[DEBUG] Entering WITHDRAWAL section: {line[:60]}", flush=True)
-                        break
+                if compiled.withdrawal_start(line_lower) and current_section != 'withdrawal':
+                    current_section = 'withdrawal'
+                    section_changed = True
+                    if self.debug:
+                        print(f"[DEBUG] Entering WITHDRAWAL section: {line[:60]}", flush=True)
 
                 # Check for deposit section start (only if not already entering withdrawal)
-                if not section_changed:
-                    for marker in deposit_start:
-                        if marker in line_lower:
-                            if current_section != 'deposit':
-                                current_section = 'deposit'
-                                section_changed = True
-                                if self.debug:
-                                    print(f"[DEBUG] Entering DEPOSIT section: {line[:60]}", flush=True)
-                            break
+                if not section_changed and compiled.deposit_start(line_lower) and current_section != 'deposit':
+                    current_section = 'deposit'
+                    if self.debug:
+                        print(f"[DEBUG] Entering DEPOSIT section: {line[:60]}", flush=True)
 
                 # Check for section end markers
-                for marker in deposit_end:
-                    if marker in line_lower and current_section == 'deposit':
-                        if self.debug:
-                            print(f"[DEBUG] Exiting DEPOSIT section at: {line[:50]}", flush=True)
-                        current_section = None
-                        break
+                if current_section == 'deposit' and compiled.deposit_end(line_lower):
+                    if self.debug:
+                        print(f"[DEBUG] Exiting DEPOSIT section at: {line[:50]}", flush=True)
+                    current_section = None
 
-                for marker in withdrawal_end:
-                    if marker in line_lower and current_section == 'withdrawal':
-                        if self.debug:
-                            print(f"[DEBUG] Exiting WITHDRAWAL section at: {line[:50]}", flush=True)
-                        current_section = None
-                        break
+                if current_section == 'withdrawal' and compiled.withdrawal_end(line_lower):
+                    if self.debug:
+                        print(f"[DEBUG] Exiting WITHDRAWAL section at: {line[:50]}", flush=True)
+                    current_section = None
 
             # Skip unwanted patterns
-            if any(skip.lower() in line_lower for skip in skip_patterns):
+            if compiled.skip_patterns(line_lower):
                 continue
 
             # Skip generic template parsing for CrossFirst - use specialized parsers instead
@@ -863,13 +623,12 @@ class SmartParser:
             if self.bank_name == 'CrossFirst':
                 continue
 
-            # Try each pattern
-            for pattern_config in patterns:
-                regex = pattern_config.get('pattern')
-                groups = pattern_config.get('groups', {})
-                txn_type = pattern_config.get('type', 'auto')
+            # Try the patterns that can match (the prefilter rejects most lines in one step)
+            for pattern in compiled.prefilter.candidates(line):
+                groups = pattern.groups
+                txn_type = pattern.type
 
-                match = re.match(regex, line)
+                match = pattern.regex.match(line)
                 if match:
                     try:
                         # Extract fields using group mapping
@@ -922,8 +681,8 @@ class SmartParser:
                                 print(f"[DEBUG] Using section: withdrawal for {description[:30]}", flush=True)
                         else:  # auto - use keyword matching
                             desc_upper = description.upper()
-                            is_deposit = any(kw.upper() in desc_upper for kw in deposit_kw)
-                            is_withdrawal = any(kw.upper() in desc_upper for kw in withdrawal_kw)
+                            is_deposit = compiled.deposit_kw(desc_upper)
+                            is_withdrawal = compiled.withdrawal_kw(desc_upper)
 
                             if is_withdrawal:
                                 amount = -abs(amount)
@@ -951,7 +710,7 @@ class SmartParser:
                             'confidence_score': 85,
                             'confidence_level': 'high',
                             'parsed_by': 'template',
-                            'pattern_used': pattern_config.get('name', 'unknown')
+                            'pattern_used': pattern.name
                         })
 
                         if self.debug:
@@ -962,7 +721,7 @@ class SmartParser:
 
                     except Exception as e:
                         if self.debug:
-                            print(f"[DEBUG] Pattern '{pattern_config.get('name')}' failed: {e}", flush=True)
+                            print(f"[DEBUG] Pattern '{pattern.name}' failed: {e}", flush=True)
                         continue
 
         # Special handling for multi-column checks (Truist format)
@@ -1343,15 +1102,9 @@ class SmartParser:
         seen = set()
         lines = text.split('\n')
 
-        sections_config = template.get('sections', {})
-        deposit_markers = sections_config.get('deposits', {}).get('start_markers', [])
-        deposit_end = sections_config.get('deposits', {}).get('end_markers', [])
-        withdrawal_markers = sections_config.get('withdrawals', {}).get('start_markers', [])
-        withdrawal_end = sections_config.get('withdrawals', {}).get('end_markers', [])
-
-        txn_pattern = template.get('transaction_pattern', r'^(\d{1,2}/\d{1,2})\s+(.+?)\s+([\d,]+\.\d{2})$')
-        date_format = template.get('date_format', 'MM/DD')
-        skip_sections = template.get('skip_sections', [])
+        compiled = self._compiled(template)
+        txn_pattern = compiled.transaction_pattern
+        date_format = compiled.date_format
 
         current_section = None  # 'deposit', 'withdrawal', or None
 
@@ -1362,38 +1115,27 @@ class SmartParser:
             if len(line_stripped) < 5:
                 continue
 
-            # Check for section start markers first (priority over end markers)
-            section_started = False
-            for marker in deposit_markers:
-                if marker.lower() in line_lower:
+            # Check for section start markers first (priority over end markers);
+            # one scan for any marker before the per-section checks
+            if compiled.section_markers(line_lower):
+                if compiled.deposit_start(line_lower):
                     current_section = 'deposit'
-                    section_started = True
-                    break
-
-            if not section_started:
-                for marker in withdrawal_markers:
-                    if marker.lower() in line_lower:
-                        current_section = 'withdrawal'
-                        section_started = True
-                        break
-
-            # Only check for section end if we didn't just start a new section
-            if not section_started:
-                for marker in deposit_end + withdrawal_end:
-                    if marker.lower() in line_lower:
-                        current_section = None
-                        break
+                elif compiled.withdrawal_start(line_lower):
+                    current_section = 'withdrawal'
+                elif compiled.section_end(line_lower):
+                    # Only end the section if we didn't just start a new one
+                    current_section = None
 
             # Skip if not in transaction section
             if current_section is None:
                 continue
 
             # Skip unwanted content
-            if any(skip.lower() in line_lower for skip in skip_sections):
+            if compiled.skip_sections(line_lower):
                 continue
 
             # Try to match transaction
-            match = re.match(txn_pattern, line_stripped)
+            match = txn_pattern.match(line_stripped)
             if match:
                 txn = self._parse_match_with_section(match, line_stripped, date_format, current_section)
                 if txn:
@@ -1404,8 +1146,9 @@ class SmartParser:
 
         return transactions
 
-    def _parse_match(self, match, line: str, date_format: str, deposit_kw: List, withdrawal_kw: List) -> Optional[Dict]:
-        """Parse a regex match into a transaction."""
+    def _parse_match(self, match, line: str, date_format: str, deposit_kw: TermMatcher,
+                     withdrawal_kw: TermMatcher) -> Optional[Dict]:
+        """Parse a regex match into a transaction (keywords as precompiled TermMatchers)."""
         try:
             groups = match.groups()
 
@@ -1435,8 +1178,8 @@ class SmartParser:
 
             # Determine transaction type
             desc_upper = description.upper()
-            is_deposit = any(kw.upper() in desc_upper for kw in deposit_kw)
-            is_withdrawal = any(kw.upper() in desc_upper for kw in withdrawal_kw)
+            is_deposit = deposit_kw(desc_upper)
+            is_withdrawal = withdrawal_kw(desc_upper)
 
             if is_withdrawal:
                 amount = -abs(amount)
@@ -1740,7 +1483,7 @@ class SmartParser:
 
         return True
 
-    def _final_validation(self, transactions: List[Dict]) -> List[Dict]:
+    def _final_validation(self, transactions: List[Dict], reconcile: bool = True) -> List[Dict]:
         """Final validation and smart deduplication.
 
         Allows multiple transactions with same date/description/amount up to a limit.
@@ -1749,6 +1492,9 @@ class SmartParser:
 
         Also detects and removes repeated statement sections (entire statement duplicates).
         Additionally validates that transaction dates fall within the statement period.
+
+        With reconcile=False the result is not reconciled against the summary
+        totals (no excess removal, no adjustment rows) - the raw parsed totals.
         """
         max_amount = self.templates.get('max_transaction_amount', self.DEFAULT_MAX_AMOUNT)
         seen_counts = {}  # Track how many times we've seen each key
@@ -1813,7 +1559,8 @@ class SmartParser:
             # else: skip - likely duplicate from repeated statement section
 
         # Smart reconciliation: If we have expected totals, try to reconcile
-        valid = self._reconcile_with_expected_totals(valid)
+        if reconcile:
+            valid = self._reconcile_with_expected_totals(valid)
 
         return valid
 
@@ -2054,9 +1801,11 @@ class SmartParser:
                 if self.debug:
                     print(f"[DEBUG] Could not parse statement period dates: {e}", flush=True)
 
-        # Extract vendor information from check images in the OCR text
-        # This needs to be done on the full text before cleaning
+        # Vendor information from check images: a scan of the full OCR text
+        # (before cleaning), overlaid with field-level OCR of each check tile
+        # where available (field OCR wins per check number)
         vendor_map = self._extract_vendors_from_check_images(text)
+        vendor_map.update(self._vendors_from_check_fields())
         if self.debug and vendor_map:
             print(f"[DEBUG] Extracted vendors for {len(vendor_map)} checks", flush=True)
 
@@ -2162,6 +1911,22 @@ class SmartParser:
 
         return True
 
+    def _vendors_from_check_fields(self) -> Dict[str, str]:
+        """
+        Payees from check-image field OCR (ocr/check_fields.py), keyed by check number.
+
+        Returns:
+            Dictionary mapping check_number -> vendor_name (valid names only)
+        """
+        vendors = {}
+        for check_num, fields in (self._check_fields or {}).items():
+            payee = fields.get('payee')
+            if payee and self._is_valid_vendor_name(payee):
+                vendors[check_num] = payee
+                if self.debug:
+                    print(f"[DEBUG] Check field OCR vendor for CHECK #{check_num}: {payee}", flush=True)
+        return vendors
+
     def _extract_vendors_from_check_images(self, text: str) -> Dict[str, str]:
         """
         Extract vendor/payee names from check images in the OCR text.
@@ -4280,7 +4045,16 @@ class SmartParser:
             'bank_name': self.bank_name,
             'parsing_method': self.parsing_method,
             'template_used': self.bank_template is not None,
+            'bank_detection': ({'scanned': self._bank_detection['scanned'],
+                                'scores': compact_scores(self._bank_detection)}
+                               if self._bank_detection else None),
             'ocr_used': self._ocr_used,
+            'page_triage': self._page_triage,
+            'page_sources': self._page_sources,
+            'ocr_passes': sum(page.get('passes', 0) for page in self._page_triage),
+            'ocr_pass_ms': merge_pass_ms([page.get('pass_ms') for page in self._page_triage]),
+            'pdf_triage': self._pdf_triage.get('path'),
+            'ocr_early_stop': self._early_stop,
             'statement_year': self.statement_year,
             'statement_period_start': self._statement_period_start,
             'statement_period_end': self._statement_period_end,
@@ -4330,6 +4104,8 @@ class SmartParser:
     def add_bank_template(self, bank_name: str, template: Dict):
         """Add a new bank template at runtime."""
         self.templates['banks'][bank_name] = template
+        self.compiled_templates[bank_name] = CompiledTemplate(bank_name, template)
+        self.bank_detector = BankDetector(self.templates['banks'])
         print(f"[INFO] Added template for: {bank_name}")
 
 
@@ -11,6 +11,10 @@ import re
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 
+from ocr.bank_detection import BankDetector
+
+from .compiled_template import compile_templates, compiled_for, CompiledTemplate, TermMatcher
+
 
 class TemplateParser:
     """Parse bank statements using JSON-configured templates"""
@@ -29,6 +33,8 @@ class TemplateParser:
 
         self.templates_path = templates_path
         self.templates = self._load_templates()
+        self.compiled_templates = compile_templates(self.templates)
+        self.bank_detector = BankDetector(self.templates.get('banks', {}))
         self.current_bank = None
         self.current_template = None
 
@@ -48,6 +54,7 @@ class TemplateParser:
     def detect_bank(self, text: str) -> Optional[str]:
         """
         Auto-detect bank from PDF text using template identifiers
+        (best-scoring bank, first page first - see ocr/bank_detection.py)
 
         Args:
             text: Extracted text from PDF
@@ -55,16 +62,14 @@ class TemplateParser:
         Returns:
             Bank name if detected, None if unknown
         """
-        text_lower = text.lower()
-
-        for bank_name, config in self.templates.get('banks', {}).items():
-            identifiers = config.get('identifiers', [])
-            for identifier in identifiers:
-                if identifier.lower() in text_lower:
-                    print(f"[INFO] Detected bank: {bank_name} (matched: '{identifier}')")
-                    self.current_bank = bank_name
-                    self.current_template = config
-                    return bank_name
+        result = self.bank_detector.detect(text)
+        bank_name = result['bank']
+        if bank_name:
+            matched = ', '.join(f"'{identifier}'" for identifier in result['scores'][bank_name]['matched'])
+            print(f"[INFO] Detected bank: {bank_name} (matched: {matched})")
+            self.current_bank = bank_name
+            self.current_template = result['template']
+            return bank_name
 
         print("[INFO] Bank not detected - will use AI fallback")
         return None
@@ -97,12 +102,9 @@ class TemplateParser:
         self.current_template = template
         transactions = []
 
-        # Get deposit and withdrawal keywords
-        deposit_keywords = template.get('deposit_keywords', ['DEPOSIT', 'INTEREST', 'CREDIT'])
-        withdrawal_keywords = template.get('withdrawal_keywords', ['CHECK', 'DEBIT', 'WITHDRAWAL', 'FEE'])
-
-        # Get transaction pattern
-        txn_pattern = template.get('transaction_pattern', r'^(\d{1,2}/\d{1,2})\s+(.+?)\s+([\d,]+\.\d{2})$')
+        # Precompiled pattern, skip sections and keywords (see compiled_template.py)
+        compiled = compiled_for(self.compiled_templates, bank_name, template)
+        txn_pattern = compiled.transaction_pattern
 
         # Get year from text or use default
         year = self._extract_year(text)
@@ -117,15 +119,14 @@ class TemplateParser:
                 continue
 
             # Skip header/summary lines
-            skip_sections = template.get('skip_sections', [])
-            if any(skip.lower() in line.lower() for skip in skip_sections):
+            if compiled.skip_sections(line.lower()):
                 continue
 
             # Try to match transaction pattern
-            match = re.match(txn_pattern, line)
+            match = txn_pattern.match(line)
             if match:
                 txn = self._parse_transaction_match(match, line, template, year,
-                                                    deposit_keywords, withdrawal_keywords)
+                                                    compiled.deposit_kw, compiled.withdrawal_kw)
                 if txn:
                     # Deduplication
                     key = (txn['date'], txn['description'][:30], abs(txn['amount']))
@@ -137,8 +138,8 @@ class TemplateParser:
         return transactions
 
     def _parse_transaction_match(self, match, line: str, template: Dict,
-                                  year: int, deposit_kw: List, withdrawal_kw: List) -> Optional[Dict]:
-        """Parse a regex match into a transaction dictionary"""
+                                  year: int, deposit_kw: TermMatcher, withdrawal_kw: TermMatcher) -> Optional[Dict]:
+        """Parse a regex match into a transaction dictionary (keywords as TermMatchers)"""
         try:
             groups = match.groups()
 
@@ -162,8 +163,8 @@ class TemplateParser:
 
             # Determine type based on keywords
             desc_upper = description.upper()
-            is_deposit = any(kw.upper() in desc_upper for kw in deposit_kw)
-            is_withdrawal = any(kw.upper() in desc_upper for kw in withdrawal_kw)
+            is_deposit = deposit_kw(desc_upper)
+            is_withdrawal = withdrawal_kw(desc_upper)
 
             # Default based on section if keywords don't match
             if not is_deposit and not is_withdrawal:
@@ -346,5 +347,7 @@ class TemplateParser:
             True if added successfully
         """
         self.templates['banks'][bank_name] = template
+        self.compiled_templates[bank_name] = CompiledTemplate(bank_name, template)
+        self.bank_detector = BankDetector(self.templates['banks'])
         print(f"[INFO] Added template for bank: {bank_name}")
         return True
@@ -0,0 +1,62 @@
+"""BankDetector scoring, tie-breaking and first-page window."""
+
+from ocr.bank_detection import FIRST_PAGE_CHARS, BankDetector
+
+BANKS = {
+    'Alpha': {'identifiers': ['ALPHA BANK', 'Statement Ending']},
+    'Beta': {'identifiers': ['BETA BANK', 'beta.com', 'statement ending']},
+    'Gamma': {'identifiers': ['GAMMA BANK']},
+}
+
+
+def test_more_distinct_identifiers_beat_template_order():
+    result = BankDetector(BANKS).detect('Statement Ending 01/31\nBETA BANK\nvisit beta.com')
+    assert result['bank'] == 'Beta'
+    assert result['template'] is BANKS['Beta']
+    assert (result['scores']['Beta']['identifiers'], result['scores']['Beta']['matches']) == (3, 3)
+    assert sorted(result['scores']['Beta']['matched']) == ['BETA BANK', 'Statement Ending', 'beta.com']
+
+
+def test_more_matches_break_an_identifier_tie():
+    result = BankDetector(BANKS).detect('ALPHA BANK\nBETA BANK\nBETA BANK')
+    assert result['bank'] == 'Beta'
+    assert list(result['scores']) == ['Beta', 'Alpha']
+
+
+def test_full_tie_goes_to_template_order():
+    assert BankDetector(BANKS).detect('gamma bank alpha bank')['bank'] == 'Alpha'
+    assert BankDetector(dict(reversed(list(BANKS.items())))).detect('gamma bank alpha bank')['bank'] == 'Gamma'
+
+
+def test_shared_identifier_is_counted_for_every_bank_listing_it():
+    scores = BankDetector(BANKS).detect('STATEMENT ENDING')['scores']
+    assert scores['Alpha']['identifiers'] == scores['Beta']['identifiers'] == 1
+
+
+def test_no_identifier_returns_no_bank():
+    result = BankDetector(BANKS).detect('nothing to see here')
+    assert result['bank'] is None and result['template'] is None and result['scores'] == {}
+
+
+def test_strict_lead_on_first_page_skips_the_rest():
+    text = 'ALPHA BANK\f' + 'BETA BANK beta.com\n' * 100
+    result = BankDetector(BANKS).detect(text)
+    assert (result['bank'], result['scanned']) == ('Alpha', 'first_page')
+
+
+def test_tie_on_first_page_scans_everything():
+    text = 'ALPHA BANK BETA BANK\f' + 'beta.com\n'
+    result = BankDetector(BANKS).detect(text)
+    assert (result['bank'], result['scanned']) == ('Beta', 'full')
+
+
+def test_first_page_without_identifiers_scans_everything():
+    result = BankDetector(BANKS).detect('page one\fGAMMA BANK')
+    assert (result['bank'], result['scanned']) == ('Gamma', 'full')
+
+
+def test_without_form_feed_the_first_page_is_first_page_chars():
+    text = 'ALPHA BANK\n' + 'x' * FIRST_PAGE_CHARS + 'BETA BANK beta.com'
+    result = BankDetector(BANKS).detect(text)
+    assert (result['bank'], result['scanned']) == ('Alpha', 'first_page')
+    assert BankDetector(BANKS).detect(text, first_page_chars=0)['bank'] == 'Beta'
@@ -0,0 +1,78 @@
+"""OCRCacheStore least-recently-used eviction and expiry."""
+
+import os
+import time
+
+from ocr.cache_store import LOW_WATERMARK, OCRCacheStore
+
+ENTRY = {'text': 'x' * 1000}
+
+
+def make_store(tmp_path, max_bytes=0, max_age_days=0):
+    return OCRCacheStore(cache_dir=str(tmp_path), max_bytes=max_bytes,
+                         max_age_days=max_age_days, compression='none')
+
+
+def fill(store, keys, start=None):
+    """Write one entry per key, each a minute older than the next (first key = least recently used)."""
+    start = start if start is not None else time.time() - 3600
+    for i, key in enumerate(keys):
+        store.put('pages', key, ENTRY)
+        os.utime(store._path('pages', key), (start + 60 * i, start + 60 * i))
+
+
+def present(store, keys):
+    return [key for key in keys if os.path.exists(store._path('pages', key))]
+
+
+def test_prune_evicts_least_recently_used_first(tmp_path):
+    store = make_store(tmp_path)
+    keys = [f"{i:02d}" * 32 for i in range(10)]
+    fill(store, keys)
+    entry_size = os.path.getsize(store._path('pages', keys[0]))
+
+    store.max_bytes = entry_size * 6
+    result = store.prune()
+
+    kept = int(store.max_bytes * LOW_WATERMARK) // entry_size
+    assert present(store, keys) == keys[-kept:]
+    assert result['evicted'] == len(keys) - kept
+    assert result['bytes_freed'] == entry_size * result['evicted']
+
+
+def test_get_refreshes_recency(tmp_path):
+    store = make_store(tmp_path)
+    keys = [f"{i:02d}" * 32 for i in range(4)]
+    fill(store, keys)
+    entry_size = os.path.getsize(store._path('pages', keys[0]))
+
+    assert store.get('pages', keys[0]) == ENTRY
+    store.max_bytes = entry_size * 3
+    store.prune()
+
+    assert present(store, keys) == [keys[0], keys[3]]
+
+
+def test_put_over_budget_evicts_oldest(tmp_path):
+    store = make_store(tmp_path)
+    keys = [f"{i:02d}" * 32 for i in range(5)]
+    fill(store, keys)
+    entry_size = os.path.getsize(store._path('pages', keys[0]))
+
+    store.max_bytes = entry_size * 5 + entry_size // 2
+    store.put('pages', 'ff' * 32, ENTRY)
+
+    assert present(store, keys) == keys[2:]
+    assert os.path.exists(store._path('pages', 'ff' * 32))
+
+
+def test_prune_expires_old_entries_within_budget(tmp_path):
+    store = make_store(tmp_path, max_age_days=1)
+    old, new = 'aa' * 32, 'bb' * 32
+    fill(store, [old], start=time.time() - 3 * 86400)
+    fill(store, [new])
+
+    result = store.prune()
+
+    assert present(store, [old, new]) == [new]
+    assert (result['expired'], result['evicted']) == (1, 0)
@@ -0,0 +1,107 @@
+"""PatternPrefilter and TermMatcher against the naive per-pattern / per-term loops."""
+
+import json
+import os
+import random
+import re
+
+import pytest
+
+from parsers.compiled_template import CompiledPattern, PatternPrefilter, TermMatcher, compile_templates
+
+TEMPLATES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              'config', 'bank_templates.json')
+
+with open(TEMPLATES_PATH, 'r', encoding='utf-8') as f:
+    TEMPLATES = json.load(f)
+
+COMPILED = compile_templates(TEMPLATES)
+
+DESCRIPTIONS = ['DEPOSIT FROM ACME', 'CHECK 1001', 'ACH CORP DEBIT PAYROLL', 'SERVICE FEE',
+                'INTEREST PAID', 'POS PURCHASE CREDIT', 'transfer', 'DEPOSIT',
+                'TELEPHONE TRANSFER TO SAVINGS']
+
+
+def sample_lines(template, count=300, seed=7):
+    """Statement-like lines: transaction rows in several layouts, markers, headers and noise."""
+    rng = random.Random(seed)
+    sections = template.get('sections') or {}
+    lines = ['', ' ', 'Page 1 of 3', 'Statement period 01/01/2024 - 01/31/2024', 'Beginning balance $1,234.56']
+    lines += template.get('identifiers', []) + template.get('skip_patterns', [])
+    for kind in ('deposits', 'withdrawals'):
+        lines += sections.get(kind, {}).get('start_markers', []) + sections.get(kind, {}).get('end_markers', [])
+    for _ in range(count):
+        date = f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}"
+        amount = f"{rng.randint(1, 99999):,}.{rng.randint(0, 99):02d}"
+        description = rng.choice(DESCRIPTIONS)
+        lines.append(rng.choice([
+            f"{date} {description} {amount}",
+            f"{date} {amount} {description}",
+            f"{date}/2024 {description} {amount}",
+            f"{date} {description} ${amount}",
+            f"{date} {description} -{amount}",
+            f"{rng.randint(1000, 9999)} {date} {amount}",
+            f"{description} {date} {amount}",
+            f"{date}/24 {description} ({amount})",
+            f"{date}/2024 Withdrawal (${amount}) ${amount}",
+            f"{date}/2024 Withdrawal ({amount}) {amount}",
+            f"{date}/2024 {description} ( ${amount} ) {amount}",
+            f"{date}/2024 {description} {amount} {amount}",
+            f"{date}/2024 DEPOSIT ${amount} $",
+            f"{date} {amount} INTEREST",
+            f"{date} *{rng.randint(1000, 9999)} {amount}",
+            f"{rng.randint(1000, 9999)}* {date} {amount}",
+        ]))
+    return lines
+
+
+@pytest.mark.parametrize('bank_name', sorted(COMPILED))
+def test_prefilter_matches_naive_pattern_loop(bank_name):
+    compiled = COMPILED[bank_name]
+    patterns = compiled.transaction_patterns
+    matched = 0
+    for line in sample_lines(TEMPLATES['banks'][bank_name]):
+        naive = [p for p in patterns if p.regex.match(line)]
+        candidates = compiled.prefilter.candidates(line)
+        if not naive:
+            # Nothing may be reported as matching; a bypassed prefilter may still list all patterns
+            assert not any(p.regex.match(line) for p in candidates)
+            continue
+        assert [p for p in candidates if p.regex.match(line)] == naive, line
+        matched += 1
+    assert matched or not patterns
+
+
+def test_prefilter_rejects_non_digit_lines_when_every_pattern_starts_with_a_digit():
+    templates = [t for t in COMPILED.values() if t.prefilter.leading_digit and len(t.transaction_patterns) > 1]
+    assert templates
+    for compiled in templates:
+        assert compiled.prefilter.candidates('DEPOSIT 01/05 1,000.00') == ()
+        assert compiled.prefilter.candidates('') == ()
+
+
+def test_prefilter_falls_back_to_all_patterns_when_they_cannot_be_combined():
+    patterns = [CompiledPattern('a', re.compile(r'^(?P<d>\d+) x'), {}, 'auto'),
+                CompiledPattern('b', re.compile(r'^(?P<d>\d+) y'), {}, 'auto')]
+    prefilter = PatternPrefilter(patterns)
+    assert prefilter.candidates('12 y') == prefilter.patterns
+
+
+@pytest.mark.parametrize('bank_name', sorted(COMPILED))
+def test_term_matcher_matches_naive_substring_loop(bank_name):
+    template = TEMPLATES['banks'][bank_name]
+    terms = [s.lower() for s in template.get('skip_patterns', [])]
+    matcher = TermMatcher(terms)
+    for line in sample_lines(template, count=50):
+        line_lower = line.lower()
+        assert matcher(line_lower) == any(term in line_lower for term in terms), line
+
+
+def test_term_matcher_prefers_longer_terms_and_handles_regex_characters():
+    matcher = TermMatcher(['page', 'page 1 of', '(cont.)', '$'])
+    assert matcher('statement page 1 of 3')
+    assert matcher('balance (cont.)')
+    assert matcher('total $5')
+    assert not matcher('balance cont')
+    assert not TermMatcher([])
+    assert not TermMatcher([])('anything')